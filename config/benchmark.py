@@ -0,0 +1,36 @@
+"""
+Settings of the benchmarks (python manage.py judge_benchmark --settings config.benchmark, python manage.py index_benchmark --settings config.benchmark).
+
+Local SQLite database and in-memory channel layer, so the benchmark does not need postgres or redis.
+"""
+import os
+
+# database of settings.py is not used, its variables are not needed
+for name in ("DB_NAME", "DB_USER", "DB_PASSWORD", "DB_HOST", "DB_PORT", "SMTP_SERVER", "SMTP_PORT", "EMAIL_ADDRESS", "EMAIL_PASSWORD"):
+    os.environ.setdefault(name, "")
+
+from .settings import *
+
+
+BENCHMARK_DIR = BASE_DIR / "benchmark"
+os.makedirs(BENCHMARK_DIR, exist_ok=True)
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BENCHMARK_DIR / "db.sqlite3",
+    }
+}
+
+CHANNEL_LAYERS = {
+    "default": {
+        "BACKEND": "channels.layers.InMemoryChannelLayer",
+    },
+}
+
+MEDIA_ROOT = BENCHMARK_DIR / "media"
+
+JUDGE_COMPILE_CACHE = {**JUDGE_COMPILE_CACHE, "path": BENCHMARK_DIR / "cache" / "compile"}
+JUDGE_VERDICT_CACHE = {**JUDGE_VERDICT_CACHE, "enabled": False}
+JUDGE_TESTS_STORE = {**JUDGE_TESTS_STORE, "path": BENCHMARK_DIR / "cache" / "tests"}
+JUDGE_BLOB_STORE = {**JUDGE_BLOB_STORE, "path": BENCHMARK_DIR / "blobs"}
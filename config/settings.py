@@ -1,5 +1,6 @@
+import socket
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -142,3 +143,149 @@ CHANNEL_LAYERS = {
         },
     },
 }
+
+# judge
+JUDGE_QUEUE = {
+    # redis://host:port/db, used instead of host, port and db when it is set
+    "url": config("JUDGE_REDIS_URL", default=""),
+    "host": config("JUDGE_REDIS_HOST", default="127.0.0.1"),
+    "port": config("JUDGE_REDIS_PORT", default=6379, cast=int),
+    "db": 1,
+    "name": "judge_queue",
+}
+JUDGE_WORKERS = config("JUDGE_WORKERS", default=2, cast=int)
+# order of attempts in the judge queue, see utils/queue.py
+JUDGE_SCHEDULER = {
+    # priority classes, attempts of the first class are served first
+    "classes": ["contest", "practice"],
+    # share of users in their class
+    "weights": {
+        "premium": 2,
+        "default": 1,
+    },
+    # attempts of one user being judged at the same time
+    "in_flight": config("JUDGE_IN_FLIGHT", default=1, cast=int),
+    # attempts of one user waiting in the queue, new attempts are rejected
+    "max_queued": 20,
+    # seconds, running attempts of killed workers are not counted after it
+    "running_timeout": 600,
+    # seconds, queued attempts which no worker takes (for example, no node judges their language) are dropped after it
+    "queued_timeout": 3600,
+    # seconds between queue position events sent by one worker
+    "positions_interval": 1,
+}
+# judge node, many nodes can run judge_workers with the same JUDGE_QUEUE
+JUDGE_NODE = {
+    "name": config("JUDGE_NODE", default=socket.gethostname()),
+    # short names of languages judged by the node, languages with sandbox binaries on the node by default
+    "languages": config("JUDGE_LANGUAGES", default="", cast=Csv()),
+    # seconds between heartbeats of workers, a worker is dead after 3 missed heartbeats
+    "heartbeat": 5,
+    # seconds, attempts of dead workers are queued again when their leases are not extended
+    "lease": 30,
+    # attempts queued again more times are dropped
+    "max_requeues": 2,
+}
+# attempted and solved problems of users as redis bitsets, see utils/progress.py
+PROBLEM_PROGRESS = {
+    "enabled": config("PROBLEM_PROGRESS", default=True, cast=bool),
+    "name": "progress",
+    # seconds, bitsets of inactive users are built again from attempts
+    "timeout": 30 * 24 * 60 * 60,
+}
+# tests checked at the same time by one judge, each one in its own folder
+JUDGE_PARALLEL_CASES = config("JUDGE_PARALLEL_CASES", default=1, cast=int)
+# compiled files of attempts, reused when the same code is submitted again
+JUDGE_COMPILE_CACHE = {
+    "enabled": True,
+    "path": BASE_DIR / "cache" / "compile",
+    "size": 512 * 1024 * 1024,
+    "link": False,
+}
+# results of attempts, reused when the same code is submitted to the same problem
+JUDGE_VERDICT_CACHE = {
+    "enabled": config("JUDGE_VERDICT_CACHE", default=False, cast=bool),
+    "timeout": 24 * 60 * 60,
+}
+# tests of problems extracted from archives
+JUDGE_TESTS_STORE = {
+    "path": BASE_DIR / "cache" / "tests",
+    # least recently used tests are deleted when the store is bigger
+    "size": 2 * 1024 * 1024 * 1024,
+}
+# limits given to the sandbox binary, address space is memory limit of the problem * factor (MB)
+JUDGE_SANDBOX = {
+    "address_space_factor": 2,
+    "address_space_min": 128,
+    "processes": 32,
+    "file_size": 1024 * 1024,
+    # wall time limit is time limit of the problem * factor, so waiting for input does not hang the judge
+    "wall_factor": 2,
+    # seconds waited after the wall time limit before the sandbox is killed
+    "wall_margin": 1,
+    # cgroup v2 folder of the judge (for example /sys/fs/cgroup/judge), memory is limited with memory.max
+    # instead of RLIMIT_AS, the sandbox uses rlimits when cgroups are not available
+    "cgroup": config("JUDGE_CGROUP", default=""),
+}
+# long-lived sandbox processes (sandbox -s) of each worker, idle runners kept per sandbox binary
+JUDGE_RUNNER = {
+    "enabled": config("JUDGE_RUNNER", default=False, cast=bool),
+    "size": 4,
+}
+# fork servers of interpreters (utils/zygote.py), languages by short name
+JUDGE_ZYGOTE = {
+    "enabled": config("JUDGE_ZYGOTE", default=False, cast=bool),
+    "languages": ["py"],
+    "size": 4,
+}
+# output, errors and diffs of failed tests, saved once by hash and referenced from attempt.cases
+JUDGE_BLOB_STORE = {
+    "path": BASE_DIR / "blobs",
+    # characters of input, output and errors kept in attempt.cases
+    "preview": 256,
+    # seconds, blobs which are not referenced by attempts are deleted by clean_blobs when they are older
+    "age": 3600,
+}
+# progress of the judge (seconds): attempt is saved and case events are sent at most once per interval
+JUDGE_REPORTER = {
+    "save_interval": config("JUDGE_SAVE_INTERVAL", default=1.0, cast=float),
+    "event_interval": config("JUDGE_EVENT_INTERVAL", default=0.25, cast=float),
+}
+# timings of judge stages, verdict counters and gauges, every process saves its metrics to path
+# at most once per interval, metrics of all processes are rendered in the Prometheus text format
+JUDGE_METRICS = {
+    "enabled": config("JUDGE_METRICS", default=True, cast=bool),
+    "path": BASE_DIR / "cache" / "metrics",
+    "interval": 5,
+    # gauges of processes which did not save metrics for stale seconds are skipped
+    "stale": 60,
+    # file for the node_exporter textfile collector, it is rewritten on every save
+    "textfile": config("JUDGE_METRICS_TEXTFILE", default="") or None,
+    # GET /metrics/ serves metrics of all processes
+    "endpoint": config("JUDGE_METRICS_ENDPOINT", default=False, cast=bool),
+}
+# folders of attempts, root should be on tmpfs, empty folders are created ahead and reused by attempts
+# root is created with mode 0700, the judge does not start when it belongs to another user or others can write to it
+JUDGE_WORKSPACES = {
+    "root": config(
+        "JUDGE_WORKSPACE_ROOT",
+        default="/dev/shm/algoland" if Path("/dev/shm").is_dir() else str(BASE_DIR / "workspaces"),
+    ),
+    "size": 16,
+    # workspaces of stopped workers are deleted when workers start, if they are older than stale seconds
+    "stale": 3600,
+}
+# checkers and interactors of problems, compiled once per problem by the extension of the uploaded file
+JUDGE_PROGRAMS = {
+    "path": BASE_DIR / "cache" / "programs",
+    "compilers": {
+        ".c": "gcc -O2 -o {output} {source} -lm",
+        ".cpp": "g++ -O2 -std=c++17 -o {output} {source}",
+        ".cc": "g++ -O2 -std=c++17 -o {output} {source}",
+    },
+    "interpreters": {
+        ".py": "python3",
+    },
+    # seconds, for compiling and for one run of the checker or interactor
+    "timeout": 30,
+}
@@ -3,6 +3,8 @@ from django.conf import settings
 from django.urls import path, include
 from django.conf.urls.static import static
 
+from problems.views import get_metrics
+
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -12,6 +14,9 @@ urlpatterns = [
 ]
 
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# scraped by prometheus, must be reachable only from the private network
+if settings.JUDGE_METRICS.get("endpoint"):
+    urlpatterns += [path("metrics/", get_metrics)]
 if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,19 @@
+# Generated by Django 6.1.2 on 2026-10-18 16:03
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_fix_post_uuids'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='uuid',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+    ]
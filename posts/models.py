@@ -13,7 +13,7 @@ class Tag(models.Model):
 
 
 class Post(models.Model):
-    uuid = models.CharField(max_length=100, default=uuid4)
+    uuid = models.UUIDField(default=uuid4, editable=False, unique=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     title = models.CharField(max_length=1000)
     image = models.CharField(max_length=100, null=True, blank=True)
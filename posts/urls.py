@@ -11,8 +11,8 @@ from .views import (
 
 urlpatterns = [
     path("posts/", PostsListAPIView.as_view(),),
-    path("posts/post/<str:uuid>/", get_post,),
-    path("posts/post/<str:uuid>/edit/", edit_post,),
+    path("posts/post/<uuid:uuid>/", get_post,),
+    path("posts/post/<uuid:uuid>/edit/", edit_post,),
     path("posts/add/", add_post, ),
 
     path("posts/tags/", get_tags,),
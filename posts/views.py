@@ -1,4 +1,5 @@
 import json
+from uuid import UUID
 from django.http import HttpRequest
 from rest_framework.response import Response
 from rest_framework import decorators
@@ -48,7 +49,7 @@ def get_tags(request: HttpRequest):
 
 
 @decorators.api_view(http_method_names=["GET"])
-def get_post(request: HttpRequest, uuid: str):
+def get_post(request: HttpRequest, uuid: UUID):
     post = Post.objects.filter(uuid=uuid)
 
     if not post.exists():
@@ -98,7 +99,7 @@ def add_post(request: HttpRequest):
 @decorators.api_view(http_method_names=["POST"])
 @decorators.permission_classes(permission_classes=[permissions.IsAuthenticated])
 @decorators.authentication_classes(authentication_classes=[authentication.TokenAuthentication])
-def edit_post(reuqest: HttpRequest, uuid: str):
+def edit_post(reuqest: HttpRequest, uuid: UUID):
     post = Post.objects.filter(uuid=uuid)
     decoded = jsonify(decode(reuqest.data.get("data", "")))
 
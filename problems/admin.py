@@ -1,10 +1,15 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
 from unfold.admin import ModelAdmin
 
+from utils.store import TestStore, TestsError
+from utils.cache import VerdictCache
+
 from .models import (
     Attempt,
     Language,
     Problem,
+    ProblemStats,
     Tag,
 )
 
@@ -19,9 +24,50 @@ class LanguageModelAdmin(ModelAdmin):
     list_display = ["uuid", "name", "short",]
 
 
+class ProblemForm(forms.ModelForm):
+    class Meta:
+        model = Problem
+        fields = "__all__"
+
+    def clean_tests(self):
+        # a broken archive is not saved, judge workers would fail on every attempt
+        tests = self.cleaned_data.get("tests")
+        if tests and "tests" in self.changed_data:
+            try:
+                TestStore().validate(tests)
+            except TestsError as e:
+                raise forms.ValidationError(str(e))
+        return tests
+
+
 @admin.register(Problem)
 class ProblemModelAdmin(ModelAdmin):
-    list_display = ["uuid", "title", "author", "is_public"]
+    form = ProblemForm
+    list_display = ["number", "uuid", "title", "author", "is_public"]
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+
+        # hashes of replaced files are computed again, even when the new file has the same name and size
+        if {"tests", "checker", "interactor"} & set(form.changed_data):
+            VerdictCache().invalidate(obj)
+
+        # extract new tests now, not on the first attempt
+        if "tests" in form.changed_data and obj.tests:
+            store = TestStore()
+            try:
+                store.get(obj)
+            except (TestsError, OSError) as e:
+                self.message_user(request, f"tests can not be extracted: {e}", messages.ERROR)
+                return
+            error = store.groups_error(obj)
+            if error:
+                self.message_user(request, f"groups.json is not used, all tests are judged without groups: {error}", messages.WARNING)
+
+
+@admin.register(ProblemStats)
+class ProblemStatsModelAdmin(ModelAdmin):
+    list_display = ["problem", "attempts", "accepted", "solvers", "acceptance",]
 
 
 @admin.register(Tag)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from utils.blobs import BlobStore
+from problems.models import Attempt
+
+
+def referenced_blobs():
+    """
+    referenced_blobs() -> Keys of blobs in the cases of all attempts
+    """
+    keys = set()
+    for cases in Attempt.objects.exclude(cases=None).values_list("cases", flat=True).iterator(chunk_size=2000):
+        # cases of compilation errors are a dict
+        if not isinstance(cases, list):
+            continue
+        for case in cases:
+            keys.update((case.get("blobs") or {}).values())
+    return keys
+
+
+class Command(BaseCommand):
+    help = "Delete case artifacts of the blob store which are not referenced by any attempt"
+
+    def handle(self, *args, **options):
+        deleted = BlobStore().clean(referenced_blobs())
+        self.stdout.write(f"{len(deleted)} blobs are deleted")
@@ -0,0 +1,190 @@
+import json
+import time
+import random
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from django.db import connection
+from django.core.management import call_command
+from django.db.migrations.executor import MigrationExecutor
+from django.core.management.base import BaseCommand, CommandError
+
+from .judge_benchmark import summary
+
+
+# migrations before uuid columns and composite indexes
+BEFORE = [
+    ("problems", "0008_problem_number"),
+    ("posts", "0003_comment_uuid_tag_uuid"),
+    ("users", "0005_activity_author_alter_user_country"),
+]
+
+STATUSES = ["ac", "wa", "tle", "mle", "re", "ce"]
+
+
+class Command(BaseCommand):
+    help = "Compare query plans and latency of hot lookups before and after uuid columns and composite indexes, run with --settings config.benchmark"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--problems", type=int, default=500)
+        parser.add_argument("--attempts", type=int, default=100000)
+        parser.add_argument("--posts", type=int, default=2000)
+        parser.add_argument("--notifications", type=int, default=50000)
+        parser.add_argument("--repeat", type=int, default=200, help="runs of every query")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--output", help="file of the json report, stdout by default")
+
+    def handle(self, *args, **options):
+        if "sqlite" not in settings.DATABASES["default"]["ENGINE"]:
+            raise CommandError("benchmark migrates the database back and forth, run it with --settings config.benchmark")
+
+        call_command("migrate", verbosity=0)
+        random.seed(options.get("seed"))
+        self.seed(options)
+
+        report = {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "vendor": connection.vendor,
+            "rows": {},
+            "results": [],
+        }
+
+        # existing rows go through the data migration of uuids on the way forward
+        for app, migration in BEFORE:
+            call_command("migrate", app, migration, verbosity=0)
+        before = self.measure(self.apps(BEFORE), options.get("repeat"))
+
+        call_command("migrate", verbosity=0)
+        after = self.measure(self.apps(), options.get("repeat"))
+
+        report["rows"] = self.rows(self.apps())
+        for name in after:
+            report["results"].append({
+                "query": name,
+                "before": before.get(name),
+                "after": after.get(name),
+                "speedup": round(before[name]["latency"]["p50"] / after[name]["latency"]["p50"], 2) if after[name]["latency"]["p50"] else None,
+            })
+
+        data = json.dumps(report, indent=2)
+        if options.get("output"):
+            with open(options.get("output"), "w") as file:
+                file.write(data)
+        else:
+            self.stdout.write(data)
+
+    def apps(self, nodes: list = None):
+        """
+        apps(nodes) -> Historical models at the migrations, latest migrations by default
+        """
+        loader = MigrationExecutor(connection).loader
+        return loader.project_state(nodes or loader.graph.leaf_nodes()).apps
+
+    def rows(self, apps):
+        return {
+            name: apps.get_model(app, name).objects.count()
+            for app, name in (("users", "User"), ("problems", "Problem"), ("problems", "Attempt"), ("posts", "Post"), ("users", "Notification"), ("users", "Session"), ("users", "Activity"))
+        }
+
+    def seed(self, options: dict):
+        """
+        seed(options) -> Create synthetic users, problems, attempts, posts, notifications, sessions and activities once
+        """
+        from users.models import User, Notification, Session, Activity
+        from problems.models import Problem, Language, Attempt
+        from posts.models import Post
+
+        if User.objects.filter(username="index-benchmark-0").exists():
+            return
+
+        users = User.objects.bulk_create([
+            User(username=f"index-benchmark-{index}", gender="male", role="user")
+            for index in range(options.get("users"))
+        ])
+        language = Language.objects.create(name="index-benchmark", short="py", icon="py", type="interpreted", file="main.py", run="python3")
+        problems = Problem.objects.bulk_create([
+            Problem(title=f"index-benchmark-{index}", difficulty="easy", language="uz", author=random.choice(users), number=index + 1)
+            for index in range(options.get("problems"))
+        ])
+
+        for start in range(0, options.get("attempts"), 10000):
+            Attempt.objects.bulk_create([
+                Attempt(author=random.choice(users), problem=random.choice(problems), language=language, status=random.choice(STATUSES), code="print(1)")
+                for _ in range(min(10000, options.get("attempts") - start))
+            ])
+
+        Post.objects.bulk_create([
+            Post(author=random.choice(users), title=f"index-benchmark-{index}", description="", content="")
+            for index in range(options.get("posts"))
+        ], batch_size=1000)
+        Notification.objects.bulk_create([
+            Notification(to=random.choice(users), type="like", is_readed=random.random() < 0.9)
+            for _ in range(options.get("notifications"))
+        ], batch_size=5000)
+        Session.objects.bulk_create([
+            Session(author=user, ip_address="127.0.0.1")
+            for user in users
+            for _ in range(10)
+        ], batch_size=5000)
+        Activity.objects.bulk_create([
+            Activity(author=user)
+            for user in users
+            for _ in range(30)
+        ], batch_size=5000)
+
+        # auto_now_add fields are spread over the last month
+        now = timezone.now()
+        for Model in (Notification, Session, Activity):
+            rows = list(Model.objects.only("pk"))
+            for row in rows:
+                row.created = now - timedelta(minutes=random.randint(0, 30 * 24 * 60))
+            Model.objects.bulk_update(rows, ["created"], batch_size=1000)
+
+    def measure(self, apps, repeat: int):
+        """
+        measure(apps, repeat) -> Query plan and latency of every hot lookup with models of apps
+        """
+        User = apps.get_model("users", "User")
+        Problem = apps.get_model("problems", "Problem")
+        Language = apps.get_model("problems", "Language")
+        Attempt = apps.get_model("problems", "Attempt")
+        Post = apps.get_model("posts", "Post")
+        Notification = apps.get_model("users", "Notification")
+        Session = apps.get_model("users", "Session")
+        Activity = apps.get_model("users", "Activity")
+
+        # keys are read in every state, so they have the format of its columns
+        users = list(User.objects.values_list("pk", flat=True))
+        problems = list(Problem.objects.values_list("pk", "uuid"))
+        languages = list(Language.objects.values_list("uuid", flat=True))
+        attempts = list(Attempt.objects.order_by("?").values_list("uuid", "author_id")[:1000])
+        posts = list(Post.objects.values_list("uuid", flat=True))
+        today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+        queries = {
+            "get_problem": lambda: Problem.objects.filter(uuid=random.choice(problems)[1]),
+            "get_language": lambda: Language.objects.filter(uuid=random.choice(languages)),
+            "get_attempt": lambda: Attempt.objects.filter(uuid=(attempt := random.choice(attempts))[0], author_id=attempt[1]),
+            "get_post": lambda: Post.objects.filter(uuid=random.choice(posts)),
+            "problem_attempts": lambda: Attempt.objects.filter(author_id=random.choice(users), problem_id=random.choice(problems)[0]).order_by("-id")[:10],
+            "problem_solvers": lambda: Attempt.objects.filter(problem_id=random.choice(problems)[0], status="ac").values("author_id").distinct(),
+            "unread_notifications": lambda: Notification.objects.filter(to_id=random.choice(users), is_readed=False).order_by("-created"),
+            "today_activity": lambda: Activity.objects.filter(author_id=random.choice(users), created__gte=today),
+            "sessions": lambda: Session.objects.filter(author_id=random.choice(users)).order_by("-created"),
+        }
+
+        results = {}
+        for name, query in queries.items():
+            latencies = []
+            for _ in range(repeat):
+                queryset = query()
+                start = time.perf_counter()
+                list(queryset)
+                latencies.append((time.perf_counter() - start) * 1000)
+
+            results[name] = {
+                "plan": query().explain(),
+                "latency": summary(latencies),
+            }
+        return results
@@ -0,0 +1,370 @@
+import io
+import os
+import json
+import time
+import random
+import shutil
+import zipfile
+import threading
+from django.conf import settings
+from django.core.management import call_command
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+
+
+# synthetic languages, every solution prints each number of the input multiplied by 2 on its own line
+LANGUAGES = {
+    "py": {
+        "name": "Python",
+        "type": "interpreted",
+        "file": "main.py",
+        "sandbox": "sandbox-py",
+        "compile": None,
+        "run": "cwd/sandbox-py {python3} cwd/file",
+        "code": "import sys\nsys.stdout.write(''.join(f'{int(x) * 2}\\n' for x in sys.stdin.read().split()))\n",
+    },
+    "c": {
+        "name": "C",
+        "type": "compiled",
+        "file": "main.c",
+        "sandbox": "sandbox-c",
+        "compile": "{gcc} -O2 cwd/file -o cwd/main",
+        "run": "cwd/sandbox-c cwd/main",
+        "code": "#include <stdio.h>\nint main() {\n    long long x;\n    while (scanf(\"%lld\", &x) == 1) printf(\"%lld\\n\", x * 2);\n    return 0;\n}\n",
+    },
+    "go": {
+        "name": "Go",
+        "type": "compiled",
+        "file": "main.go",
+        "sandbox": "sandbox-go",
+        "compile": "{go} build -o cwd/main cwd/file",
+        "run": "cwd/sandbox-go cwd/main",
+        "code": "package main\n\nimport (\n\t\"bufio\"\n\t\"fmt\"\n\t\"os\"\n)\n\nfunc main() {\n\tr := bufio.NewReader(os.Stdin)\n\tw := bufio.NewWriter(os.Stdout)\n\tdefer w.Flush()\n\tvar x int64\n\tfor {\n\t\tif _, err := fmt.Fscan(r, &x); err != nil {\n\t\t\tbreak\n\t\t}\n\t\tfmt.Fprintln(w, x*2)\n\t}\n}\n",
+    },
+    "node": {
+        "name": "Node",
+        "type": "interpreted",
+        "file": "main.js",
+        "sandbox": "sandbox-node",
+        "compile": None,
+        "run": "cwd/sandbox-node {node} cwd/file",
+        "code": "const data = require('fs').readFileSync(0, 'utf8').split(/\\s+/).filter(Boolean);\nprocess.stdout.write(data.map(x => `${BigInt(x) * 2n}\\n`).join(''));\n",
+    },
+    "bun": {
+        "name": "Bun",
+        "type": "interpreted",
+        "file": "main.js",
+        "sandbox": "sandbox-bun",
+        "compile": None,
+        "run": "cwd/sandbox-bun {bun} cwd/file",
+        "code": "const data = require('fs').readFileSync(0, 'utf8').split(/\\s+/).filter(Boolean);\nprocess.stdout.write(data.map(x => `${BigInt(x) * 2n}\\n`).join(''));\n",
+    },
+    "deno": {
+        "name": "Deno",
+        "type": "interpreted",
+        "file": "main.js",
+        "sandbox": "sandbox-deno",
+        "compile": None,
+        "run": "cwd/sandbox-deno {deno} run cwd/file",
+        "code": "const data = new TextDecoder().decode(await new Response(Deno.stdin.readable).arrayBuffer()).split(/\\s+/).filter(Boolean);\nawait Deno.stdout.write(new TextEncoder().encode(data.map(x => `${BigInt(x) * 2n}\\n`).join('')));\n",
+    },
+    "php": {
+        "name": "PHP",
+        "type": "interpreted",
+        "file": "main.php",
+        "sandbox": "sandbox-php",
+        "compile": None,
+        "run": "cwd/sandbox-php {php} cwd/file",
+        "code": "<?php\n$data = preg_split('/\\s+/', trim(stream_get_contents(STDIN)));\nforeach ($data as $x) { if ($x !== '') echo ($x * 2), \"\\n\"; }\n",
+    },
+}
+
+
+# shapes of synthetic problems: (number of tests, numbers in one test)
+SHAPES = {
+    "tiny": (200, 1),
+    "huge": (3, 200000),
+}
+
+
+def percentile(values: list, percent: float):
+    if not values:
+        return 0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(percent / 100 * len(values) + 0.5) - 1))
+    return values[index]
+
+
+def summary(values: list):
+    """
+    summary(values) -> count, total, mean, p50 and p99 of the durations (milliseconds)
+    """
+    return {
+        "count": len(values),
+        "total": round(sum(values), 3),
+        "mean": round(sum(values) / len(values), 3) if values else 0,
+        "p50": round(percentile(values, 50), 3),
+        "p99": round(percentile(values, 99), 3),
+    }
+
+
+class Timings:
+    """
+    Durations of the judge stages, collected by wrapping methods of the judge while the benchmark runs.
+    """
+    def __init__(self):
+        self.stages = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.patched = []
+
+    def add(self, stage: str, duration: float):
+        with self.lock:
+            self.stages.setdefault(stage, []).append(duration * 1000)
+
+    def wrap(self, owner, name: str, stage: str):
+        original = getattr(owner, name)
+        timings = self
+
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                timings.add(stage, duration)
+                if stage == "compare":
+                    timings.local.compare = getattr(timings.local, "compare", 0) + duration
+
+        setattr(owner, name, wrapper)
+        self.patched.append((owner, name, original))
+
+    def wrap_case(self, owner, name: str):
+        """
+        wrap_case(owner, name) -> Time of one test without comparison is the spawn stage
+        """
+        original = getattr(owner, name)
+        timings = self
+
+        def wrapper(*args, **kwargs):
+            timings.local.compare = 0
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                timings.add("spawn", time.perf_counter() - start - timings.local.compare)
+
+        setattr(owner, name, wrapper)
+        self.patched.append((owner, name, original))
+
+    def restore(self):
+        for owner, name, original in reversed(self.patched):
+            setattr(owner, name, original)
+        self.patched = []
+
+    def report(self):
+        return {stage: summary(values) for stage, values in sorted(self.stages.items())}
+
+
+class Command(BaseCommand):
+    help = "Measure judge throughput with synthetic problems, run with --settings config.benchmark"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--languages", nargs="+", default=list(LANGUAGES), help="short names of languages, not installed ones are skipped")
+        parser.add_argument("--shapes", nargs="+", default=list(SHAPES), choices=list(SHAPES))
+        parser.add_argument("--attempts", type=int, default=5, help="attempts of every language and shape")
+        parser.add_argument("--sandbox-dir", default=str(settings.BASE_DIR), help="folder with sandbox-* binaries")
+        parser.add_argument("--no-compile-cache", action="store_true")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--output", help="file of the json report, stdout by default")
+
+    def handle(self, *args, **options):
+        if "sqlite" not in settings.DATABASES["default"]["ENGINE"]:
+            raise CommandError("benchmark creates users, problems and attempts, run it with --settings config.benchmark")
+
+        call_command("migrate", verbosity=0)
+
+        import sandbox
+        from users.models import User
+        from problems.models import Problem, Language, Attempt
+
+        if options.get("no_compile_cache"):
+            sandbox.compile_cache.enabled = False
+
+        random.seed(options.get("seed"))
+        user, _ = User.objects.get_or_create(username="benchmark", defaults={"gender": "male", "role": "user"})
+        report = {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "parallel_cases": settings.JUDGE_PARALLEL_CASES,
+            "compile_cache": sandbox.compile_cache.enabled,
+            "runner": bool(sandbox.runner_pool),
+            "zygote": bool(sandbox.zygote_pool),
+            "results": [],
+            "skipped": [],
+        }
+
+        problems = {
+            shape: self.problem(user, shape, Problem)
+            for shape in options.get("shapes")
+        }
+
+        for short in options.get("languages"):
+            language = self.language(short, options.get("sandbox_dir"), Language)
+            if not language:
+                report["skipped"].append(short)
+                continue
+
+            for shape, problem in problems.items():
+                report["results"].append(self.measure(sandbox, user, language, shape, problem, options.get("attempts"), Attempt))
+
+            report["results"].append(self.measure_sandbox(sandbox, language, options.get("attempts")))
+
+        data = json.dumps(report, indent=2)
+        if options.get("output"):
+            with open(options.get("output"), "w") as file:
+                file.write(data)
+        else:
+            self.stdout.write(data)
+
+    def language(self, short: str, sandbox_dir: str, Language):
+        """
+        language(short, sandbox_dir, Language) -> Synthetic language, None when its tools or sandbox binary are not installed
+        """
+        definition = LANGUAGES.get(short)
+        if not definition:
+            return None
+
+        tools = {}
+        for tool in ("python3", "gcc", "go", "node", "bun", "deno", "php"):
+            if f"{{{tool}}}" in (definition.get("run") or "") + (definition.get("compile") or ""):
+                path = shutil.which(tool)
+                if not path:
+                    return None
+                tools[tool] = path
+
+        sandbox = os.path.join(sandbox_dir, definition.get("sandbox"))
+        if not os.path.isfile(sandbox):
+            return None
+
+        language, _ = Language.objects.update_or_create(
+            name=f"benchmark-{short}",
+            defaults={
+                "short": short,
+                "icon": short,
+                "type": definition.get("type"),
+                "file": definition.get("file"),
+                "sandbox": sandbox,
+                "compile": definition.get("compile").format(**tools) if definition.get("compile") else None,
+                "run": definition.get("run").format(**tools),
+            },
+        )
+        return language
+
+    def problem(self, user, shape: str, Problem):
+        """
+        problem(user, shape, Problem) -> Synthetic problem with tests of the shape
+        """
+        tests, size = SHAPES.get(shape)
+        archive = io.BytesIO()
+
+        with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as tests_zip:
+            for index in range(1, tests + 1):
+                numbers = [random.randint(-10 ** 9, 10 ** 9) for _ in range(size)]
+                tests_zip.writestr(f"{index}.in", " ".join(map(str, numbers)) + "\n")
+                tests_zip.writestr(f"{index}.out", "\n".join(str(number * 2) for number in numbers))
+
+        problem, _ = Problem.objects.update_or_create(
+            title=f"benchmark-{shape}",
+            defaults={
+                "author": user,
+                "difficulty": "easy",
+                "language": "uz",
+                "time_limit": 5,
+                "memory_limit": 256,
+                "output_limit": 64 * 1024,
+                "line_limit": 0,
+            },
+        )
+        problem.tests.save("tests.zip", ContentFile(archive.getvalue()))
+        return problem
+
+    def measure(self, sandbox, user, language, shape: str, problem, attempts: int, Attempt):
+        """
+        measure(...) -> Stage durations, latency and throughput of judging attempts of the language
+        """
+        timings = Timings()
+        timings.wrap(sandbox.Workspace, "init", "workspace")
+        timings.wrap(sandbox.Workspace, "add_file", "workspace")
+        timings.wrap(sandbox.Workspace, "link", "workspace")
+        timings.wrap(sandbox.Workspace, "clean", "workspace")
+        timings.wrap(sandbox.Judge, "compile", "compile")
+        timings.wrap_case(sandbox.Judge, "check")
+        timings.wrap(sandbox.Judge, "verdict", "compare")
+        timings.wrap(Attempt, "save", "persist")
+        timings.wrap(sandbox.Judge, "send_case", "notify")
+        timings.wrap(sandbox.Judge, "send_status", "notify")
+        timings.wrap(sandbox.Judge, "send_compile", "notify")
+
+        latencies = []
+        statuses = {}
+        start = time.perf_counter()
+
+        try:
+            # tests of the problem are extracted before the first attempt
+            sandbox.tests_store.get(problem)
+
+            for _ in range(attempts):
+                attempt = Attempt.objects.create(author=user, problem=problem, language=language, code=LANGUAGES[language.short].get("code"))
+                attempt_start = time.perf_counter()
+                judge = sandbox.Judge(attempt)
+                judge.run()
+                latencies.append((time.perf_counter() - attempt_start) * 1000)
+                statuses[attempt.status] = statuses.get(attempt.status, 0) + 1
+        finally:
+            timings.restore()
+
+        elapsed = time.perf_counter() - start
+
+        return {
+            "target": "judge",
+            "language": language.short,
+            "shape": shape,
+            "tests": SHAPES.get(shape)[0],
+            "attempts": attempts,
+            "statuses": statuses,
+            "seconds": round(elapsed, 3),
+            "attempts_per_sec": round(attempts / elapsed, 3) if elapsed else 0,
+            "latency": summary(latencies),
+            "stages": timings.report(),
+        }
+
+    def measure_sandbox(self, sandbox, language, attempts: int):
+        """
+        measure_sandbox(...) -> Latency of the Sandbox.run playground of the language
+        """
+        latencies = []
+        statuses = {}
+        start = time.perf_counter()
+
+        for index in range(attempts):
+            workspace = sandbox.Workspace(name=f"benchmark-{language.short}-{index}")
+            workspace.init()
+            workspace.add_file(language.file, LANGUAGES[language.short].get("code"))
+            workspace.link(language.sandbox)
+            run_start = time.perf_counter()
+            response = sandbox.Sandbox(workspace, language, "1 2 3\n").run()
+            latencies.append((time.perf_counter() - run_start) * 1000)
+            statuses[response.get("status")] = statuses.get(response.get("status"), 0) + 1
+            workspace.clean()
+
+        elapsed = time.perf_counter() - start
+
+        return {
+            "target": "sandbox",
+            "language": language.short,
+            "attempts": attempts,
+            "statuses": statuses,
+            "seconds": round(elapsed, 3),
+            "attempts_per_sec": round(attempts / elapsed, 3) if elapsed else 0,
+            "latency": summary(latencies),
+        }
@@ -0,0 +1,204 @@
+import os
+import time
+import signal
+import threading
+import multiprocessing
+import redis
+from django.conf import settings
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import connections, close_old_connections
+from django.core.management.base import BaseCommand
+
+from utils.queue import JudgeQueue
+from utils.metrics import metrics
+from utils.workspaces import WorkspacePool
+
+
+class Command(BaseCommand):
+    help = "Run judge worker processes which check attempts from the judge queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=settings.JUDGE_WORKERS)
+        parser.add_argument(
+            "--languages",
+            default=",".join(settings.JUDGE_NODE.get("languages")),
+            help="Comma separated short names of languages judged by this node, languages with sandbox binaries by default",
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options.get("concurrency"))
+        languages = node_languages([short for short in options.get("languages").split(",") if short])
+
+        if not languages:
+            self.stderr.write("[JUDGE]: no languages can be judged by this node.")
+            return
+
+        # workspaces of workers which were killed while judging
+        WorkspacePool().sweep(settings.JUDGE_WORKSPACES.get("stale"))
+
+        # child processes must open their own database connections
+        connections.close_all()
+
+        context = multiprocessing.get_context("fork")
+        workers = [
+            context.Process(target=work, args=(index, languages), name=f"judge-worker-{index}")
+            for index in range(concurrency)
+        ]
+
+        for worker in workers:
+            worker.start()
+
+        self.stdout.write(
+            f"[JUDGE]: {concurrency} workers of {settings.JUDGE_NODE.get('name')} started "
+            f"({', '.join(language.get('short') for language in languages)})."
+        )
+
+        def stop(signum, frame):
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+
+        signal.signal(signal.SIGTERM, stop)
+
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            stop(signal.SIGINT, None)
+            for worker in workers:
+                worker.join()
+
+        self.stdout.write("[JUDGE]: workers stopped.")
+
+
+def node_languages(shorts: list):
+    """
+    node_languages(shorts) -> Languages judged by this node, [{"uuid", "short"}]
+
+    shorts - short names of languages, empty for all languages whose sandbox binaries are on this node
+    """
+    from problems.models import Language
+
+    languages = Language.objects.all()
+    if shorts:
+        languages = languages.filter(short__in=shorts)
+    return [
+        {"uuid": str(language.uuid), "short": language.short}
+        for language in languages
+        if shorts or os.path.isfile(language.sandbox)
+    ]
+
+
+def work(index: int, languages: list):
+    from users.models import User
+    from problems.models import Attempt
+    from websocket.functions import run_sandbox
+
+    queue = JudgeQueue(languages=[language.get("uuid") for language in languages])
+    info = {
+        "node": settings.JUDGE_NODE.get("name"),
+        "pid": os.getpid(),
+        "cores": os.cpu_count(),
+        "parallel_cases": settings.JUDGE_PARALLEL_CASES,
+        "languages": [language.get("short") for language in languages],
+    }
+    # ids of attempts leased by this worker
+    current = []
+    stopped = threading.Event()
+    running = True
+    sent = 0
+
+    def stop(signum, frame):
+        nonlocal running
+        running = False
+
+    def heartbeat():
+        while True:
+            try:
+                queue.heartbeat(info, list(current))
+                # attempts of dead workers of any node
+                requeued, dropped = queue.requeue()
+                if requeued:
+                    metrics.inc("judge_requeued_total", len(requeued))
+                    print(f"[JUDGE]:judge-worker-{index}: attempts of dead workers are queued again.", requeued)
+                if dropped:
+                    Attempt.objects.filter(uuid__in=dropped, status="running").update(status="je")
+                    print(f"[ERROR]:judge-worker-{index}: attempts are dropped after {queue.max_requeues} requeues.", dropped)
+                # attempts which no worker takes
+                expired = queue.expire()
+                if expired:
+                    print(f"[ERROR]:judge-worker-{index}: attempts are dropped after waiting {queue.queued_timeout} seconds.", expired)
+            except Exception as e:
+                print(f"[ERROR]:judge-worker-{index}: heartbeat failed.", e)
+
+            if stopped.wait(settings.JUDGE_NODE.get("heartbeat")):
+                break
+
+    # finish current attempt before exit
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    beater = threading.Thread(target=heartbeat, name=f"judge-worker-{index}-heartbeat", daemon=True)
+    beater.start()
+
+    while running:
+        try:
+            payload = queue.pop(timeout=1)
+        except redis.RedisError as e:
+            # queue of other nodes, wait until it is available again
+            print(f"[ERROR]:judge-worker-{index}: can not pop from the judge queue.", e)
+            time.sleep(1)
+            continue
+
+        if not payload:
+            # gauges of idle workers are not stale
+            metrics.maybe_flush()
+            continue
+
+        current.append(payload.get("id"))
+
+        if payload.get("queued"):
+            metrics.observe("judge_queue_wait_seconds", max(0, time.time() - payload.get("queued")))
+
+        # attempts behind this one moved forward
+        if time.monotonic() - sent >= settings.JUDGE_SCHEDULER.get("positions_interval"):
+            send_positions(queue)
+            sent = time.monotonic()
+
+        close_old_connections()
+
+        try:
+            user = User.objects.filter(pk=payload.get("user")).first()
+            if user:
+                run_sandbox(user, payload.get("problem"), payload.get("language"), payload.get("code"), payload.get("id"))
+        except Exception as e:
+            print(f"[ERROR]:judge-worker-{index}:", e)
+        finally:
+            queue.done(payload)
+            current.remove(payload.get("id"))
+
+    stopped.set()
+    beater.join()
+    queue.unregister()
+    metrics.flush()
+
+
+def send_positions(queue: JudgeQueue):
+    """
+    send_positions(queue) -> Send positions of queued attempts to their authors
+    """
+    try:
+        channel_layer = get_channel_layer()
+        for user, positions in queue.positions().items():
+            async_to_sync(channel_layer.group_send)(
+                f"user_{user}",
+                {
+                    "type": "attempt_queue",
+                    "data": {
+                        "positions": positions,
+                    },
+                }
+            )
+    except Exception as e:
+        print("[ERROR]:can not send queue positions.", e)
@@ -0,0 +1,23 @@
+from django.db import transaction
+from django.core.management.base import BaseCommand
+
+from problems.models import Problem, Attempt, ProblemStats, count_problem_stats, acceptance
+
+
+class Command(BaseCommand):
+    help = "Count statistics of all problems again from their attempts"
+
+    def handle(self, *args, **options):
+        stats = count_problem_stats(Attempt.objects.all())
+        empty = {"attempts": 0, "accepted": 0, "solvers": 0, "verdicts": {}}
+
+        rows = []
+        for problem in Problem.objects.values_list("id", flat=True):
+            counts = stats.get(problem, empty)
+            rows.append(ProblemStats(problem_id=problem, acceptance=acceptance(counts.get("accepted"), counts.get("attempts")), **counts))
+
+        with transaction.atomic():
+            ProblemStats.objects.all().delete()
+            ProblemStats.objects.bulk_create(rows, batch_size=1000)
+
+        self.stdout.write(f"[STATS]: statistics of {ProblemStats.objects.count()} problems are rebuilt.")
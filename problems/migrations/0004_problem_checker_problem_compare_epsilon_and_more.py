@@ -0,0 +1,29 @@
+# Generated by Django 6.1.2 on 2026-10-18 15:13
+
+import problems.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0003_top_uuid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='checker',
+            field=models.FileField(blank=True, null=True, upload_to=problems.models.upload_to_checker),
+        ),
+        migrations.AddField(
+            model_name='problem',
+            name='compare_epsilon',
+            field=models.FloatField(default=1e-06),
+        ),
+        migrations.AddField(
+            model_name='problem',
+            name='compare_mode',
+            field=models.CharField(choices=[('exact', 'Exact'), ('tokens', 'Tokens'), ('float', 'Float'), ('checker', 'Checker')], default='exact', max_length=16),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.1.2 on 2026-10-18 15:36
+
+import problems.models
+from django.db import migrations, models
+
+
+def checker_judge_type(apps, schema_editor):
+    # problems with compare mode "checker" were checked by the checker program
+    Problem = apps.get_model("problems", "Problem")
+    Problem.objects.filter(compare_mode="checker").update(judge_type="checker")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0004_problem_checker_problem_compare_epsilon_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='interactor',
+            field=models.FileField(blank=True, null=True, upload_to=problems.models.upload_to_interactor),
+        ),
+        migrations.AddField(
+            model_name='problem',
+            name='judge_type',
+            field=models.CharField(choices=[('standard', 'Standard'), ('checker', 'Checker'), ('interactive', 'Interactive')], default='standard', max_length=16),
+        ),
+        migrations.RunPython(checker_judge_type, migrations.RunPython.noop),
+    ]
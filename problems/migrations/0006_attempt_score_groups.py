@@ -0,0 +1,23 @@
+# Generated by Django 6.1.2 on 2026-10-18 15:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0005_problem_judge_type_interactor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='groups',
+            field=models.JSONField(blank=True, default=list, null=True),
+        ),
+        migrations.AddField(
+            model_name='attempt',
+            name='score',
+            field=models.FloatField(default=0),
+        ),
+    ]
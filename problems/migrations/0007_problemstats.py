@@ -0,0 +1,71 @@
+# Generated by Django 6.1.2 on 2026-10-18 15:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+# frozen copy of problems.models.count_problem_stats, the migration does not change with the model
+def count_problem_stats(attempts):
+    attempts = attempts.exclude(status="running").exclude(status=None).order_by()
+    stats = {}
+
+    for row in attempts.values("problem").annotate(
+        total=Count("id"),
+        accepted=Count("id", filter=Q(status="ac")),
+        solvers=Count("author", filter=Q(status="ac"), distinct=True),
+    ):
+        stats[row.get("problem")] = {
+            "attempts": row.get("total"),
+            "accepted": row.get("accepted"),
+            "solvers": row.get("solvers"),
+            "verdicts": {},
+        }
+
+    for row in attempts.values("problem", "status").annotate(count=Count("id")):
+        stats[row.get("problem")]["verdicts"][row.get("status")] = row.get("count")
+
+    return stats
+
+
+def acceptance(accepted, attempts):
+    if attempts == 0:
+        return 0
+    return round((accepted / attempts) * 100, 1)
+
+
+def count_stats(apps, schema_editor):
+    # statistics of attempts checked before the table
+    Attempt = apps.get_model("problems", "Attempt")
+    ProblemStats = apps.get_model("problems", "ProblemStats")
+    stats = count_problem_stats(Attempt.objects.all())
+    ProblemStats.objects.bulk_create(
+        [
+            ProblemStats(problem_id=problem, acceptance=acceptance(counts.get("accepted"), counts.get("attempts")), **counts)
+            for problem, counts in stats.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0006_attempt_score_groups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProblemStats',
+            fields=[
+                ('problem', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='problems.problem')),
+                ('attempts', models.IntegerField(default=0)),
+                ('accepted', models.IntegerField(default=0)),
+                ('solvers', models.IntegerField(db_index=True, default=0)),
+                ('verdicts', models.JSONField(blank=True, default=dict)),
+                ('acceptance', models.FloatField(db_index=True, default=0)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(count_stats, migrations.RunPython.noop),
+    ]
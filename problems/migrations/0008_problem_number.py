@@ -0,0 +1,28 @@
+# Generated by Django 6.1.2 on 2026-10-18 16:00
+
+from django.db import migrations, models
+
+
+def number_problems(apps, schema_editor):
+    # existing problems are numbered in the order of creation, as the row number by id was
+    Problem = apps.get_model("problems", "Problem")
+    problems = list(Problem.objects.order_by("id").only("id"))
+    for number, problem in enumerate(problems, start=1):
+        problem.number = number
+    Problem.objects.bulk_update(problems, ["number"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0007_problemstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='number',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(number_problems, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.1.2 on 2026-10-18 16:03
+
+import uuid
+from django.db import migrations
+
+
+def fix_uuids(apps, schema_editor):
+    # uuids were saved to char columns, invalid and repeated values get new uuids before the columns become unique uuid columns.
+    # databases without uuid type keep uuids as 32 hex digits, so values are saved in the format of the new column
+    native = schema_editor.connection.features.has_native_uuid_field
+
+    for name in ("Tag", "Language", "Problem", "Attempt"):
+        Model = apps.get_model("problems", name)
+        seen = set()
+        changed = []
+
+        # the oldest row keeps a repeated uuid
+        for row in Model.objects.order_by("id").only("id", "uuid").iterator(chunk_size=2000):
+            try:
+                value = uuid.UUID(str(row.uuid).strip())
+            except ValueError:
+                value = None
+            if value is None or value in seen:
+                value = uuid.uuid4()
+            seen.add(value)
+
+            value = str(value) if native else value.hex
+            if value != row.uuid:
+                row.uuid = value
+                changed.append(row)
+
+        Model.objects.bulk_update(changed, ["uuid"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0008_problem_number'),
+    ]
+
+    operations = [
+        migrations.RunPython(fix_uuids, migrations.RunPython.noop),
+    ]
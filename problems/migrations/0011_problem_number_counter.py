@@ -0,0 +1,43 @@
+# Generated by Django 6.1.2 on 2026-10-18 16:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def number_problems(apps, schema_editor):
+    # problems created at the same time could get the same number, problems are numbered again without gaps
+    Problem = apps.get_model("problems", "Problem")
+    Counter = apps.get_model("problems", "Counter")
+    problems = sorted(Problem.objects.only("id", "number"), key=lambda problem: (problem.number == 0, problem.number, problem.id))
+    for number, problem in enumerate(problems, start=1):
+        problem.number = number
+    Problem.objects.bulk_update(problems, ["number"], batch_size=1000)
+    Counter.objects.update_or_create(name="problem_number", defaults={"value": len(problems)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0010_uuid_fields_and_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counter',
+            fields=[
+                ('name', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('value', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='problem',
+            name='number',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(number_problems, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='problem',
+            constraint=models.UniqueConstraint(condition=models.Q(('number__gt', 0)), fields=('number',), name='problem_number_unique'),
+        ),
+    ]
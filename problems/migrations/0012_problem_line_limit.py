@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def remove_line_limits(apps, schema_editor):
+    # line_limit was not checked before, existing problems keep output without a line limit
+    Problem = apps.get_model("problems", "Problem")
+    Problem.objects.update(line_limit=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0011_problem_number_counter'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_line_limits, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,8 @@
+import os
 from uuid import uuid4
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, Q, F, Max
+from django.dispatch import receiver
 
 from users.models import User
 
@@ -11,13 +14,69 @@ PROBLEM_DIFFICULTY = (
 )
 
 
+COMPARE_MODES = (
+    ("exact", "Exact"),
+    ("tokens", "Tokens"),
+    ("float", "Float"),
+    ("checker", "Checker"),
+)
+
+
+JUDGE_TYPES = (
+    ("standard", "Standard"),
+    ("checker", "Checker"),
+    ("interactive", "Interactive"),
+)
+
+
+def count_problem_stats(attempts):
+    """
+    count_problem_stats(attempts) -> {problem_id: {"attempts", "accepted", "solvers", "verdicts"}} of the attempts
+
+    attempts - QuerySet of Attempt, checked attempts are counted
+    """
+    attempts = attempts.exclude(status="running").exclude(status=None).order_by()
+    stats = {}
+
+    for row in attempts.values("problem").annotate(
+        total=Count("id"),
+        accepted=Count("id", filter=Q(status="ac")),
+        solvers=Count("author", filter=Q(status="ac"), distinct=True),
+    ):
+        stats[row.get("problem")] = {
+            "attempts": row.get("total"),
+            "accepted": row.get("accepted"),
+            "solvers": row.get("solvers"),
+            "verdicts": {},
+        }
+
+    for row in attempts.values("problem", "status").annotate(count=Count("id")):
+        stats[row.get("problem")]["verdicts"][row.get("status")] = row.get("count")
+
+    return stats
+
+
+def acceptance(accepted: int, attempts: int):
+    if attempts == 0:
+        return 0
+    return round((accepted / attempts) * 100, 1)
+
+
 def upload_to_tests(instance: "Problem", filename):
     return f"files/problems/{instance.uuid}/tests.zip"
 
 
+# extension of the source is kept, the judge compiles checker.c, checker.cpp and runs checker.py
+def upload_to_checker(instance: "Problem", filename):
+    return f"files/problems/{instance.uuid}/checker{os.path.splitext(filename)[1]}"
+
+
+def upload_to_interactor(instance: "Problem", filename):
+    return f"files/problems/{instance.uuid}/interactor{os.path.splitext(filename)[1]}"
+
+
 class Tag(models.Model):
     uuid = models.UUIDField(default=uuid4, editable=False, unique=True)
-    uuid = models.CharField(max_length=100, default=uuid4)
     name = models.CharField(max_length=100)
 
     def __str__(self):
@@ -25,7 +84,7 @@ class Tag(models.Model):
 
 
 class Language(models.Model):
-    uuid = models.CharField(max_length=100, default=uuid4)
+    uuid = models.UUIDField(default=uuid4, editable=False, unique=True)
     name = models.CharField(max_length=100)
     short = models.CharField(max_length=100)
     icon = models.CharField(max_length=100)
@@ -52,7 +111,9 @@ class Language(models.Model):
     
 
 class Problem(models.Model):
-    uuid = models.CharField(max_length=100, default=uuid4)
+    uuid = models.UUIDField(default=uuid4, editable=False, unique=True)
+    # 1, 2, 3, ... in the order of creation, numbers stay without gaps when problems are deleted
+    number = models.PositiveIntegerField(default=0, editable=False)
     author = models.ForeignKey(User, on_delete=models.CASCADE, default=1)
     title = models.CharField(max_length=100)
     description = models.JSONField(default=dict, null=True, blank=True)
@@ -66,24 +127,102 @@ class Problem(models.Model):
     time_limit = models.IntegerField(default=1)
     memory_limit = models.IntegerField(default=64)
     code_limit = models.IntegerField(default=10000)
-    output_limit = models.IntegerField(default=1000)
-    line_limit = models.IntegerField(default=1000)
+    output_limit = models.IntegerField(default=1000) # kilobytes
+    line_limit = models.IntegerField(default=1000) # lines of output, 0 - no limit
 
     language = models.CharField(max_length=10)
     tags = models.ManyToManyField(Tag, related_name="problem_tags", blank=True)
     languages = models.ManyToManyField(Language, related_name="problem_allowed_languages", blank=True)
     tests = models.FileField(upload_to=upload_to_tests, null=True, blank=True)
 
+    judge_type = models.CharField(max_length=16, choices=JUDGE_TYPES, default="standard")
+    compare_mode = models.CharField(max_length=16, choices=COMPARE_MODES, default="exact")
+    compare_epsilon = models.FloatField(default=1e-6)
+    checker = models.FileField(upload_to=upload_to_checker, null=True, blank=True)
+    interactor = models.FileField(upload_to=upload_to_interactor, null=True, blank=True)
+
     is_public = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     with_link = models.BooleanField(default=False)
 
+    class Meta:
+        constraints = [
+            # problems created by bulk_create without numbers have 0
+            models.UniqueConstraint(fields=["number"], condition=Q(number__gt=0), name="problem_number_unique"),
+        ]
+
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding or self.number:
+            return super().save(*args, **kwargs)
+
+        # numbers are given under the lock of the counter, problems created at the same time get different numbers
+        with transaction.atomic():
+            counter = Counter.lock(PROBLEM_NUMBER)
+            # problems created by bulk_create with numbers do not change the counter
+            last = Problem.objects.aggregate(last=Max("number")).get("last") or 0
+            self.number = max(counter.value, last) + 1
+            super().save(*args, **kwargs)
+            counter.value = self.number
+            counter.save(update_fields=["value"])
+
+
+class Counter(models.Model):
+    """
+    Named counter, the row is locked by transactions which change what it counts.
+    """
+    name = models.CharField(max_length=64, primary_key=True)
+    value = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+    @classmethod
+    def lock(cls, name: str):
+        """
+        lock(name) -> Counter locked until the end of the transaction, it is created when it does not exist
+        """
+        counter, _ = cls.objects.select_for_update().get_or_create(name=name)
+        return counter
+
+
+# the last number of problems
+PROBLEM_NUMBER = "problem_number"
+
+
+def renumber_problems(start: int):
+    """
+    renumber_problems(start) -> Number problems from start without gaps, problems before start are not changed
+    """
+    start = max(1, start)
+    with transaction.atomic():
+        counter = Counter.lock(PROBLEM_NUMBER)
+        changed = []
+        for number, problem in enumerate(Problem.objects.filter(number__gte=start).order_by("number", "id").only("id", "number"), start=start):
+            if problem.number != number:
+                problem.number = number
+                changed.append(problem)
+
+        # changed problems are moved above all numbers first, so the unique constraint holds after every row
+        if changed:
+            offset = Problem.objects.aggregate(last=Max("number")).get("last")
+            Problem.objects.filter(pk__in=[problem.pk for problem in changed]).update(number=F("number") + offset)
+            Problem.objects.bulk_update(changed, ["number"], batch_size=1000)
+
+        counter.value = Problem.objects.aggregate(last=Max("number")).get("last") or 0
+        counter.save(update_fields=["value"])
+
+
+@receiver(models.signals.post_delete, sender=Problem)
+def problem_deleted(sender, instance: Problem, **kwargs):
+    # problems after the deleted one move back, also when many problems are deleted by one query
+    renumber_problems(instance.number)
+
 
 class Attempt(models.Model):
-    uuid = models.CharField(max_length=100, default=uuid4)
+    uuid = models.UUIDField(default=uuid4, editable=False, unique=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     problem = models.ForeignKey(Problem, on_delete=models.CASCADE)
     language = models.ForeignKey(Language, on_delete=models.CASCADE)
@@ -94,10 +233,21 @@ class Attempt(models.Model):
     length = models.IntegerField(default=0, null=True, blank=True)
     cases = models.JSONField(default=list, null=True, blank=True)
     test = models.IntegerField(default=0)
+    # points of passed test groups and results of the groups, problems without groups have no score
+    score = models.FloatField(default=0)
+    groups = models.JSONField(default=list, null=True, blank=True)
     error = models.TextField(null=True, blank=True)
     output = models.TextField(null=True, blank=True)
     created = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # attempts of a user to a problem, newest first
+            models.Index(fields=["author", "problem", "-id"], name="attempt_author_problem_idx"),
+            # statistics of a problem by verdict
+            models.Index(fields=["problem", "status"], name="attempt_problem_status_idx"),
+        ]
+
     def __str__(self):
         return str(self.uuid)
     
@@ -112,3 +262,46 @@ class Top(models.Model):
 
     def __str__(self):
         return self.author.username
+
+
+class ProblemStats(models.Model):
+    """
+    Counters of checked attempts of the problem, updated by the judge when an attempt is checked.
+    Rebuilt from attempts with the rebuild_problem_stats command.
+    """
+    problem = models.OneToOneField(Problem, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    attempts = models.IntegerField(default=0)
+    accepted = models.IntegerField(default=0)
+    # users with an accepted attempt
+    solvers = models.IntegerField(default=0, db_index=True)
+    # attempts by status, {"ac": 10, "wa": 4}
+    verdicts = models.JSONField(default=dict, blank=True)
+    # percent of accepted attempts
+    acceptance = models.FloatField(default=0, db_index=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return str(self.problem)
+
+    @classmethod
+    def record(cls, attempt: Attempt):
+        """
+        record(attempt) -> Count the checked attempt, the row of the problem is locked while it is changed
+        """
+        if attempt.status in (None, "running"):
+            return
+
+        # the first accepted attempt of the user
+        solver = attempt.status == "ac" and not Attempt.objects.filter(
+            author=attempt.author, problem=attempt.problem, status="ac"
+        ).exclude(pk=attempt.pk).exists()
+
+        with transaction.atomic():
+            cls.objects.get_or_create(problem=attempt.problem)
+            stats = cls.objects.select_for_update().get(problem=attempt.problem)
+            stats.attempts += 1
+            stats.accepted += attempt.status == "ac"
+            stats.solvers += solver
+            stats.verdicts[attempt.status] = stats.verdicts.get(attempt.status, 0) + 1
+            stats.acceptance = acceptance(stats.accepted, stats.attempts)
+            stats.save()
@@ -1,6 +1,9 @@
 from rest_framework import serializers
-from django.db.models import Count, Q
+from django.db.models import F, Value, Exists, OuterRef
+from django.db.models.functions import Coalesce
 
+from utils.cache import VerdictCache
+from utils.progress import problem_status
 from users.serializers import ProfileSerializer
 
 from .models import (
@@ -8,7 +11,7 @@ from .models import (
     Language,
     Attempt,
     Tag,
-    Top,
+    ProblemStats,
 )
 
 
@@ -26,12 +29,45 @@ class LanguageModelSerializer(serializers.ModelSerializer):
         fields = ("id", "uuid", "name", "short", "icon", )
 
 
+def problem_stats(problem: Problem):
+    """
+    problem_stats(problem) -> ProblemStats of the problem, empty statistics when nothing is counted yet
+    """
+    try:
+        return problem.stats
+    except ProblemStats.DoesNotExist:
+        return ProblemStats(problem=problem)
+
+
+def annotate_problems(queryset, user=None, progress: tuple = None):
+    """
+    annotate_problems(queryset, user, progress) -> Problems with their author, tags, statistics and status of the user
+
+    ProblemsModelSerializer reads the annotations, so a page of problems is serialized with a constant number of queries.
+    Problems can be ordered by "acceptance" and "solvers".
+    progress - (attempted, solved) of utils.progress.ProgressIndex, status is annotated only without it
+    """
+    attempts = Attempt.objects.filter(problem=OuterRef("pk")).order_by().values("problem")
+    queryset = queryset.select_related("author", "stats").prefetch_related("tags").annotate(
+        acceptance=Coalesce(F("stats__acceptance"), Value(0.0)),
+        solvers=Coalesce(F("stats__solvers"), Value(0)),
+    )
+
+    if user and user.is_authenticated and progress is None:
+        queryset = queryset.annotate(
+            attempted=Exists(attempts.filter(author=user)),
+            solved=Exists(attempts.filter(author=user, status="ac")),
+        )
+    return queryset
+
+
 class ProblemsModelSerializer(serializers.ModelSerializer):
     author = ProfileSerializer()
     tags = TagModelSerializer(many=True)
-    order = serializers.IntegerField(read_only=True)
+    order = serializers.IntegerField(source="number", read_only=True)
     status = serializers.SerializerMethodField("status_func")
     acceptance = serializers.SerializerMethodField("acceptance_func")
+    solvers = serializers.SerializerMethodField("solvers_func")
 
     def status_func(self, obj: Problem):
         request = self.context.get("request")
@@ -46,6 +82,16 @@ class ProblemsModelSerializer(serializers.ModelSerializer):
         
         if not user.is_authenticated:
             return "not_attempted"
+
+        # progress of the user from utils.progress.ProgressIndex
+        if self.context.get("progress") is not None:
+            return problem_status(self.context.get("progress"), obj.pk)
+
+        # annotated by annotate_problems
+        if hasattr(obj, "attempted"):
+            if obj.solved:
+                return "solved"
+            return "attempted" if obj.attempted else "not_attempted"
         
         attempts = Attempt.objects.filter(author=user, problem=obj)
 
@@ -58,37 +104,26 @@ class ProblemsModelSerializer(serializers.ModelSerializer):
                 return "solved"
 
     def acceptance_func(self, obj: Problem):
-        attempts = Attempt.objects.filter(problem=obj).aggregate(
-            total=Count('id'),
-            accepted=Count('id', filter=Q(status='ac'))
-        )
-        total = attempts.get('total', 0)
-        accepted = attempts.get('accepted', 0)
+        return problem_stats(obj).acceptance
 
-        if total == 0:
-            return 0
-        return round((accepted / total) * 100, 1)
+    def solvers_func(self, obj: Problem):
+        return problem_stats(obj).solvers
 
 
     class Meta:
         model = Problem
-        fields = ("order", "uuid", "title", "author", "status", "acceptance", "tags", "rank", "difficulty", "time_limit", "memory_limit", "is_public", )
+        fields = ("order", "uuid", "title", "author", "status", "acceptance", "solvers", "tags", "rank", "difficulty", "time_limit", "memory_limit", "is_public", )
         read_only_fields = ("order",)
 
-    def to_representation(self, instance):
-        data = super().to_representation(instance)
-        author_data = ProfileSerializer(instance.author, context=self.context).data
-        data['author'] = author_data
-        return data
-
 
 class ProblemModelSerializer(serializers.ModelSerializer):
     author = ProfileSerializer()
     tags = TagModelSerializer(many=True)
     languages = LanguageModelSerializer(many=True)
-    order = serializers.IntegerField(read_only=True)
+    order = serializers.IntegerField(source="number", read_only=True)
     status = serializers.SerializerMethodField("status_func")
     acceptance = serializers.SerializerMethodField("acceptance_func")
+    solvers = serializers.SerializerMethodField("solvers_func")
 
     def status_func(self, obj: Problem):
         request = self.context.get("request")
@@ -104,31 +139,29 @@ class ProblemModelSerializer(serializers.ModelSerializer):
         if not user.is_authenticated:
             return "not_attempted"
 
-        top = Top.objects.filter(author=user, problem=obj)
+        # progress of the user from utils.progress.ProgressIndex
+        if self.context.get("progress") is not None:
+            return problem_status(self.context.get("progress"), obj.pk)
+
+        attempts = Attempt.objects.filter(author=user, problem=obj)
 
-        if not top.exists():
+        if not attempts.exists():
             return "not_attempted"
         else:
-            if not top.filter(attempt__status="ac").exists():
+            if not attempts.filter(status="ac").exists():
                 return "attempted"
             else:
                 return "solved"
             
     def acceptance_func(self, obj: Problem):
-        attempts = Attempt.objects.filter(problem=obj).aggregate(
-            total=Count('id'),
-            accepted=Count('id', filter=Q(status='ac'))
-        )
-        total = attempts.get('total', 0)
-        accepted = attempts.get('accepted', 0)
+        return problem_stats(obj).acceptance
 
-        if total == 0:
-            return 0
-        return round((accepted / total) * 100, 1)
+    def solvers_func(self, obj: Problem):
+        return problem_stats(obj).solvers
     
     class Meta:
         model = Problem
-        fields = ("order", "uuid", "title", "author", "status", "acceptance", "tags", "description", "hint", "input", "output", "samples", "rank", "difficulty", "time_limit", "memory_limit", "language", "languages", "with_link", "is_public", )
+        fields = ("order", "uuid", "title", "author", "status", "acceptance", "solvers", "tags", "description", "hint", "input", "output", "samples", "rank", "difficulty", "time_limit", "memory_limit", "line_limit", "judge_type", "compare_mode", "compare_epsilon", "language", "languages", "with_link", "is_public", )
         read_only_fields = ("order",)
 
     def to_representation(self, instance):
@@ -141,7 +174,30 @@ class ProblemModelSerializer(serializers.ModelSerializer):
 class EditProblemSerializer(serializers.ModelSerializer):
     class Meta:
         model = Problem
-        fields = ("title", "description", "hint", "input", "output", "samples", "difficulty", "time_limit", "memory_limit", "language", "languages", "tags", "with_link", )
+        fields = ("title", "description", "hint", "input", "output", "samples", "difficulty", "time_limit", "memory_limit", "line_limit", "judge_type", "compare_mode", "compare_epsilon", "language", "languages", "tags", "with_link", )
+
+    def update(self, instance: Problem, validated_data):
+        limits = self.limits(instance)
+        instance = super().update(instance, validated_data)
+
+        # cached results of attempts are wrong with new limits, tests, judge type or compare mode
+        if limits != self.limits(instance):
+            VerdictCache().invalidate(instance)
+        return instance
+
+    def limits(self, instance: Problem):
+        return (
+            instance.time_limit,
+            instance.memory_limit,
+            instance.output_limit,
+            instance.line_limit,
+            instance.tests.name,
+            instance.judge_type,
+            instance.compare_mode,
+            instance.compare_epsilon,
+            instance.checker.name,
+            instance.interactor.name,
+        )
 
 
 class AttemptsModelSerializer(serializers.ModelSerializer):
@@ -149,4 +205,4 @@ class AttemptsModelSerializer(serializers.ModelSerializer):
     language = LanguageModelSerializer()
     class Meta:
         model = Attempt
-        fields = ("id", "uuid", "status", "language", "code", "time", "memory", "error", "test", "cases", "created", )
+        fields = ("id", "uuid", "status", "language", "code", "time", "memory", "error", "test", "cases", "score", "groups", "created", )
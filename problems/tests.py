@@ -1,3 +1,1336 @@
-from django.test import TestCase
+import io
+import os
+import json
+import time
+import shutil
+import zipfile
+import tempfile
+import threading
+import subprocess
+import redis
+from uuid import uuid4
+from unittest import mock, skipUnless
+from django.db import IntegrityError, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from utils.secrets import decode
+from utils.store import TestStore, TestsError, ProgramStore, tests_hash, forget_hashes, hashes
+from utils.checker import CHUNK_SIZE, ExactComparator, TokensComparator, FloatComparator, tokens, get_comparator
+from utils.workspaces import WorkspacePool, WorkspaceError
+from utils.zygote import split_command, load_seccomp
+from utils.queue import JudgeQueue
+from utils.cache import CompileCache, VerdictCache
+from utils.blobs import BlobStore
+from utils.progress import ProgressIndex
+from utils.metrics import metrics, labels_key
+from users.models import User
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+# lua scripts of fakeredis
+try:
+    import lupa
+except ImportError:
+    lupa = None
+
+from .models import (
+    Problem,
+    Language,
+    Attempt,
+    Tag,
+    ProblemStats,
+    Counter,
+    PROBLEM_NUMBER,
+)
+
+
+# statuses are read from the database, redis of the developer is not used
+@override_settings(PROBLEM_PROGRESS={"enabled": False})
+class ProblemsListQueriesTest(TestCase):
+    """
+    Problems list is serialized with a constant number of queries: count, page and tags of the page.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="alice", gender="female", role="user")
+        author = User.objects.create(username="bob", gender="male", role="user")
+        language = Language.objects.create(name="Python", short="py", icon="py", type="interpreted", file="main.py", run="python3")
+        tags = [Tag.objects.create(name=f"tag-{index}") for index in range(3)]
+
+        for index in range(15):
+            problem = Problem.objects.create(title=f"problem-{index}", difficulty="easy", language="uz", author=author, is_public=True)
+            problem.tags.set(tags[:index % 3 + 1])
+
+            # problem-0 is solved by alice, problem-1 is attempted, others are not attempted
+            if index == 0:
+                Attempt.objects.create(author=cls.user, problem=problem, language=language, status="wa")
+                Attempt.objects.create(author=cls.user, problem=problem, language=language, status="ac")
+            if index == 1:
+                Attempt.objects.create(author=cls.user, problem=problem, language=language, status="tle")
+            if index == 2:
+                Attempt.objects.create(author=author, problem=problem, language=language, status="ac")
+
+        call_command("rebuild_problem_stats", stdout=io.StringIO())
+
+    def get_problems(self, client: APIClient, query: str = ""):
+        response = client.get(f"/api/v1/problems/{query}")
+        self.assertEqual(response.status_code, 200)
+        return {
+            problem.get("title"): problem
+            for problem in json.loads(decode(response.json().get("data"))).get("problems")
+        }
+
+    def test_anonymous(self):
+        with self.assertNumQueries(3):
+            problems = self.get_problems(APIClient())
+
+        self.assertEqual(len(problems), 15)
+        self.assertEqual(problems["problem-0"]["status"], "not_attempted")
+        self.assertEqual(problems["problem-0"]["acceptance"], 50.0)
+        self.assertEqual(problems["problem-2"]["acceptance"], 100.0)
+        self.assertEqual(problems["problem-3"]["acceptance"], 0)
+        self.assertEqual(len(problems["problem-4"]["tags"]), 2)
+        self.assertEqual(problems["problem-4"]["author"]["username"], "bob")
+
+    def test_authenticated(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with self.assertNumQueries(3):
+            problems = self.get_problems(client)
+
+        self.assertEqual(problems["problem-0"]["status"], "solved")
+        self.assertEqual(problems["problem-1"]["status"], "attempted")
+        self.assertEqual(problems["problem-1"]["acceptance"], 0)
+        self.assertEqual(problems["problem-2"]["status"], "not_attempted")
+
+    def test_status_filters(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        self.assertEqual(list(self.get_problems(client, "?status=solved")), ["problem-0"])
+        self.assertEqual(list(self.get_problems(client, "?status=unsolved")), ["problem-1"])
+        self.assertEqual(len(self.get_problems(client, "?status=not_attempted")), 13)
+        self.assertNotIn("problem-0", self.get_problems(client, "?hide_solved=true"))
+        self.assertEqual(len(self.get_problems(client, "?hide_solved=true")), 14)
+
+    def test_ordering(self):
+        with self.assertNumQueries(3):
+            problems = list(self.get_problems(APIClient(), "?ordering=-acceptance"))
+
+        self.assertEqual(problems[:2], ["problem-2", "problem-0"])
+
+        problems = list(self.get_problems(APIClient(), "?ordering=-solvers"))
+        self.assertEqual(sorted(problems[:2]), ["problem-0", "problem-2"])
+
+
+class ProblemStatsTest(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create(username="alice", gender="female", role="user")
+        self.bob = User.objects.create(username="bob", gender="male", role="user")
+        self.language = Language.objects.create(name="Python", short="py", icon="py", type="interpreted", file="main.py", run="python3")
+        self.problem = Problem.objects.create(title="problem", difficulty="easy", language="uz", author=self.bob)
+
+    def check(self, author: User, status: str):
+        attempt = Attempt.objects.create(author=author, problem=self.problem, language=self.language, status=status)
+        ProblemStats.record(attempt)
+
+    def test_record(self):
+        for author, status in [(self.alice, "wa"), (self.alice, "ac"), (self.alice, "ac"), (self.bob, "tle"), (self.bob, "ac")]:
+            self.check(author, status)
+        # attempts which are not checked are not counted
+        self.check(self.bob, "running")
+
+        stats = ProblemStats.objects.get(problem=self.problem)
+        self.assertEqual((stats.attempts, stats.accepted, stats.solvers, stats.acceptance), (5, 3, 2, 60.0))
+        self.assertEqual(stats.verdicts, {"wa": 1, "ac": 3, "tle": 1})
+
+        call_command("rebuild_problem_stats", stdout=io.StringIO())
+
+        rebuilt = ProblemStats.objects.get(problem=self.problem)
+        self.assertEqual(
+            (rebuilt.attempts, rebuilt.accepted, rebuilt.solvers, rebuilt.acceptance, rebuilt.verdicts),
+            (stats.attempts, stats.accepted, stats.solvers, stats.acceptance, stats.verdicts),
+        )
+
+
+@override_settings(PROBLEM_PROGRESS={"enabled": False})
+class RequeuedAttemptTest(TestCase):
+    def test_judged(self):
+        from websocket.functions import run_sandbox
+
+        author = User.objects.create(username="alice", gender="female", role="user")
+        language = Language.objects.create(name="Python", short="py", icon="py", type="interpreted", file="main.py", run="python3")
+        problem = Problem.objects.create(title="problem", difficulty="easy", language="uz", author=author)
+        attempt = Attempt.objects.create(author=author, problem=problem, language=language, status="ac", code="print(1)")
+        ProblemStats.record(attempt)
+
+        # the attempt is queued again after its worker died, it is not judged and counted again
+        run_sandbox(author, str(problem.uuid), str(language.uuid), "print(1)", str(attempt.uuid))
+
+        self.assertEqual(ProblemStats.objects.get(problem=problem).attempts, 1)
+        self.assertEqual(author.activity_set.get().attempts, 0)
+
+
+class AttemptTargetTest(TestCase):
+    def test_target(self):
+        from websocket.functions import attempt_target
+
+        author = User.objects.create(username="alice", gender="female", role="user")
+        language = Language.objects.create(name="Python", short="py", icon="py", type="interpreted", file="main.py", run="python3")
+        problem = Problem.objects.create(title="problem", difficulty="easy", language="uz", author=author)
+
+        self.assertEqual(attempt_target(str(problem.uuid).upper(), str(language.uuid)), (str(problem.uuid), str(language.uuid)))
+        self.assertIsNone(attempt_target(str(problem.uuid), "not-a-uuid"))
+        self.assertIsNone(attempt_target(str(problem.uuid), str(uuid4())))
+        self.assertIsNone(attempt_target(None, str(language.uuid)))
+
+
+class ProblemNumberTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create(username="bob", gender="male", role="user")
+        self.problems = [
+            Problem.objects.create(title=f"problem-{index}", difficulty="easy", language="uz", author=self.author, is_public=True)
+            for index in range(6)
+        ]
+
+    def numbers(self):
+        return list(Problem.objects.order_by("number").values_list("title", "number"))
+
+    def test_numbers(self):
+        self.assertEqual([problem.number for problem in self.problems], [1, 2, 3, 4, 5, 6])
+
+        self.problems[1].delete()
+        self.assertEqual(self.numbers(), [("problem-0", 1), ("problem-2", 2), ("problem-3", 3), ("problem-4", 4), ("problem-5", 5)])
+
+        # many problems deleted by one query
+        Problem.objects.filter(title__in=["problem-2", "problem-4"]).delete()
+        self.assertEqual(self.numbers(), [("problem-0", 1), ("problem-3", 2), ("problem-5", 3)])
+
+        problem = Problem.objects.create(title="problem-6", difficulty="easy", language="uz", author=self.author, is_public=True)
+        self.assertEqual(problem.number, 4)
+        self.assertEqual(Counter.objects.get(name=PROBLEM_NUMBER).value, 4)
+
+    def test_unique(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Problem.objects.filter(number=2).update(number=1)
+
+        # problems created by bulk_create without numbers
+        Problem.objects.bulk_create([Problem(title=f"bulk-{index}", difficulty="easy", language="uz", author=self.author) for index in range(2)])
+        self.assertEqual(Problem.objects.filter(number=0).count(), 2)
+
+    def test_numbered_by_bulk_create(self):
+        Problem.objects.bulk_create([Problem(title="bulk", difficulty="easy", language="uz", author=self.author, number=10)])
+
+        problem = Problem.objects.create(title="problem-6", difficulty="easy", language="uz", author=self.author)
+        self.assertEqual(problem.number, 11)
+
+    def test_get_problem(self):
+        # problem, its tags and languages
+        with self.assertNumQueries(3) as context:
+            response = APIClient().get(f"/api/v1/problems/problem/{self.problems[3].uuid}/")
+
+        self.assertEqual(json.loads(decode(response.json().get("data"))).get("order"), 4)
+        self.assertNotIn("ROW_NUMBER", context.captured_queries[0]["sql"].upper())
+
+
+class UuidLookupTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create(username="bob", gender="male", role="user")
+        self.language = Language.objects.create(name="Python", short="py", icon="py", type="interpreted", file="main.py", run="python3")
+        self.problem = Problem.objects.create(title="problem", difficulty="easy", language="uz", author=self.author, is_public=True)
+
+    def test_invalid_uuid(self):
+        self.assertEqual(APIClient().get("/api/v1/problems/problem/not-a-uuid/").status_code, 404)
+        self.assertEqual(APIClient().get(f"/api/v1/problems/problem/{self.problem.uuid}/").status_code, 200)
+
+    def test_string_uuid(self):
+        # judge workers save attempts with the uuid of the queued payload
+        id = str(uuid4())
+        attempt = Attempt(author=self.author, problem=self.problem, language=self.language, uuid=id)
+        attempt.save()
+
+        self.assertEqual(Attempt.objects.get(uuid=id).pk, attempt.pk)
+        self.assertEqual(Problem.objects.get(uuid=str(self.problem.uuid).upper()).pk, self.problem.pk)
+
+
+class LineLimitTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create(username="bob", gender="male", role="user")
+        self.problem = Problem.objects.create(title="problem", difficulty="easy", language="uz", author=self.author, is_public=True)
+
+    def test_migration(self):
+        from importlib import import_module
+        from django.apps import apps
+
+        import_module("problems.migrations.0012_problem_line_limit").remove_line_limits(apps, None)
+
+        # problems created before the line limit was checked have no limit
+        self.problem.refresh_from_db()
+        self.assertEqual(self.problem.line_limit, 0)
+        self.assertEqual(Problem.objects.create(title="new", difficulty="easy", language="uz", author=self.author).line_limit, 1000)
+
+    def test_serializers(self):
+        from .serializers import EditProblemSerializer, ProblemModelSerializer
+
+        serializer = EditProblemSerializer(self.problem, data={"line_limit": 0}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with mock.patch.object(VerdictCache, "invalidate") as invalidate:
+            serializer.save()
+
+        # cached verdicts were checked with the old limit
+        invalidate.assert_called_once()
+        self.problem.refresh_from_db()
+        self.assertEqual(self.problem.line_limit, 0)
+        self.assertIn("line_limit", ProblemModelSerializer.Meta.fields)
+
+
+@skipUnless(fakeredis, "fakeredis is not installed")
+class FileHashTest(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+        self.client = fakeredis.FakeRedis(decode_responses=True)
+        author = User.objects.create(username="bob", gender="male", role="user")
+        self.problem = Problem.objects.create(title="problem", difficulty="easy", language="uz", author=author)
+        self.problem.tests.save("tests.zip", ContentFile(b"first"))
+
+    def test_replaced_file(self):
+        first = tests_hash(self.problem, self.client)
+
+        # file with the same name and size, written a second later
+        with open(self.problem.tests.path, "wb") as file:
+            file.write(b"other")
+        stat = os.stat(self.problem.tests.path)
+        os.utime(self.problem.tests.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        self.assertNotEqual(tests_hash(self.problem, self.client), first)
+
+    def test_forget(self):
+        tests_hash(self.problem, self.client)
+        forget_hashes(self.problem, self.client)
+
+        self.assertNotIn(f"tests_hash_{self.problem.pk}", hashes)
+        self.assertFalse(self.client.exists(f"tests_hash_{self.problem.pk}"))
+
+
+class TestStoreTest(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+        client = fakeredis.FakeRedis(decode_responses=True) if fakeredis else None
+        self.store = TestStore(path=os.path.join(media, "tests"), client=client)
+        self.author = User.objects.create(username="bob", gender="male", role="user")
+
+    def archive(self, files: dict):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as tests:
+            for name, content in files.items():
+                tests.writestr(name, content)
+        return archive.getvalue()
+
+    def problem(self, files):
+        problem = Problem.objects.create(title="problem", difficulty="easy", language="uz", author=self.author)
+        problem.tests.save("tests.zip", ContentFile(files if isinstance(files, bytes) else self.archive(files)))
+        return problem
+
+    def test_pairs(self):
+        self.assertEqual(self.store.pairs(["2.in", "1.in", "1.out", "2.out"]), [("2.in", "2.out"), ("1.in", "1.out")])
+        self.assertEqual(self.store.pairs(["input1.txt", "output1.txt"]), [("input1.txt", "output1.txt")])
+        # names which do not match are paired in archive order
+        self.assertEqual(self.store.pairs(["a", "b", "c", "d"]), [("a", "b"), ("c", "d")])
+
+    def test_parse_groups(self):
+        groups = self.store.parse_groups(b'[{"name": "a", "points": 30, "tests": [1, 2]}, {"points": "70", "tests": "2-4"}]', 4)
+        self.assertEqual(groups, [
+            {"name": "a", "points": 30.0, "tests": [0, 1]},
+            {"name": "2", "points": 70.0, "tests": [1, 2, 3]},
+        ])
+
+    def test_invalid_groups(self):
+        for data, count in [
+            (b"{", 2),
+            (b'{"tests": [1, 2]}', 2),
+            (b"[]", 2),
+            (b'[{"tests": [1, 2]}]', 3),
+            (b'[{"tests": ["1-3"]}]', 2),
+            (b'[{"tests": [0, 1]}]', 1),
+            (b'[{"tests": ["x"]}]', 1),
+            (b'[{"tests": []}, {"tests": [1]}]', 1),
+            (b'[{"tests": [1], "points": "x"}]', 1),
+        ]:
+            with self.subTest(data=data):
+                with self.assertRaises(ValueError):
+                    self.store.parse_groups(data, count)
+
+    def test_extract(self):
+        problem = self.problem({"1.in": "1", "1.out": "2", "2.in": "2", "2.out": "4", "groups.json": '[{"tests": [1]}]'})
+
+        self.assertEqual([os.path.basename(test.get("input")) for test in self.store.get(problem)], ["1.in", "2.in"])
+        # test 2 is not in any group, all tests are judged
+        self.assertIsNone(self.store.groups(problem))
+        self.assertIn("not in any group", self.store.groups_error(problem))
+
+    def test_extract_empty(self):
+        problem = self.problem({})
+
+        self.assertEqual(self.store.get(problem), [])
+        self.assertIsNone(self.store.groups_error(problem))
+
+    def test_validate(self):
+        self.store.validate(io.BytesIO(self.archive({"1.in": "1", "1.out": "2"})))
+
+        damaged = bytearray(self.archive({"1.in": "1" * 100, "1.out": "2"}))
+        damaged[40] ^= 0xFF
+        for data in [b"not a zip", self.archive({}), self.archive({"readme.md": "tests"}), bytes(damaged)]:
+            with self.subTest(data=data[:16]):
+                with self.assertRaises(TestsError):
+                    self.store.validate(io.BytesIO(data))
+
+    def test_extract_broken(self):
+        problem = self.problem(b"not a zip")
+
+        with self.assertRaises(TestsError):
+            self.store.get(problem)
+        # temporary folder of the extraction is deleted
+        self.assertEqual(os.listdir(self.store.path), [])
+
+    def test_shared(self):
+        files = {"1.in": "1", "1.out": "2"}
+        first, second = self.problem(files), self.problem(files)
+
+        # the same archive is extracted once
+        self.assertEqual(self.store.get(first), self.store.get(second))
+        self.assertEqual(len(os.listdir(self.store.path)), 1)
+
+    def test_evict(self):
+        self.store.max_size = 1
+        first = self.problem({"1.in": "1", "1.out": "2"})
+        second = self.problem({"1.in": "2", "1.out": "4"})
+
+        self.store.get(first)
+        self.store.get(second)
+
+        # the store is bigger than max_size, only the folder being used is left
+        self.assertEqual(os.listdir(self.store.path), [os.path.basename(self.store.folder(second))])
+        self.assertTrue(os.path.isfile(self.store.get(second)[0].get("input")))
+
+    def test_evict_keep(self):
+        first = self.problem({"1.in": "1", "1.out": "2"})
+        second = self.problem({"1.in": "2", "1.out": "4"})
+        self.store.get(first)
+        self.store.get(second)
+        # the kept folder is the least recently used one
+        os.utime(self.store.folder(first), (0, 0))
+
+        self.store.max_size = 0
+        self.store.evict(self.store.folder(first))
+
+        self.assertEqual(os.listdir(self.store.path), [os.path.basename(self.store.folder(first))])
+
+    def test_malformed_groups(self):
+        problem = self.problem({"1.in": "1", "1.out": "2", "2.in": "2", "2.out": "4", "groups.json": '[{"tests": [1, 2]'})
+
+        # tests are extracted and judged without groups
+        self.assertEqual(len(self.store.get(problem)), 2)
+        self.assertIsNone(self.store.groups(problem))
+        self.assertIn("not valid json", self.store.groups_error(problem))
+
+    def test_overlapping_groups(self):
+        # a test can be in several groups, it is checked in every group
+        groups = self.store.parse_groups(b'[{"points": 50, "tests": ["1-2"]}, {"points": 50, "tests": [2, 3, 3]}]', 3)
+        self.assertEqual([group.get("tests") for group in groups], [[0, 1], [1, 2]])
+
+        problem = self.problem({"1.in": "1", "1.out": "1", "2.in": "2", "2.out": "2", "groups.json": '[{"tests": [1]}, {"tests": ["1-2"]}]'})
+        self.store.get(problem)
+        self.assertEqual([group.get("tests") for group in self.store.groups(problem)], [[0], [0, 1]])
+        self.assertIsNone(self.store.groups_error(problem))
+
+    def test_out_of_range_groups(self):
+        problem = self.problem({"1.in": "1", "1.out": "1", "2.in": "2", "2.out": "2", "groups.json": '[{"tests": ["1-3"]}]'})
+
+        self.assertEqual(len(self.store.get(problem)), 2)
+        self.assertIsNone(self.store.groups(problem))
+        self.assertIn("out of 1-2", self.store.groups_error(problem))
+
+    def test_admin_form(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from .admin import ProblemForm
+
+        data = {
+            "author": self.author.pk, "title": "problem", "difficulty": "easy", "language": "uz", "rank": 800,
+            "time_limit": 1, "memory_limit": 64, "code_limit": 10000, "output_limit": 1000, "line_limit": 1000,
+            "judge_type": "standard", "compare_mode": "exact", "compare_epsilon": 1e-6, "is_active": True,
+            "description": "{}", "hint": "{}", "input": "{}", "output": "{}", "samples": "[]",
+        }
+        form = ProblemForm(data, {"tests": SimpleUploadedFile("tests.zip", b"not a zip")})
+        self.assertFalse(form.is_valid())
+        self.assertIn("tests", form.errors)
+
+        form = ProblemForm(data, {"tests": SimpleUploadedFile("tests.zip", self.archive({"1.in": "1", "1.out": "2"}))})
+        self.assertTrue(form.is_valid(), form.errors)
+
+
+class BlobStoreTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.store = BlobStore(self.tmp, age=60)
+
+    def age(self, key: str, seconds: float):
+        modified = time.time() - seconds
+        os.utime(self.store.file(key), (modified, modified))
+
+    def test_put(self):
+        key = self.store.put("output")
+
+        self.assertEqual(self.store.put(b"output"), key)
+        self.assertEqual(os.listdir(os.path.dirname(self.store.file(key))), [key])
+        self.assertEqual(self.store.get(key), "output")
+        self.assertIsNone(self.store.get("../" + key[3:]))
+        self.assertIsNone(self.store.get("0" * 64))
+
+    def test_clean(self):
+        used, unused, new = self.store.put("used"), self.store.put("unused"), self.store.put("new")
+        self.age(used, 120)
+        self.age(unused, 120)
+
+        self.assertEqual(self.store.clean({used}), [unused])
+        self.assertEqual(self.store.get(used), "used")
+        self.assertIsNone(self.store.get(unused))
+        # the blob can belong to an attempt which is being judged
+        self.assertEqual(self.store.get(new), "new")
+
+    def test_put_again(self):
+        key = self.store.put("output")
+        self.age(key, 120)
+
+        # another attempt saves the same output before its cases are saved
+        self.store.put("output")
+
+        self.assertEqual(self.store.clean(set()), [])
+        self.assertEqual(self.store.get(key), "output")
+
+    def test_command(self):
+        author = User.objects.create(username="alice", gender="female", role="user")
+        language = Language.objects.create(name="Python", short="py", icon="py", type="interpreted", file="main.py", run="python3")
+        problem = Problem.objects.create(title="problem", difficulty="easy", language="uz", author=author)
+        shared, unused = self.store.put("shared"), self.store.put("unused")
+        self.age(shared, 120)
+        self.age(unused, 120)
+        for cases in [[{"status": "wa", "blobs": {"stdout": shared}}], [{"status": "re", "blobs": {"stderr": shared}}], {"status": "ce"}]:
+            Attempt.objects.create(author=author, problem=problem, language=language, code="print(1)", cases=cases)
+
+        output = io.StringIO()
+        with override_settings(JUDGE_BLOB_STORE={"path": self.tmp, "age": 60}):
+            call_command("clean_blobs", stdout=output)
+
+        self.assertEqual(output.getvalue().strip(), "1 blobs are deleted")
+        self.assertEqual(self.store.get(shared), "shared")
+        self.assertIsNone(self.store.get(unused))
+
+        # the blob is deleted when no attempt references it
+        Attempt.objects.all().delete()
+        with override_settings(JUDGE_BLOB_STORE={"path": self.tmp, "age": 60}):
+            call_command("clean_blobs", stdout=output)
+        self.assertIsNone(self.store.get(shared))
+
+
+class ComparatorTest(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def expected(self, data: bytes):
+        path = os.path.join(self.tmp, f"{uuid4().hex}.out")
+        with open(path, "wb") as file:
+            file.write(data)
+        return path
+
+    def test_exact(self):
+        comparator = ExactComparator()
+        for actual, expected, status in [
+            (b"1 2\n3", b"1 2\n3", "ac"),
+            (b"\n 1 2\n3 \n\n", b"1 2\n3", "ac"),
+            (b"1 2\n4", b"1 2\n3", "wa"),
+            (b"1 2", b"1 2\n3", "wa"),
+            (b"1  2\n3", b"1 2\n3", "wa"),
+            (b"1 2\n3", b" 1 2\n3", "pe"),
+            (b"1 2\n3", b"1 2\n3\n", "pe"),
+            (b"", b"", "ac"),
+        ]:
+            with self.subTest(actual=actual, expected=expected):
+                self.assertEqual(comparator.compare(actual, self.expected(expected))[0], status)
+
+    def test_exact_path(self):
+        status, diff = ExactComparator().compare(self.expected(b"1\n2\n5"), self.expected(b"1\n2\n3"))
+
+        self.assertEqual(status, "wa")
+        self.assertIn("- 5", diff)
+        self.assertIn("+ 3", diff)
+
+    def test_exact_chunks(self):
+        data = b"x" * (CHUNK_SIZE - 1) + b" " + b"y" * (CHUNK_SIZE + 10)
+
+        self.assertEqual(ExactComparator().compare(data, self.expected(data))[0], "ac")
+        self.assertEqual(ExactComparator().compare(data[:-1] + b"z", self.expected(data))[0], "wa")
+
+    def test_float(self):
+        comparator = FloatComparator(1e-6)
+        for actual, expected, status in [
+            (b"0.1000001 2", b"0.1 2", "ac"),
+            (b"1000000.5", b"1000000", "ac"),
+            (b"0.101", b"0.1", "wa"),
+            (b"nan", b"nan", "ac"),
+            (b"nan", b"0", "wa"),
+            (b"abc 1", b"abc 1.0000000001", "ac"),
+            (b"abd", b"abc", "wa"),
+            (b"1", b"1 2", "wa"),
+        ]:
+            with self.subTest(actual=actual, expected=expected):
+                self.assertEqual(comparator.compare(actual, self.expected(expected))[0], status)
+
+    def test_get_comparator(self):
+        for judge_type, compare_mode, comparator in [
+            ("standard", "exact", ExactComparator),
+            ("standard", "float", FloatComparator),
+            ("standard", "tokens", TokensComparator),
+        ]:
+            with self.subTest(judge_type=judge_type, compare_mode=compare_mode):
+                problem = Problem(judge_type=judge_type, compare_mode=compare_mode)
+                self.assertIsInstance(get_comparator(problem), comparator)
+
+        # answers are not compared exactly when the checker is not uploaded, the attempt gets je
+        self.assertIsNone(get_comparator(Problem(judge_type="checker"), ProgramStore(self.tmp)))
+        self.assertIsNone(get_comparator(Problem(compare_mode="checker")))
+
+    def test_tokens_chunks(self):
+        # the second token crosses the boundary of the first chunk
+        first = b"a" * (CHUNK_SIZE - 5)
+        second = b"b" * 10
+        third = b"c" * (CHUNK_SIZE * 2)
+        data = first + b" " + second + b"\n\n" + third + b" "
+
+        self.assertEqual(list(tokens(io.BytesIO(data))), [
+            (0, first),
+            (len(first) + 1, second),
+            (len(first) + len(second) + 3, third),
+        ])
+
+    def test_tokens_boundary(self):
+        # whitespace right at the end of a chunk splits tokens
+        data = b"a" * CHUNK_SIZE + b" b"
+
+        self.assertEqual(list(tokens(io.BytesIO(data))), [(0, b"a" * CHUNK_SIZE), (CHUNK_SIZE + 1, b"b")])
+        self.assertEqual(list(tokens(io.BytesIO(b"  \n"))), [])
+
+
+class SandboxVersionTest(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.pool = WorkspacePool(os.path.join(self.tmp, "workspaces"), 0)
+
+    def binary(self, name: str, script: str):
+        path = os.path.join(self.tmp, name)
+        with open(path, "w") as file:
+            file.write(f"#!/bin/sh\n{script}\n")
+        os.chmod(path, 0o755)
+        return path
+
+    def test_version(self):
+        self.assertEqual(self.pool.version(self.binary("sandbox-new", "echo algoland-sandbox 3")), 3)
+
+    def test_old(self):
+        # old binaries run -V as the program
+        self.assertEqual(self.pool.version(self.binary("sandbox-old", 'echo "execvp error" >&2')), 0)
+
+    def test_rebuilt(self):
+        path = self.binary("sandbox", "echo algoland-sandbox 1")
+        self.assertEqual(self.pool.version(path), 1)
+
+        self.binary("sandbox", "echo algoland-sandbox 12")
+        self.assertEqual(self.pool.version(path), 12)
+
+
+class CompileCodeTest(SimpleTestCase):
+    def setUp(self):
+        import sandbox
+
+        self.sandbox = sandbox
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        cache = sandbox.compile_cache
+        sandbox.compile_cache = CompileCache(os.path.join(self.tmp, "cache"), 1 << 20, False)
+        self.addCleanup(setattr, sandbox, "compile_cache", cache)
+        self.language = Language(name="C", short="c", type="compiled", file="main.c", compile="cp main.c main")
+
+    def workspace(self, name: str):
+        workspace = self.sandbox.Workspace(name)
+        workspace.cwd = os.path.join(self.tmp, name)
+        os.makedirs(workspace.cwd)
+        with open(os.path.join(workspace.cwd, "main.c"), "w") as file:
+            file.write("code")
+        return workspace
+
+    def count(self, status: str):
+        return metrics.counters.get(("judge_compile_cache_total", labels_key({"status": status, "language": "c"})), 0)
+
+    def test_cached(self):
+        hits, misses = self.count("hit"), self.count("miss")
+
+        first = self.sandbox.compile_code(self.workspace("first"), self.language, "code", self.language.compile)
+        second = self.workspace("second")
+        response = self.sandbox.compile_code(second, self.language, "code", self.language.compile)
+
+        self.assertEqual((first["status"], first["cache"]["status"]), ("cc", "miss"))
+        self.assertEqual((response["status"], response["cache"]["status"]), ("cc", "hit"))
+        self.assertTrue(os.path.isfile(os.path.join(second.cwd, "main")))
+        if metrics.enabled:
+            self.assertEqual((self.count("hit"), self.count("miss")), (hits + 1, misses + 1))
+
+    def test_error(self):
+        self.language.compile = "cp missing.c main"
+
+        response = self.sandbox.compile_code(self.workspace("first"), self.language, "code", self.language.compile)
+        again = self.sandbox.compile_code(self.workspace("second"), self.language, "code", self.language.compile)
+
+        # failed compilations are not cached
+        self.assertEqual((response["status"], again["status"]), ("ce", "ce"))
+        self.assertEqual(again["cache"]["status"], "miss")
+
+
+def stub_judge(case, statuses: list, delays: list = None, parallel: int = 1, attempt: Attempt = None):
+    """
+    stub_judge(case, statuses, delays, parallel, attempt) -> Judge of the attempt (a new one by default), test i is checked after delays[i] seconds with statuses[i]
+
+    case - TestCase which cleans the workspace of the attempt
+    Checked indexes are saved to judge.checked in the order they finished, events sent to the author to judge.events.
+    """
+    import sandbox
+
+    if not attempt:
+        author = User.objects.create(username="alice", gender="female", role="user")
+        language = Language.objects.create(name="Python", short="py", icon="py", type="interpreted", file="main.py", sandbox="sandbox-py", run="python3")
+        problem = Problem.objects.create(title="problem", difficulty="easy", language="uz", author=author)
+        attempt = Attempt.objects.create(author=author, problem=problem, language=language, code="print(1)")
+
+    judge = sandbox.Judge(attempt)
+    judge.parallel = parallel
+    # parallel tests are checked in folders inside the workspace, run() takes the workspace itself
+    if parallel > 1:
+        judge.workspace.init()
+        case.addCleanup(judge.workspace.clean)
+    judge.checked = []
+    judge.events = []
+    judge.group_send = judge.events.append
+    delays = delays or [0] * len(statuses)
+    lock = threading.Lock()
+
+    def check(index: int, test: dict, workspace):
+        time.sleep(delays[index])
+        with lock:
+            judge.checked.append(index)
+        return {
+            "status": statuses[index],
+            "stdout": "",
+            "stderr": "" if statuses[index] == "ac" else f"error {index + 1}",
+            "stdin": "",
+            "expected": "",
+            "diff": "",
+            "time": index + 1,
+            "memory": 0,
+            "test": index + 1,
+        }
+
+    judge.check = check
+    judge.tests = lambda: [{"input": "", "output": ""} for status in statuses]
+    return judge
+
+
+@override_settings(PROBLEM_PROGRESS={"enabled": False})
+class CasesIteratorTest(TestCase):
+    def test_order(self):
+        # later tests finish first
+        judge = stub_judge(self, ["ac"] * 4, [0.3, 0.2, 0.1, 0], parallel=4)
+
+        cases = [(index, response.get("test")) for index, response in judge.cases_iterator(judge.tests())]
+
+        self.assertEqual(cases, [(0, 1), (1, 2), (2, 3), (3, 4)])
+        self.assertEqual(judge.checked, [3, 2, 1, 0])
+
+    def test_indexes(self):
+        judge = stub_judge(self, ["ac"] * 6, parallel=2)
+        tests = judge.tests()
+
+        cases = [index for index, response in judge.cases_iterator([tests[2], tests[5]], [2, 5])]
+
+        self.assertEqual(cases, [2, 5])
+
+    def test_cancel(self):
+        # test 2 fails while tests 3 and 4 can be running, the rest waits in the executor queue
+        judge = stub_judge(self, ["ac", "wa", "ac", "ac", "ac", "ac", "ac", "ac"], [0, 0.1, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2], parallel=2)
+
+        cases = [(index, response.get("status")) for index, response in judge.cases_iterator(judge.tests())]
+
+        self.assertEqual(cases, [(0, "ac"), (1, "wa")])
+        self.assertEqual(judge.failed, 1)
+        # queued tests are cancelled or skipped by check_isolated
+        self.assertLessEqual(set(judge.checked), {0, 1, 2, 3})
+        self.assertLessEqual({0, 1}, set(judge.checked))
+
+    def test_first_failure(self):
+        # test 3 fails before test 2, the verdict is the same as in sequential run
+        judge = stub_judge(self, ["ac", "re", "wa", "ac"], [0, 0.2, 0, 0], parallel=4)
+
+        cases = [(index, response.get("status")) for index, response in judge.cases_iterator(judge.tests())]
+
+        self.assertEqual(cases, [(0, "ac"), (1, "re")])
+
+    def test_sequential(self):
+        judge = stub_judge(self, ["ac", "wa", "ac"])
+
+        cases = [index for index, response in judge.cases_iterator(judge.tests())]
+
+        self.assertEqual(cases, [0, 1])
+        self.assertEqual(judge.checked, [0, 1])
+
+
+@override_settings(PROBLEM_PROGRESS={"enabled": False})
+class ReporterTest(TestCase):
+    def judge(self, statuses: list, save_interval: float, event_interval: float):
+        with override_settings(JUDGE_REPORTER={"save_interval": save_interval, "event_interval": event_interval}):
+            judge = stub_judge(self, statuses)
+        judge.saves = []
+        save = judge.attempt.save
+
+        def count(update_fields: list):
+            judge.saves.append(update_fields)
+            save(update_fields=update_fields)
+
+        judge.attempt.save = count
+        return judge
+
+    def sent(self, judge):
+        return [event["data"]["test"] for event in judge.events if event["type"] == "attempt_case"]
+
+    def test_batched(self):
+        judge = self.judge(["ac"] * 5, 60, 60)
+
+        for index, response in judge.cases_iterator(judge.tests()):
+            judge.reporter.case(response)
+
+        # the first case is sent at once, the next cases wait for the interval
+        self.assertEqual(self.sent(judge), [1])
+        self.assertEqual(judge.saves, [])
+
+    def test_every_case(self):
+        judge = self.judge(["ac"] * 3, 0, 0)
+
+        for index, response in judge.cases_iterator(judge.tests()):
+            judge.reporter.case(response)
+
+        self.assertEqual(self.sent(judge), [1, 2, 3])
+        self.assertEqual(judge.saves, [["cases"]] * 3)
+
+    def test_finish(self):
+        judge = self.judge(["ac", "ac", "ac", "wa", "ac"], 60, 60)
+
+        from sandbox import RESULT_FIELDS
+
+        judge.judge()
+
+        # the latest case is sent before the final status and the result is saved once
+        self.assertEqual(self.sent(judge), [1, 4])
+        self.assertEqual(judge.saves, [RESULT_FIELDS])
+        judge.attempt.refresh_from_db()
+        self.assertEqual((judge.attempt.status, judge.attempt.test), ("wa", 4))
+        self.assertEqual([case["test"] for case in judge.attempt.cases], [1, 2, 3, 4])
+
+    def test_status_last(self):
+        from sandbox import RESULT_FIELDS
+
+        judge = self.judge(["ac"] * 3, 60, 0)
+        judge.judge()
+
+        self.assertEqual([event["type"] for event in judge.events], ["attempt_case"] * 3 + ["attempt_status"])
+        self.assertEqual(self.sent(judge), [1, 2, 3])
+        self.assertEqual(judge.events[-1]["data"]["status"], "ac")
+        self.assertEqual(judge.saves, [RESULT_FIELDS])
+
+
+@override_settings(PROBLEM_PROGRESS={"enabled": False})
+class JudgeGroupsTest(TestCase):
+    groups = [
+        {"name": "a", "points": 40.0, "tests": [0, 1, 2]},
+        {"name": "b", "points": 60.0, "tests": [3, 4]},
+    ]
+
+    def test_skipped(self):
+        for parallel in [1, 3]:
+            with self.subTest(parallel=parallel):
+                judge = stub_judge(self, ["ac", "wa", "ac", "ac", "ac"], parallel=parallel)
+
+                judge.judge_groups(judge.tests(), self.groups)
+
+                # tests after the failed test of the group are not checked, the next group is checked
+                self.assertEqual([case.get("test") for case in judge.attempt.cases], [1, 2, 4, 5])
+                self.assertEqual([(group.get("status"), group.get("passed"), group.get("skipped"), group.get("score")) for group in judge.attempt.groups], [
+                    ("wa", 1, 1, 0),
+                    ("ac", 2, 0, 60.0),
+                ])
+                self.assertEqual((judge.attempt.status, judge.attempt.test, judge.attempt.score, judge.attempt.error), ("wa", 2, 60.0, "error 2"))
+                if parallel == 1:
+                    self.assertEqual(judge.checked, [0, 1, 3, 4])
+                User.objects.all().delete()
+
+    def test_first_failure(self):
+        judge = stub_judge(self, ["ac", "ac", "ac", "re", "wa"])
+
+        judge.judge_groups(judge.tests(), self.groups)
+
+        # the status is the status of the first failed test, the first group is passed
+        self.assertEqual((judge.attempt.status, judge.attempt.test, judge.attempt.score), ("re", 4, 40.0))
+        self.assertEqual(judge.checked, [0, 1, 2, 3])
+        self.assertEqual(judge.events[-1]["type"], "attempt_status")
+
+    def test_accepted(self):
+        judge = stub_judge(self, ["ac"] * 5)
+
+        judge.judge_groups(judge.tests(), self.groups)
+
+        self.assertEqual((judge.attempt.status, judge.attempt.test, judge.attempt.score), ("ac", 0, 100.0))
+        self.assertEqual(judge.attempt.time, 5)
+
+
+@skipUnless(fakeredis, "fakeredis is not installed")
+@override_settings(PROBLEM_PROGRESS={"enabled": False})
+class VerdictCacheTest(TestCase):
+    def setUp(self):
+        import sandbox
+
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        self.enterContext(override_settings(MEDIA_ROOT=media, JUDGE_TESTS_STORE={"path": os.path.join(media, "store"), "size": 1 << 20}))
+        self.client = fakeredis.FakeRedis(decode_responses=True)
+        # the admin and the judge use the same redis
+        self.enterContext(mock.patch("utils.cache.connect", return_value=self.client))
+        self.enterContext(mock.patch("utils.store.connect", return_value=self.client))
+        cache = sandbox.verdict_cache
+        self.cache = sandbox.verdict_cache = VerdictCache(self.client)
+        self.cache.enabled = True
+        self.addCleanup(setattr, sandbox, "verdict_cache", cache)
+        hashes.clear()
+        self.addCleanup(hashes.clear)
+
+        self.first = stub_judge(self, ["ac", "ac", "wa"])
+        self.problem = self.first.attempt.problem
+        self.problem.tests.save("tests.zip", ContentFile(b"first tests"))
+
+    def again(self, statuses: list):
+        first = self.first.attempt
+        attempt = Attempt.objects.create(author=first.author, problem=Problem.objects.get(pk=first.problem.pk), language=first.language, code=first.code)
+        return stub_judge(self, statuses, attempt=attempt)
+
+    def test_replay(self):
+        self.first.run()
+        second = self.again(["ac", "ac", "ac"])
+        second.run()
+
+        # the second attempt is not checked, its cases are the cases of the first one
+        self.assertEqual(second.checked, [])
+        first, replayed = Attempt.objects.get(pk=self.first.attempt.pk), Attempt.objects.get(pk=second.attempt.pk)
+        self.assertEqual(
+            (replayed.status, replayed.time, replayed.memory, replayed.error, replayed.test, replayed.cases),
+            (first.status, first.time, first.memory, first.error, first.test, first.cases),
+        )
+        # every case is sent again, the first judge sent only some of them
+        self.assertEqual([(event["data"]["test"], event["data"]["status"]) for event in second.events], [(case["test"], case["status"]) for case in first.cases])
+
+    def test_admin(self):
+        from django.contrib import admin
+        from .admin import ProblemModelAdmin
+
+        self.first.run()
+        # new tests with the same name, size and modification time have the same version
+        stat = os.stat(self.problem.tests.path)
+        with open(self.problem.tests.path, "wb") as file:
+            file.write(b"other tests")
+        os.utime(self.problem.tests.path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertIsNotNone(self.cache.get(self.again(["ac"] * 3).attempt)[1])
+
+        for changed in [["tests"], ["checker"]]:
+            with self.subTest(changed=changed):
+                self.first.run()
+                form = mock.Mock(changed_data=changed)
+                ProblemModelAdmin(Problem, admin.site).save_model(mock.Mock(), self.problem, form, True)
+
+                second = self.again(["ac", "ac", "ac"])
+                second.run()
+
+                # the attempt is checked again with the new tests
+                self.assertEqual(second.checked, [0, 1, 2])
+                self.assertEqual(Attempt.objects.get(pk=second.attempt.pk).status, "ac")
+
+    def test_unstable(self):
+        self.first = stub_judge(self, ["ac", "tle"], attempt=self.first.attempt)
+        self.first.run()
+        second = self.again(["ac", "ac"])
+        second.run()
+
+        # time limit can be passed when the same code is checked again
+        self.assertEqual(second.checked, [0, 1])
+
+
+@skipUnless(fakeredis, "fakeredis is not installed")
+class ProgressIndexTest(TestCase):
+    def setUp(self):
+        from django.conf import settings
+
+        self.enterContext(override_settings(PROBLEM_PROGRESS={**settings.PROBLEM_PROGRESS, "enabled": True}))
+        self.index = ProgressIndex(fakeredis.FakeRedis())
+        self.author = User.objects.create(username="alice", gender="female", role="user")
+        self.language = Language.objects.create(name="Python", short="py", icon="py", type="interpreted", file="main.py", run="python3")
+        self.problem = Problem.objects.create(title="problem", difficulty="easy", language="uz", author=self.author)
+
+    def test_record(self):
+        self.assertEqual(self.index.get(self.author.pk), (set(), set()))
+
+        self.index.record(self.author.pk, self.problem.pk, "ac")
+
+        self.assertEqual(self.index.get(self.author.pk), ({self.problem.pk}, {self.problem.pk}))
+
+    def test_record_failed(self):
+        self.assertEqual(self.index.get(self.author.pk), (set(), set()))
+        Attempt.objects.create(author=self.author, problem=self.problem, language=self.language, status="ac", code="print(1)")
+
+        with mock.patch.object(self.index.client, "pipeline", side_effect=redis.ConnectionError("down")):
+            self.index.record(self.author.pk, self.problem.pk, "ac")
+
+        # the index is built again from attempts
+        self.assertFalse(self.index.client.exists(self.index.key(self.author.pk, "built")))
+        self.assertEqual(self.index.get(self.author.pk), ({self.problem.pk}, {self.problem.pk}))
+
+
+class SplitCommandTest(SimpleTestCase):
+    def test_split(self):
+        for command, result in [
+            (["main.py"], ([], ["main.py"])),
+            (["-S", "main.py", "1"], (["-S"], ["main.py", "1"])),
+            (["-OSu", "-W", "ignore", "main.py"], (["-OSu", "-W", "ignore"], ["main.py"])),
+            (["-Wignore", "-X", "utf8", "main.py"], (["-Wignore", "-X", "utf8"], ["main.py"])),
+            (["--", "-main.py"], (["--"], ["-main.py"])),
+        ]:
+            with self.subTest(command=command):
+                self.assertEqual(split_command(command), result)
+
+    def test_invalid(self):
+        for command in [[], ["-S"], ["-c", "print(1)"], ["-Sm", "main"], ["-"]]:
+            with self.subTest(command=command):
+                with self.assertRaises(ValueError):
+                    split_command(command)
+
+
+@skipUnless(load_seccomp(), "libseccomp is not installed")
+class ZygoteTest(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        open(os.path.join(self.tmp, "input.txt"), "w").close()
+
+    def serve(self, programs: list):
+        """
+        serve(programs) -> (response, output) of every program run by one fork server
+        """
+        lines = []
+        for index, code in enumerate(programs):
+            path = os.path.join(self.tmp, f"main{index}.py")
+            with open(path, "w") as file:
+                file.write(code)
+            lines.append("\t".join(["2000", "4000", "256", "1", "1000000", "1000000", "0", "0", self.tmp, os.path.join(self.tmp, "input.txt"), path]) + "\n")
+
+        zygote = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "utils", "zygote.py")
+        data = subprocess.run(["python3", "-I", zygote], input="".join(lines).encode(), capture_output=True, timeout=60).stdout
+        results = []
+        for _ in programs:
+            line, data = data.split(b"\n", 1)
+            response = json.loads(line)
+            results.append((response, data[:response["output"]].decode()))
+            data = data[response["output"] + response["error"]:]
+        return results
+
+    def test_random(self):
+        results = self.serve(["import random\nprint(random.random())\n"] * 2)
+
+        # every fork gets its own random numbers
+        self.assertNotEqual(results[0][1], results[1][1])
+
+    def test_memory(self):
+        (empty, _), (array, output) = self.serve(["pass\n", "data = bytearray(32 * 1024 * 1024)\nprint(len(data))\n"])
+
+        # modules preloaded by the fork server are not counted
+        self.assertEqual(output.strip(), str(32 * 1024 * 1024))
+        self.assertLess(empty["memory"], 8 * 1024)
+        self.assertGreater(array["memory"] - empty["memory"], 30 * 1024)
+
+
+class WorkspacePoolTest(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.root = os.path.join(self.tmp, "workspaces")
+        self.pool = WorkspacePool(self.root, 2)
+
+    def pooled(self):
+        return {os.stat(os.path.join(self.pool.pool, name)).st_ino for name in os.listdir(self.pool.pool)}
+
+    def test_private(self):
+        for path in (self.root, self.pool.pool, self.pool.bin):
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o700)
+
+    def test_shared_root(self):
+        root = os.path.join(self.tmp, "shared")
+        os.mkdir(root)
+        os.chmod(root, 0o777)
+
+        with self.assertRaises(WorkspaceError):
+            WorkspacePool(root, 1)
+
+    def test_symlink(self):
+        os.symlink(self.root, os.path.join(self.tmp, "link"))
+
+        with self.assertRaises(WorkspaceError):
+            WorkspacePool(os.path.join(self.tmp, "link"), 1)
+
+    def test_reuse(self):
+        pooled = self.pooled()
+        path = self.pool.acquire("attempt")
+
+        # a pooled folder is renamed, no folder is created
+        self.assertIn(os.stat(path).st_ino, pooled)
+        self.assertEqual(len(os.listdir(self.pool.pool)), 1)
+
+        os.mkdir(os.path.join(path, "folder"))
+        with open(os.path.join(path, "folder", "output.txt"), "w") as file:
+            file.write("1")
+        os.symlink(self.tmp, os.path.join(path, "link"))
+        self.pool.release(path)
+
+        # emptied folder is back in the pool, target of the symlink is kept
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.isdir(self.tmp))
+        self.assertEqual(self.pooled(), pooled)
+        for name in os.listdir(self.pool.pool):
+            self.assertEqual(os.listdir(os.path.join(self.pool.pool, name)), [])
+
+    def test_empty_pool(self):
+        paths = [self.pool.acquire(f"attempt-{index}") for index in range(3)]
+
+        self.assertEqual(os.listdir(self.pool.pool), [])
+        for path in paths:
+            self.pool.release(path)
+        # folders over size are deleted
+        self.assertEqual(len(os.listdir(self.pool.pool)), 2)
+        self.assertEqual(sorted(os.listdir(self.root)), [".bin", ".pool"])
+
+    def test_left_workspace(self):
+        path = self.pool.acquire("attempt")
+        with open(os.path.join(path, "main.py"), "w") as file:
+            file.write("print(1)")
+
+        # worker died while judging, the same attempt gets an empty folder
+        self.assertEqual(os.listdir(self.pool.acquire("attempt")), [])
+
+    def test_sweep(self):
+        old = self.pool.acquire("old")
+        new = self.pool.acquire("new")
+        os.utime(old, (0, 0))
+        self.pool.sweep(60)
+
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.isdir(new))
+        self.assertTrue(os.path.isdir(self.pool.pool))
+        self.assertTrue(os.path.isdir(self.pool.bin))
+
+    def test_binary(self):
+        source = os.path.join(self.tmp, "sandbox-py")
+        with open(source, "w") as file:
+            file.write("binary")
+
+        path = self.pool.binary(source)
+        self.assertEqual(self.pool.binary(source), path)
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o555)
+        self.assertEqual(os.listdir(self.pool.bin), [os.path.basename(path)])
+
+
+@skipUnless(fakeredis and lupa, "fakeredis with lupa is not installed")
+class JudgeQueueTest(SimpleTestCase):
+    def setUp(self):
+        self.client = fakeredis.FakeRedis(decode_responses=True)
+
+    def queue(self, worker: str = "worker", in_flight: int = 0, languages: list = None):
+        queue = JudgeQueue("test", self.client, worker, languages)
+        queue.in_flight = in_flight
+        queue.max_queued = 0
+        return queue
+
+    def push(self, queue: JudgeQueue, user: str, count: int = 1, language: str = "py", priority: str = "practice", weight: float = 1):
+        return [queue.push({"user": user, "language": language}, priority, weight) for _ in range(count)]
+
+    def pop(self, queue: JudgeQueue):
+        users = []
+        while payload := queue.pop_once():
+            users.append(payload.get("user"))
+        return users
+
+    def test_fair(self):
+        queue = self.queue()
+        self.push(queue, "1", 3)
+        self.push(queue, "2", 1)
+
+        self.assertEqual(self.pop(queue), ["1", "2", "1", "1"])
+        self.assertEqual(queue.size(), 0)
+
+    def test_weights(self):
+        queue = self.queue()
+        self.push(queue, "1", 4)
+        self.push(queue, "2", 4, weight=2)
+
+        self.assertEqual(self.pop(queue), ["1", "2", "2", "1", "2", "2", "1", "1"])
+
+    def test_classes(self):
+        queue = self.queue()
+        self.push(queue, "1", 2)
+        self.push(queue, "2", 1, priority="contest")
+
+        self.assertEqual(self.pop(queue), ["2", "1", "1"])
+
+    def test_languages(self):
+        self.push(self.queue(), "1", 1, language="cpp")
+        self.push(self.queue(), "2", 1, language="py")
+
+        self.assertEqual(self.pop(self.queue(languages=["py"])), ["2"])
+        self.assertEqual(self.pop(self.queue()), ["1"])
+
+    def test_in_flight(self):
+        queue = self.queue(in_flight=1)
+        self.push(queue, "1", 2)
+        self.push(queue, "2", 1)
+
+        first = queue.pop_once()
+        self.assertEqual(self.pop(queue), ["2"])
+        # the user is blocked until the running attempt is done
+        self.assertTrue(queue.done(first))
+        self.assertEqual(self.pop(queue), ["1"])
+
+    def test_max_queued(self):
+        queue = self.queue()
+        queue.max_queued = 2
+
+        self.assertIsNone(self.push(queue, "1", 3)[-1])
+        self.assertIsNotNone(self.push(queue, "2", 1)[0])
+
+    def test_positions(self):
+        queue = self.queue(in_flight=1)
+        self.push(queue, "1", 3)
+        self.push(queue, "2", 2, weight=2)
+        self.push(queue, "3", 2, language="cpp", weight=3)
+        self.push(queue, "3", 1, language="py", priority="contest")
+        self.push(queue, "4", 1, language="py")
+        # users of running attempts are blocked
+        self.assertEqual(len(self.pop(queue)), 4)
+        self.assertEqual(self.client.smembers("test:blocked"), {"1", "2", "3"})
+
+        positions = queue.positions()
+        self.assertEqual(sorted(position.get("position") for values in positions.values() for position in values), list(range(1, queue.size() + 1)))
+        for user in ["1", "2", "3", "4", "5"]:
+            with self.subTest(user=user):
+                self.assertEqual(queue.user_positions(user), positions.get(user, []))
+
+    def test_heartbeat(self):
+        worker = self.queue("a")
+        worker.lease = -1
+        self.push(worker, "1", 1)
+        payload = worker.pop_once()
+
+        # extended lease is not expired
+        worker.lease = 30
+        worker.heartbeat({"cores": 1}, [payload.get("id")])
+        self.assertEqual(self.queue("b").requeue(), ([], []))
+        self.assertEqual([info.get("worker") for info in worker.workers()], ["a"])
+
+    def test_requeue(self):
+        dead = self.queue("a", in_flight=1)
+        dead.lease = -1
+        first, second = self.push(dead, "1", 2)
+        self.assertEqual(dead.pop_once().get("id"), first)
+        # the second attempt waits for the first one
+        self.assertIsNone(dead.pop_once())
+
+        worker = self.queue("b", in_flight=1)
+        self.assertEqual(worker.requeue(), ([first], []))
+        payload = worker.pop_once()
+        self.assertEqual(payload.get("id"), first)
+
+        # the lease of the dead worker is lost
+        self.assertFalse(dead.done(payload))
+        self.assertTrue(worker.done(payload))
+        self.assertEqual(worker.pop_once().get("id"), second)
+
+    def test_drop(self):
+        dead = self.queue("a", in_flight=1)
+        dead.lease = -1
+        dead.max_requeues = 0
+        first, second = self.push(dead, "1", 2)
+        dead.pop_once()
+        self.assertIsNone(dead.pop_once())
+
+        self.assertEqual(dead.requeue(), ([], [first]))
+        # the user is not blocked by the dropped attempt
+        self.assertEqual(self.queue("b", in_flight=1).pop_once().get("id"), second)
+        self.assertEqual(self.client.smembers("test:blocked"), set())
+
+    def test_requeue_other_language(self):
+        dead = self.queue("a", in_flight=1)
+        dead.lease = -1
+        first = self.push(dead, "1", 1, language="py")[0]
+        second = self.push(dead, "1", 1, language="cpp")[0]
+        payload = dead.pop_once()
+        self.assertIsNone(dead.pop_once())
+
+        requeued, _ = dead.requeue()
+        self.assertEqual(requeued, [payload.get("id")])
+        # both lists of the user are ready again
+        worker = self.queue("b", in_flight=2)
+        self.assertEqual({worker.pop_once().get("id"), worker.pop_once().get("id")}, {first, second})
+
+    def test_expire(self):
+        queue = self.queue(languages=["py"])
+        queue.max_queued = 2
+        ids = self.push(queue, "1", 2, language="unknown")
+        self.assertIsNone(self.push(queue, "1", 1)[0])
+        self.assertIsNone(queue.pop_once())
+
+        # attempts of languages which no worker takes are dropped, the user can queue attempts again
+        queue.queued_timeout = -1
+        self.assertEqual(sorted(queue.expire()), sorted(ids))
+        self.assertEqual(queue.size(), 0)
+        self.assertEqual(queue.positions(), {})
+        self.assertIsNotNone(self.push(queue, "1", 1)[0])
+
+    def test_expire_leased(self):
+        queue = self.queue()
+        queue.queued_timeout = -1
+        self.push(queue, "1", 1)
+        payload = queue.pop_once()
+
+        self.assertEqual(queue.expire(), [])
+        self.assertTrue(queue.done(payload))
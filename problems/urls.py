@@ -8,15 +8,17 @@ from .views import (
     get_problem,
     edit_problem,
     add_problem,
+    get_attempt_blob,
 )
 
 
 urlpatterns = [
     path("problems/", ProblemsListAPIView.as_view(), ),
-    path("problems/problem/<str:uuid>/", get_problem, ),
-    path("problems/problem/<str:uuid>/edit/", edit_problem, ),
-    path("problems/problem/<str:uuid>/attempts/", ProblemAttemptsListAPIView.as_view(), ),
+    path("problems/problem/<uuid:uuid>/", get_problem, ),
+    path("problems/problem/<uuid:uuid>/edit/", edit_problem, ),
+    path("problems/problem/<uuid:uuid>/attempts/", ProblemAttemptsListAPIView.as_view(), ),
     path("problems/add/", add_problem, ),
+    path("problems/attempt/<uuid:uuid>/blobs/<str:key>/", get_attempt_blob, ),
 
     path("languages/", get_languages),
     path("problems/tags/", get_tags,),
@@ -1,19 +1,23 @@
 import json
 import time
-from django.http import HttpRequest
+from uuid import UUID
+from django.http import HttpRequest, HttpResponse
 from rest_framework import filters
 from rest_framework import generics
 from rest_framework import decorators
 from rest_framework import permissions
 from rest_framework import authentication
-from django.db.models import Window, F, Q
+from django.db.models import Q
 from rest_framework.response import Response
 from django.http import StreamingHttpResponse
-from django.db.models.functions import RowNumber
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 from django_filters.rest_framework import DjangoFilterBackend
 
+from utils.blobs import BlobStore
+from utils.queue import JudgeQueue
+from utils.metrics import metrics
+from utils.progress import ProgressIndex
 from utils.secrets import encode, decode, jsonify
 from users.models import User
 
@@ -24,6 +28,7 @@ from .models import (
     Tag,
 )
 from .serializers import (
+    annotate_problems,
     ProblemsModelSerializer,
     ProblemModelSerializer,
     LanguageModelSerializer,
@@ -37,6 +42,9 @@ from .pagination import (
 )
 
 
+progress_index = ProgressIndex()
+
+
 @decorators.api_view(http_method_names=["GET"])
 def get_languages(request: HttpRequest):
     languages = Language.objects.all()
@@ -79,39 +87,66 @@ class ProblemAttemptsListAPIView(generics.ListAPIView):
 class ProblemsListAPIView(generics.ListAPIView):
     serializer_class = ProblemsModelSerializer
     pagination_class = ProblemsPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter,]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter,]
     filterset_fields = ["difficulty", ]
     permission_classes = [permissions.AllowAny,]
     search_fields = ["title", "description", ]
+    # ?ordering=-acceptance, ?ordering=solvers, annotated by annotate_problems
+    ordering_fields = ["number", "acceptance", "solvers", ]
+    ordering = ["number", ]
 
     def get_queryset(self):
         user: User = self.request.user
+        # attempted and solved problems of the user, None when the database is used
+        self.progress = progress_index.get(user.pk) if user.is_authenticated else None
 
-        queryset = Problem.objects.annotate(
-            order=Window(
-                expression=RowNumber(),
-                order_by=F("id").asc()
-            )
-        )
+        queryset = annotate_problems(Problem.objects.all(), user, self.progress)
         
-        if user.is_authenticated:
-            if user.role == "admin":
-                return queryset
-            return queryset.filter(
+        if not user.is_authenticated:
+            return queryset.filter(is_public=True)
+
+        if user.role != "admin":
+            queryset = queryset.filter(
                 Q(is_public=True) | Q(author=user)
             )
-        return queryset.filter(is_public=True)
+        return self.filter_status(queryset)
+
+    def filter_status(self, queryset):
+        """
+        filter_status(queryset) -> Problems filtered by status of the user
+
+        ?status=solved, ?status=unsolved (attempted but not solved), ?status=not_attempted, ?hide_solved=true
+        """
+        status = self.request.query_params.get("status")
+        hide_solved = self.request.query_params.get("hide_solved") in ("1", "true")
+
+        if self.progress is not None:
+            attempted, solved = Q(id__in=self.progress[0]), Q(id__in=self.progress[1])
+        else:
+            attempted, solved = Q(attempted=True), Q(solved=True)
+
+        if hide_solved:
+            queryset = queryset.exclude(solved)
+
+        if status == "solved":
+            queryset = queryset.filter(solved)
+        elif status == "unsolved":
+            queryset = queryset.filter(attempted).exclude(solved)
+        elif status == "not_attempted":
+            queryset = queryset.exclude(attempted)
+        return queryset
+
+    def get_serializer_context(self):
+        return {
+            **super().get_serializer_context(),
+            "progress": getattr(self, "progress", None),
+        }
 
 
 @decorators.api_view(http_method_names=["GET"])
-def get_problem(request: HttpRequest, uuid: str):
+def get_problem(request: HttpRequest, uuid: UUID):
     user = request.user
-    problem = Problem.objects.annotate(
-        order=Window(
-        expression=RowNumber(),
-            order_by=F("id").asc()
-        )
-    ).filter(uuid=uuid)
+    problem = Problem.objects.select_related("author", "stats").filter(uuid=uuid).first()
 
     if not problem:
         return Response({
@@ -119,8 +154,6 @@ def get_problem(request: HttpRequest, uuid: str):
             "code": "get_problem_001",
             "data": None
         })
-    
-    problem = problem.first()
 
     if not problem.is_public:
         if not problem.with_link:
@@ -137,7 +170,8 @@ def get_problem(request: HttpRequest, uuid: str):
                     "data": None
                 })
         
-    problem_serializer = ProblemModelSerializer(problem, context={ "request": request })
+    progress = progress_index.get(user.pk) if user.is_authenticated else None
+    problem_serializer = ProblemModelSerializer(problem, context={ "request": request, "progress": progress })
 
     return Response({
         "status": "success",
@@ -149,7 +183,7 @@ def get_problem(request: HttpRequest, uuid: str):
 @decorators.api_view(http_method_names=["POST"])
 @decorators.authentication_classes(authentication_classes=[authentication.TokenAuthentication])
 @decorators.permission_classes(permission_classes=[permissions.IsAuthenticated])
-def edit_problem(request: HttpRequest, uuid: str):
+def edit_problem(request: HttpRequest, uuid: UUID):
     user = request.user
     decoded = jsonify(decode(request.data.get("data", "")))
     print(decoded)
@@ -211,3 +245,56 @@ def add_problem(request: HttpRequest):
         }))
     })
 
+
+
+@decorators.api_view(http_method_names=["GET"])
+@decorators.authentication_classes(authentication_classes=[authentication.TokenAuthentication])
+@decorators.permission_classes(permission_classes=[permissions.IsAuthenticated])
+def get_attempt_blob(request: HttpRequest, uuid: UUID, key: str):
+    user: User = request.user
+    attempt = Attempt.objects.filter(uuid=uuid, author=user).only("cases").first()
+
+    if not attempt:
+        return Response({
+            "status": "error",
+            "code": "get_attempt_blob_001",
+            "data": None
+        })
+
+    cases = attempt.cases if isinstance(attempt.cases, list) else []
+    keys = [
+        blob
+        for case in cases
+        for blob in (case.get("blobs") or {}).values()
+    ]
+
+    if key not in keys:
+        return Response({
+            "status": "error",
+            "code": "get_attempt_blob_002", # blob is not a part of the attempt
+            "data": None
+        })
+
+    return Response({
+        "status": "success",
+        "code": "get_attempt_blob_003",
+        "data": encode(json.dumps({
+            "key": key,
+            "content": BlobStore().get(key),
+        }))
+    })
+
+
+def get_metrics(request: HttpRequest):
+    """
+    get_metrics(request) -> Judge metrics of all processes in the Prometheus text format
+    """
+    extra = {}
+    try:
+        queue = JudgeQueue()
+        extra["judge_queue_depth"] = queue.size()
+        extra["judge_workers_alive"] = len(queue.workers())
+    except Exception as e:
+        print("[ERROR]:can not read judge queue size.", e)
+
+    return HttpResponse(metrics.render(extra), content_type="text/plain; version=0.0.4")
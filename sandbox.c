@@ -19,6 +19,12 @@
 #include <sys/syscall.h>
 #include <linux/sched.h>
 #include <sys/resource.h>
+#include <signal.h>
+#include <poll.h>
+#include <sys/stat.h>
+
+// -V chiqaradigan versiya, undan eski binarylar limit flaglarini (-t, -w, -m ...), -s va -i ni bilmaydi
+#define SANDBOX_VERSION 1
 
 
 void setup_seccomp() {
@@ -85,22 +91,27 @@ void setup_seccomp() {
 }
 
 
-void set_limits(int memory_limit, int time_limit, int process_limit) {
+void set_limits(long memory_limit, long time_limit, long process_limit, long file_limit) {
     struct rlimit limit;
 
-    // Memory limit
-    limit.rlim_cur = limit.rlim_max = memory_limit * 1024 * 1024;
-    setrlimit(RLIMIT_AS, &limit);
+    // Memory limit (MB), cgroup ishlatilganda 0
+    if (memory_limit > 0) {
+        limit.rlim_cur = limit.rlim_max = memory_limit * 1024 * 1024;
+        setrlimit(RLIMIT_AS, &limit);
+    }
 
-    // Time limit
-    limit.rlim_cur = limit.rlim_max = time_limit;
+    // Time limit (ms), RLIMIT_CPU soniyalarda, aniq limit taymer bilan tekshiriladi
+    // limitda SIGXCPU, bir soniyadan keyin SIGKILL
+    limit.rlim_cur = (time_limit + 999) / 1000;
+    limit.rlim_max = limit.rlim_cur + 1;
     setrlimit(RLIMIT_CPU, &limit);
 
     // Process limit
     limit.rlim_cur = limit.rlim_max = process_limit;
     setrlimit(RLIMIT_NPROC, &limit);
 
-    limit.rlim_cur = limit.rlim_max = 1024 * 1024;
+    // File size limit (bayt)
+    limit.rlim_cur = limit.rlim_max = file_limit;
     setrlimit(RLIMIT_FSIZE, &limit);
 
     limit.rlim_cur = limit.rlim_max = 64;
@@ -111,18 +122,562 @@ void set_limits(int memory_limit, int time_limit, int process_limit) {
 }
 
 
-void write_meta(const char *meta_file, int exit_code, int signal_code, double exec_time, long max_rss) {
+pid_t child_pid = 0;
+volatile sig_atomic_t timed_out = 0;
+
+
+// wall time limit tugaganda dasturni o'ldirish
+void on_alarm(int signum) {
+    timed_out = 1;
+    if (child_pid > 0) {
+        kill(child_pid, SIGKILL);
+    }
+}
+
+
+void set_wall_limit(long wall_limit) {
+    if (wall_limit <= 0) {
+        return;
+    }
+
+    struct sigaction action;
+    memset(&action, 0, sizeof(action));
+    action.sa_handler = on_alarm;
+    sigaction(SIGALRM, &action, NULL);
+
+    struct itimerval timer;
+    memset(&timer, 0, sizeof(timer));
+    timer.it_value.tv_sec = wall_limit / 1000;
+    timer.it_value.tv_usec = (wall_limit % 1000) * 1000;
+    setitimer(ITIMER_REAL, &timer, NULL);
+}
+
+
+void stop_wall_limit() {
+    struct itimerval timer;
+    memset(&timer, 0, sizeof(timer));
+    setitimer(ITIMER_REAL, &timer, NULL);
+}
+
+
+// cgroup v2: har bir ishga alohida vaqtinchalik cgroup
+struct cgroup {
+    char path[PATH_MAX];
+    int enabled;
+};
+
+
+int write_value(const char *dir, const char *name, const char *value) {
+    char path[PATH_MAX];
+    snprintf(path, sizeof(path), "%s/%s", dir, name);
+
+    int fd = open(path, O_WRONLY);
+    if (fd == -1) {
+        return -1;
+    }
+    ssize_t size = write(fd, value, strlen(value));
+    close(fd);
+    return size == (ssize_t) strlen(value) ? 0 : -1;
+}
+
+
+// "kalit qiymat" qatorlaridan qiymatni o'qish, key NULL bo'lsa birinchi son
+long read_value(const char *dir, const char *name, const char *key) {
+    char path[PATH_MAX];
+    snprintf(path, sizeof(path), "%s/%s", dir, name);
+
+    FILE *file = fopen(path, "r");
+    if (!file) {
+        return -1;
+    }
+
+    char line[256];
+    long value = -1;
+    while (fgets(line, sizeof(line), file)) {
+        if (!key) {
+            value = atol(line);
+            break;
+        }
+        size_t length = strlen(key);
+        if (strncmp(line, key, length) == 0 && line[length] == ' ') {
+            value = atol(line + length + 1);
+            break;
+        }
+    }
+    fclose(file);
+    return value;
+}
+
+
+// cgroup yaratish, ishlamasa 0 qaytaradi va rlimit ishlatiladi
+int cgroup_create(struct cgroup *cgroup, const char *root, long memory_limit, long process_limit) {
+    static long counter = 0;
+    char value[64];
+
+    cgroup->enabled = 0;
+    if (!root || !*root || memory_limit <= 0) {
+        return 0;
+    }
+
+    // controllerlar root ichida yoqilgan bo'lishi kerak
+    write_value(root, "cgroup.subtree_control", "+memory +pids +cpu");
+
+    snprintf(cgroup->path, sizeof(cgroup->path), "%s/run-%d-%ld", root, getpid(), counter++);
+    if (mkdir(cgroup->path, 0755) == -1) {
+        return 0;
+    }
+
+    snprintf(value, sizeof(value), "%ld", memory_limit * 1024 * 1024);
+    int failed = write_value(cgroup->path, "memory.max", value);
+    snprintf(value, sizeof(value), "%ld", process_limit);
+    failed |= write_value(cgroup->path, "pids.max", value);
+
+    if (failed) {
+        rmdir(cgroup->path);
+        return 0;
+    }
+
+    write_value(cgroup->path, "memory.swap.max", "0");
+    // bitta CPU dan ko'p emas
+    write_value(cgroup->path, "cpu.max", "100000 100000");
+
+    cgroup->enabled = 1;
+    return 1;
+}
+
+
+// bola jarayon o'zini cgroup ga qo'shadi
+int cgroup_enter(struct cgroup *cgroup) {
+    char value[32];
+    snprintf(value, sizeof(value), "%d", getpid());
+    return write_value(cgroup->path, "cgroup.procs", value);
+}
+
+
+// memory.peak (KB), cpu.stat (soniya) va OOM
+void cgroup_stats(struct cgroup *cgroup, long *memory, double *cpu_time, int *oom) {
+    long peak = read_value(cgroup->path, "memory.peak", NULL);
+    if (peak >= 0) {
+        *memory = peak / 1024;
+    }
+
+    long usage = read_value(cgroup->path, "cpu.stat", "usage_usec");
+    if (usage >= 0) {
+        *cpu_time = usage / 1e6;
+    }
+
+    *oom = read_value(cgroup->path, "memory.events", "oom_kill") > 0;
+}
+
+
+void cgroup_remove(struct cgroup *cgroup) {
+    if (!cgroup->enabled) {
+        return;
+    }
+    write_value(cgroup->path, "cgroup.kill", "1");
+    for (int i = 0; i < 100 && rmdir(cgroup->path) == -1 && errno == EBUSY; i++) {
+        usleep(1000);
+    }
+}
+
+
+void write_meta(const char *meta_file, int exit_code, int signal_code, double exec_time, double cpu_time, long max_rss, int ole, int tle, int oom, int cgroup) {
     FILE *meta = fopen(meta_file, "w");
     if (meta) {
-        fprintf(meta, "{ \"exit_code\": %d, \"signal\": %d, \"time\": %.3f, \"memory\": %ld }", exit_code, signal_code, exec_time * 1000, max_rss);
+        fprintf(meta, "{ \"exit_code\": %d, \"signal\": %d, \"time\": %.3f, \"cpu_time\": %.3f, \"memory\": %ld, \"ole\": %d, \"tle\": %d, \"oom\": %d, \"cgroup\": %d }", exit_code, signal_code, exec_time * 1000, cpu_time * 1000, max_rss, ole, tle, oom, cgroup);
         fclose(meta);
     }
 }
 
 
+// dastur chiqishini output.txt ga yozish, limitdan oshsa dasturni o'ldirish
+int copy_output(int pipe_fd, int out_fd, pid_t pid, long output_limit, long line_limit) {
+    char buffer[65536];
+    long total = 0;
+    long lines = 0;
+    int ole = 0;
+    ssize_t size;
+
+    while ((size = read(pipe_fd, buffer, sizeof(buffer))) != 0) {
+        if (size < 0) {
+            if (errno == EINTR) {
+                continue;
+            }
+            break;
+        }
+
+        // dastur o'ldirilgan, qolgan chiqishni tashlab yuborish
+        if (ole) {
+            continue;
+        }
+
+        ssize_t allowed = size;
+        if (output_limit > 0 && total + size > output_limit) {
+            allowed = output_limit - total;
+            ole = 1;
+        }
+
+        if (line_limit > 0) {
+            for (ssize_t i = 0; i < allowed; i++) {
+                if (buffer[i] == '\n' && ++lines > line_limit) {
+                    allowed = i;
+                    ole = 1;
+                    break;
+                }
+            }
+        }
+
+        for (ssize_t written = 0; written < allowed; ) {
+            ssize_t result = write(out_fd, buffer + written, allowed - written);
+            if (result <= 0) {
+                break;
+            }
+            written += result;
+        }
+        total += allowed;
+
+        if (ole) {
+            kill(pid, SIGKILL);
+        }
+    }
+
+    return ole;
+}
+
+
+struct buffer {
+    char *data;
+    long size;
+    long capacity;
+};
+
+
+void buffer_append(struct buffer *buffer, const char *data, long size) {
+    if (buffer->size + size > buffer->capacity) {
+        long capacity = buffer->capacity ? buffer->capacity : 65536;
+        while (capacity < buffer->size + size) {
+            capacity *= 2;
+        }
+        char *resized = realloc(buffer->data, capacity);
+        if (!resized) {
+            return;
+        }
+        buffer->data = resized;
+        buffer->capacity = capacity;
+    }
+    memcpy(buffer->data + buffer->size, data, size);
+    buffer->size += size;
+}
+
+
+// chiqishni xotiraga o'qish, limitdan oshsa dasturni o'ldirish
+int read_output(int out_fd, int err_fd, pid_t pid, long output_limit, long line_limit, long error_limit, struct buffer *output, struct buffer *error) {
+    char chunk[65536];
+    long lines = 0;
+    int ole = 0;
+    struct pollfd fds[2] = {
+        { .fd = out_fd, .events = POLLIN },
+        { .fd = err_fd, .events = POLLIN },
+    };
+    int open_fds = 2;
+
+    while (open_fds > 0) {
+        if (poll(fds, 2, -1) < 0) {
+            if (errno == EINTR) {
+                continue;
+            }
+            break;
+        }
+
+        for (int i = 0; i < 2; i++) {
+            if (fds[i].fd < 0 || !(fds[i].revents & (POLLIN | POLLHUP | POLLERR))) {
+                continue;
+            }
+
+            ssize_t size = read(fds[i].fd, chunk, sizeof(chunk));
+            if (size < 0 && errno == EINTR) {
+                continue;
+            }
+            if (size <= 0) {
+                fds[i].fd = -1;
+                open_fds--;
+                continue;
+            }
+
+            if (i == 1) {
+                long allowed = error_limit - error->size;
+                buffer_append(error, chunk, size < allowed ? size : (allowed > 0 ? allowed : 0));
+                continue;
+            }
+
+            // dastur o'ldirilgan, qolgan chiqishni tashlab yuborish
+            if (ole) {
+                continue;
+            }
+
+            ssize_t allowed = size;
+            if (output_limit > 0 && output->size + size > output_limit) {
+                allowed = output_limit - output->size;
+                ole = 1;
+            }
+
+            if (line_limit > 0) {
+                for (ssize_t j = 0; j < allowed; j++) {
+                    if (chunk[j] == '\n' && ++lines > line_limit) {
+                        allowed = j;
+                        ole = 1;
+                        break;
+                    }
+                }
+            }
+
+            buffer_append(output, chunk, allowed);
+
+            if (ole) {
+                kill(pid, SIGKILL);
+            }
+        }
+    }
+
+    return ole;
+}
+
+
+// so'rov: "time\twall\tmemory\tprocesses\tfile_size\toutput_limit\tline_limit\tcgroup_memory\tcwd\tinput\tbuyruq\targumentlar...\n"
+// javob: meta json qatori, keyin "output" bayt chiqish va "error" bayt xatolar
+int serve(const char *cgroup_root) {
+    char *line = NULL;
+    size_t line_size = 0;
+    ssize_t length;
+
+    signal(SIGPIPE, SIG_DFL);
+
+    while ((length = getline(&line, &line_size, stdin)) > 0) {
+        if (line[length - 1] == '\n') {
+            line[--length] = '\0';
+        }
+
+        char *fields[256];
+        int count = 0;
+        char *saveptr = NULL;
+        for (char *field = strtok_r(line, "\t", &saveptr); field && count < 255; field = strtok_r(NULL, "\t", &saveptr)) {
+            fields[count++] = field;
+        }
+        fields[count] = NULL;
+
+        if (count < 11) {
+            printf("{ \"error\": \"bad request\" }\n");
+            fflush(stdout);
+            continue;
+        }
+
+        long time_limit = atol(fields[0]);
+        long wall_limit = atol(fields[1]);
+        long memory_limit = atol(fields[2]);
+        long process_limit = atol(fields[3]);
+        long file_limit = atol(fields[4]);
+        long output_limit = atol(fields[5]);
+        long line_limit = atol(fields[6]);
+        long cgroup_memory = atol(fields[7]);
+        char *cwd = fields[8];
+        char *input = fields[9];
+        char **command = &fields[10];
+
+        struct cgroup cgroup;
+        cgroup_create(&cgroup, cgroup_root, cgroup_memory, process_limit);
+
+        int out_pipe[2], err_pipe[2];
+        if (pipe(out_pipe) == -1 || pipe(err_pipe) == -1) {
+            perror("pipe xatosi");
+            return 1;
+        }
+
+        struct timespec start, end;
+        clock_gettime(CLOCK_MONOTONIC, &start);
+
+        pid_t pid = fork();
+        if (pid == -1) {
+            perror("fork xatosi");
+            return 1;
+        }
+
+        if (pid == 0) {
+            close(out_pipe[0]);
+            close(err_pipe[0]);
+
+            if (chdir(cwd) == -1) {
+                exit(1);
+            }
+
+            int in_fd = open(input, O_RDONLY);
+            if (in_fd == -1) {
+                exit(1);
+            }
+            dup2(in_fd, STDIN_FILENO);
+            dup2(out_pipe[1], STDOUT_FILENO);
+            dup2(err_pipe[1], STDERR_FILENO);
+            close(in_fd);
+            close(out_pipe[1]);
+            close(err_pipe[1]);
+
+            // cgroup xotirani cheklaydi, RLIMIT_AS kerak emas
+            if (cgroup.enabled && cgroup_enter(&cgroup) == 0) {
+                memory_limit = 0;
+            }
+
+            setup_seccomp();
+            set_limits(memory_limit, time_limit, process_limit, file_limit);
+            execvp(command[0], command);
+
+            perror("execvp error");
+            exit(1);
+        }
+
+        close(out_pipe[1]);
+        close(err_pipe[1]);
+        child_pid = pid;
+        timed_out = 0;
+        set_wall_limit(wall_limit);
+
+        struct buffer output = { 0 }, error = { 0 };
+        int ole = read_output(out_pipe[0], err_pipe[0], pid, output_limit, line_limit, file_limit, &output, &error);
+        close(out_pipe[0]);
+        close(err_pipe[0]);
+
+        int status;
+        struct rusage usage;
+        while (wait4(pid, &status, 0, &usage) == -1 && errno == EINTR);
+        stop_wall_limit();
+        child_pid = 0;
+        clock_gettime(CLOCK_MONOTONIC, &end);
+
+        double exec_time = (end.tv_sec - start.tv_sec) + (end.tv_nsec - start.tv_nsec) / 1e9;
+        int exit_code = WIFEXITED(status) ? WEXITSTATUS(status) : -1;
+        int signal_code = WIFSIGNALED(status) ? WTERMSIG(status) : 0;
+        double cpu_time = usage.ru_utime.tv_sec + usage.ru_stime.tv_sec + (usage.ru_utime.tv_usec + usage.ru_stime.tv_usec) / 1e6;
+        long max_rss = usage.ru_maxrss;
+        int oom = 0;
+
+        if (cgroup.enabled) {
+            cgroup_stats(&cgroup, &max_rss, &cpu_time, &oom);
+            cgroup_remove(&cgroup);
+        }
+
+        int tle = !ole && !oom && (
+            timed_out ||
+            signal_code == SIGXCPU ||
+            (signal_code == SIGKILL && cpu_time * 1000 >= time_limit) ||
+            cpu_time * 1000 > time_limit
+        );
+
+        printf(
+            "{ \"exit_code\": %d, \"signal\": %d, \"time\": %.3f, \"cpu_time\": %.3f, \"memory\": %ld, \"ole\": %d, \"tle\": %d, \"oom\": %d, \"cgroup\": %d, \"output\": %ld, \"error\": %ld }\n",
+            exit_code, signal_code, exec_time * 1000, cpu_time * 1000, max_rss, ole, tle, oom, cgroup.enabled, output.size, error.size
+        );
+        fwrite(output.data, 1, output.size, stdout);
+        fwrite(error.data, 1, error.size, stdout);
+        fflush(stdout);
+
+        free(output.data);
+        free(error.data);
+    }
+
+    free(line);
+    return 0;
+}
+
+
+void usage(const char *name) {
+    printf("Foydalanish: %s -s [-c cgroup] (so'rovlarni stdin dan qabul qilish)\n", name);
+    printf("           %s [-t cpu] [-w wall] [-m memory] [-p processes] [-f file_size] [-o output_limit] [-l line_limit] [-c cgroup -M memory] [-i] <buyruq>\n", name);
+    printf("  -t  CPU vaqt limiti (ms)\n");
+    printf("  -w  haqiqiy vaqt limiti (ms)\n");
+    printf("  -m  xotira (address space) limiti (MB)\n");
+    printf("  -p  jarayonlar limiti\n");
+    printf("  -f  fayl hajmi limiti (bayt)\n");
+    printf("  -o  chiqish hajmi limiti (bayt)\n");
+    printf("  -l  chiqish qatorlari limiti\n");
+    printf("  -c  cgroup v2 papkasi, ishlamasa rlimit ishlatiladi\n");
+    printf("  -M  cgroup xotira limiti, memory.max (MB)\n");
+    printf("  -i  interaktiv: dastur stdout i o'zgarmaydi (interaktorga ulangan), output.txt yozilmaydi\n");
+    printf("  -V  versiyani chiqarish\n");
+}
+
+
 int main(int argc, char *argv[]) {
-    if (argc < 2) {
-        printf("Foydalanish: %s <buyruq>\n", argv[0]);
+    long time_limit = 2000;
+    long wall_limit = 0;
+    long memory_limit = 128;
+    long process_limit = 32;
+    long file_limit = 1024 * 1024;
+    long output_limit = 1024 * 1024;
+    long line_limit = 0;
+    long cgroup_memory = 0;
+    const char *cgroup_root = NULL;
+    int server = 0;
+    int interactive = 0;
+    int option;
+
+    // "+" - birinchi buyruqdan keyingi argumentlar dasturga tegishli
+    while ((option = getopt(argc, argv, "+sic:VM:t:w:m:p:f:o:l:")) != -1) {
+        switch (option) {
+            case 's':
+                server = 1;
+                break;
+            case 'i':
+                interactive = 1;
+                break;
+            case 'V':
+                printf("algoland-sandbox %d\n", SANDBOX_VERSION);
+                return 0;
+            case 'c':
+                cgroup_root = optarg;
+                break;
+            case 'M':
+                cgroup_memory = atol(optarg);
+                break;
+            case 't':
+                time_limit = atol(optarg);
+                break;
+            case 'w':
+                wall_limit = atol(optarg);
+                break;
+            case 'm':
+                memory_limit = atol(optarg);
+                break;
+            case 'p':
+                process_limit = atol(optarg);
+                break;
+            case 'f':
+                file_limit = atol(optarg);
+                break;
+            case 'o':
+                output_limit = atol(optarg);
+                break;
+            case 'l':
+                line_limit = atol(optarg);
+                break;
+            default:
+                usage(argv[0]);
+                return 1;
+        }
+    }
+
+    if (server) {
+        return serve(cgroup_root);
+    }
+
+    if (optind >= argc) {
+        usage(argv[0]);
+        return 1;
+    }
+
+    struct cgroup cgroup;
+    cgroup_create(&cgroup, cgroup_root, cgroup_memory, process_limit);
+
+    int pipe_fds[2] = { -1, -1 };
+    if (!interactive && pipe(pipe_fds) == -1) {
+        perror("pipe xatosi");
         return 1;
     }
 
@@ -136,13 +691,12 @@ int main(int argc, char *argv[]) {
     clock_gettime(CLOCK_MONOTONIC, &start);
 
     if (pid == 0) {
-        int out_fd = open("output.txt", O_WRONLY | O_CREAT | O_TRUNC, 0644);
-        if (out_fd == -1) {
-            perror("output.txt ochilmadi");
-            exit(1);
+        // interaktiv rejimda stdout interaktorga ulangan
+        if (!interactive) {
+            close(pipe_fds[0]);
+            dup2(pipe_fds[1], STDOUT_FILENO);
+            close(pipe_fds[1]);
         }
-        dup2(out_fd, STDOUT_FILENO);
-        close(out_fd);
 
         int err_fd = open("error.txt", O_WRONLY | O_CREAT | O_TRUNC, 0644);
         if (err_fd == -1) {
@@ -152,15 +706,40 @@ int main(int argc, char *argv[]) {
         dup2(err_fd, STDERR_FILENO);
         close(err_fd);
 
+        // cgroup xotirani cheklaydi, RLIMIT_AS kerak emas
+        if (cgroup.enabled && cgroup_enter(&cgroup) == 0) {
+            memory_limit = 0;
+        }
+
         setup_seccomp();
-        set_limits(128, 2, 32);
-        execvp(argv[1], &argv[1]);
+        set_limits(memory_limit, time_limit, process_limit, file_limit);
+        execvp(argv[optind], &argv[optind]);
 
         perror("execvp error");
         exit(1);
     } else {
+        child_pid = pid;
+        set_wall_limit(wall_limit);
+        int ole = 0;
+
+        if (!interactive) {
+            close(pipe_fds[1]);
+
+            int out_fd = open("output.txt", O_WRONLY | O_CREAT | O_TRUNC, 0644);
+            if (out_fd == -1) {
+                perror("output.txt ochilmadi");
+                kill(pid, SIGKILL);
+            }
+
+            ole = copy_output(pipe_fds[0], out_fd, pid, output_limit, line_limit);
+            close(pipe_fds[0]);
+            if (out_fd != -1) {
+                close(out_fd);
+            }
+        }
+
         int status;
-        waitpid(pid, &status, 0);
+        while (waitpid(pid, &status, 0) == -1 && errno == EINTR);
         clock_gettime(CLOCK_MONOTONIC, &end);
 
         double exec_time = (end.tv_sec - start.tv_sec) + (end.tv_nsec - start.tv_nsec) / 1e9;
@@ -170,8 +749,23 @@ int main(int argc, char *argv[]) {
         struct rusage usage;
         getrusage(RUSAGE_CHILDREN, &usage);
         long max_rss = usage.ru_maxrss;
+        double cpu_time = usage.ru_utime.tv_sec + usage.ru_stime.tv_sec + (usage.ru_utime.tv_usec + usage.ru_stime.tv_usec) / 1e6;
+        int oom = 0;
+
+        if (cgroup.enabled) {
+            cgroup_stats(&cgroup, &max_rss, &cpu_time, &oom);
+            cgroup_remove(&cgroup);
+        }
+
+        // vaqt limiti: taymer, RLIMIT_CPU (SIGXCPU yoki SIGKILL) yoki CPU vaqti limitdan oshgan
+        int tle = !ole && !oom && (
+            timed_out ||
+            signal_code == SIGXCPU ||
+            (signal_code == SIGKILL && cpu_time * 1000 >= time_limit) ||
+            cpu_time * 1000 > time_limit
+        );
 
-        write_meta("meta.json", exit_code, signal_code, exec_time, max_rss);
+        write_meta("meta.json", exit_code, signal_code, exec_time, cpu_time, max_rss, ole, tle, oom, cgroup.enabled);
     }
 
     return 0;
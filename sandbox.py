@@ -3,16 +3,26 @@ import time
 import json
 import django
 import shutil
-import difflib
-import zipfile
+import signal
+import threading
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 
 
-os.environ['DJANGO_SETTINGS_MODULE'] = 'config.settings'
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
+from utils.store import TestStore, ProgramStore, ProgramError
+from utils.blobs import BlobStore, preview, read_preview
+from utils.workspaces import WorkspacePool
+from utils.runner import RunnerPool, RunnerError
+from utils.zygote import split_command
+from utils.metrics import metrics
+from utils.checker import get_comparator, get_interactor
+from utils.cache import CompileCache, VerdictCache
 from problems.models import (
     Language,
     Attempt,
@@ -21,16 +31,17 @@ from problems.models import (
 class Workspace:
     def __init__(self, name: str):
         self.name = name
-        self.cwd = f"{os.getcwd()}/workspaces/{self.name}"
+        self.cwd = workspace_pool.path(self.name)
 
     def init(self):
         """
-        init() -> Create workspace folder with named self.name
+        init() -> Take workspace folder named self.name from the workspace pool
         """
         try:
-            os.mkdir(f"workspaces/{self.name}")
+            with metrics.timer("workspace_init"):
+                workspace_pool.acquire(self.name)
         except Exception as e:
-            print("[ERROR]:can not init workspace.")
+            print("[ERROR]:can not init workspace.", e)
 
     def add_file(self, file_name: str, content: str):
         """
@@ -39,7 +50,7 @@ class Workspace:
         file_name - string
         content - string
         """
-        with open(f"workspaces/{self.name}/{file_name}", "w") as file:
+        with metrics.timer("add_file"), open(f"{self.cwd}/{file_name}", "w") as file:
             if file.writable():
                 file.write(str(content))
 
@@ -49,17 +60,118 @@ class Workspace:
 
         from_path - string
         """
-        shutil.copy(from_path, f"workspaces/{self.name}")
+        with metrics.timer("copy"):
+            shutil.copy(from_path, self.cwd)
+
+    def link(self, from_path: str):
+        """
+        link(from_path) -> Link the shared read only copy of from_path (sandbox binary) to workspace
+
+        from_path - string
+        """
+        with metrics.timer("link"):
+            os.symlink(workspace_pool.binary(from_path), f"{self.cwd}/{os.path.basename(from_path)}")
+
+    def read_bytes(self, file_name: str):
+        with open(f"{self.cwd}/{file_name}", "rb") as o:
+            return o.read()
 
     def read(self, file_name: str):
-        with open(f"workspaces/{self.name}/{file_name}", "r") as o:
+        with open(f"{self.cwd}/{file_name}", "r") as o:
             return Sandbox.clean(o.read())
         
     def clean(self):
         """
-        clean() -> Delete workspace
+        clean() -> Empty workspace and give its folder back to the workspace pool
         """
-        shutil.rmtree(f"workspaces/{self.name}")
+        if os.path.isdir(self.cwd):
+            workspace_pool.release(self.cwd)
+
+
+compile_cache = CompileCache()
+verdict_cache = VerdictCache()
+tests_store = TestStore()
+# checkers and interactors of problems
+program_store = ProgramStore()
+blob_store = BlobStore()
+workspace_pool = WorkspacePool()
+# long-lived sandbox processes, tests are run without output.txt, error.txt and meta.json files
+runner_pool = RunnerPool(settings.JUDGE_RUNNER.get("size")) if settings.JUDGE_RUNNER.get("enabled") else None
+# fork servers of interpreters (utils/zygote.py), tests of interpreted languages do not start the interpreter
+zygote_pool = RunnerPool(settings.JUDGE_ZYGOTE.get("size")) if settings.JUDGE_ZYGOTE.get("enabled") else None
+# sandbox binaries older than this version take no limit flags (-t, -w, -m ...), no -s and no -i
+SANDBOX_VERSION = 1
+
+
+def sandbox_flags(language: Language):
+    """
+    sandbox_flags(language) -> True when the sandbox binary of the language takes limit flags, -s and -i
+    """
+    return workspace_pool.version(language.sandbox) >= SANDBOX_VERSION
+
+
+def compile_code(workspace: Workspace, language: Language, code, command: str):
+    """
+    compile_code(workspace, language, code, command) -> Compile the code in the workspace, compiled files of the same code are taken from the compile cache
+
+    code - string or bytes, the code which is written to the workspace
+    command - compile command of the language
+    """
+    start_time = time.time()
+    key = compile_cache.key(language, code)
+
+    # the same code is already compiled
+    if compile_cache.restore(key, workspace.cwd):
+        metrics.inc("judge_compile_cache_total", status="hit", language=language.short)
+        return {
+            "status": "cc",
+            "stderr": "",
+            "stdout": "",
+            "stdin": "",
+            "expected": "",
+            "time": round((time.time() - start_time) * 1000, 2),
+            "memory": 0,
+            "test": 0,
+            "cache": compile_cache.counters("hit"),
+        }
+
+    if compile_cache.enabled:
+        metrics.inc("judge_compile_cache_total", status="miss", language=language.short)
+    before = compile_cache.snapshot(workspace.cwd)
+
+    try:
+        print(command)
+        result = subprocess.run(
+            command.split(),
+            cwd=workspace.cwd,
+            timeout=5,
+            text=True,
+            capture_output=True
+        )
+        stderr = result.stderr
+        stdout = result.stdout
+        status = "cc" if not stderr else "ce"
+    except subprocess.TimeoutExpired:
+        status = "cle"
+        stderr = ""
+        stdout = ""
+    elapsed_time = round((time.time() - start_time) * 1000, 2)
+
+    if status == "cc":
+        compile_cache.store(key, workspace.cwd, before)
+
+    return {
+        "status": status,
+        "stderr": stderr,
+        "stdout": stdout,
+        "stdin": "",
+        "expected": "",
+        "time": elapsed_time,
+        "memory": 0,
+        "test": 0,
+        "cache": compile_cache.counters("miss"),
+    }
+
 
 
 SANDBOX_VERDICTS = {
@@ -110,6 +222,21 @@ class Sandbox:
     def parse_command(self, type: str = "compile"):
         return self.language.parse_command(type, **{ "cwd": self.workspace.cwd, "file": self.language.file })
 
+    def run_command(self):
+        """
+        run_command() -> Run command with time and memory limits given to the sandbox
+        """
+        command = self.parse_command("run").split()
+        # old sandbox binary runs the program with its built-in limits
+        if not sandbox_flags(self.language):
+            return command
+        limits = [
+            "-t", str(self.time_limit * 1000),
+            "-w", str(self.time_limit * 1000),
+            "-m", str(max(settings.JUDGE_SANDBOX.get("address_space_min"), self.memory_limit // 1000 * settings.JUDGE_SANDBOX.get("address_space_factor"))),
+        ]
+        return command[:1] + limits + command[1:]
+
     def clean(self, text: str):
         if text:
             return text.strip()
@@ -123,7 +250,7 @@ class Sandbox:
     
     def parse_meta(self):
         meta = {}
-        with open(f"workspaces/{self.workspace.name}/meta.json", "r") as meta_file:
+        with open(f"{self.workspace.cwd}/meta.json", "r") as meta_file:
             meta = json.load(meta_file)
         return {
             "time": meta.get("time", 0),
@@ -134,45 +261,13 @@ class Sandbox:
     def compile(self):
         # start compiling...
         # send compiling to client
-        start_time = time.time()
-        status = "wc"
-        stdout = ""
-        stderr = ""
-
-        try:
-            print(self.parse_command("compile"))
-            result = subprocess.run(
-                self.parse_command("compile").split(),
-                cwd=self.workspace.cwd,
-                timeout=5,
-                text=True,
-                capture_output=True
-            )
-            stderr = result.stderr
-            stdout = result.stdout
-            status = "cc" if not stderr else "ce"
-            elapsed_time = round((time.time() - start_time) * 1000, 2)
-        except subprocess.TimeoutExpired:
-            status = "cle"
-            stderr = ""
-            stdout = ""
-            elapsed_time = round((time.time() - start_time) * 1000, 2)
-        response = {
-            "status": status,
-            "stderr": stderr,
-            "stdout": stdout,
-            "stdin": "",
-            "expected": "",
-            "time": elapsed_time,
-            "memory": 0,
-            "test": 0,
-        }
-        return response
+        return compile_code(self.workspace, self.language, self.workspace.read_bytes(self.language.file), self.parse_command("compile"))
         # end compiling.
     
     def run(self):
         if self.language.type == "compiled":
-            compile = self.compile()
+            with metrics.timer("compile"):
+                compile = self.compile()
             if compile.get("status") == "ce" or compile.get("status") == "cle":
                 return compile
         
@@ -183,14 +278,15 @@ class Sandbox:
         memory = 0
         
         try:
-            result = subprocess.run(
-                self.parse_command("run").split(),
-                cwd=self.workspace.cwd,
-                timeout=self.time_limit,
-                text=True,
-                capture_output=True,
-                input=self.stdin,
-            )
+            with metrics.timer("spawn"):
+                result = subprocess.run(
+                    self.run_command(),
+                    cwd=self.workspace.cwd,
+                    timeout=self.time_limit + settings.JUDGE_SANDBOX.get("wall_margin"),
+                    text=True,
+                    capture_output=True,
+                    input=self.stdin,
+                )
             stderr = self.workspace.read("error.txt")
             stdout = self.workspace.read("output.txt")
             elapsed_time = round((time.time() - start_time) * 1000, 2)
@@ -228,6 +324,64 @@ class Sandbox:
 
 
 
+# fields of the attempt changed by the judge
+RESULT_FIELDS = ["status", "time", "memory", "error", "test", "cases", "score", "groups"]
+
+
+class Reporter:
+    """
+    Reporter buffers progress of the judge.
+
+    Attempt is saved with update_fields at most once per save_interval, case events are coalesced
+    to at most one per event_interval (the latest case is sent). Final verdict is sent and saved immediately.
+    """
+    def __init__(self, judge: "Judge"):
+        config = settings.JUDGE_REPORTER
+        self.judge = judge
+        self.save_interval = config.get("save_interval")
+        self.event_interval = config.get("event_interval")
+        self.saved = time.monotonic()
+        # the first case is sent without waiting
+        self.sent = 0
+        self.pending = None
+
+    def case(self, response: dict):
+        """
+        case(response) -> Report checked case, event and save are done only when their interval is over
+        """
+        now = time.monotonic()
+        self.pending = response
+
+        if now - self.sent >= self.event_interval:
+            self.send()
+        if now - self.saved >= self.save_interval:
+            self.save(["cases"])
+
+    def send(self):
+        """
+        send() -> Send the latest case which is not sent yet
+        """
+        if self.pending:
+            self.judge.send_case(self.pending)
+            self.pending = None
+            self.sent = time.monotonic()
+
+    def save(self, fields: list):
+        with metrics.timer("save"):
+            self.judge.attempt.save(update_fields=fields)
+        self.saved = time.monotonic()
+
+    def finish(self, status: bool = False):
+        """
+        finish(status) -> Send the pending case and the final status (when status is True), save the result
+        """
+        self.send()
+        if status:
+            attempt = self.judge.attempt
+            self.judge.send_status(attempt.status, attempt.time, attempt.memory, attempt.error)
+        self.save(RESULT_FIELDS)
+
+
 class Judge:
     def __init__(self, attempt: Attempt):
         self.attempt = attempt
@@ -235,26 +389,107 @@ class Judge:
         self.language = attempt.language
         self.time_limit = self.attempt.problem.time_limit
         self.memory_limit = self.attempt.problem.memory_limit * 1000
+        self.output_limit = self.attempt.problem.output_limit * 1024
+        self.line_limit = self.attempt.problem.line_limit
         self.channel_layer = channel_layer = get_channel_layer()
         self.cases = []
-
-        self.workspace.init()
-        self.workspace.add_file(self.language.file, self.attempt.code)
-        self.workspace.copy(self.language.sandbox)
+        self.parallel = settings.JUDGE_PARALLEL_CASES
+        # built by programs() when the attempt is checked
+        self.comparator = None
+        self.interactor = None
+        self.lock = threading.Lock()
+        self.failed = float("inf")
+        self.processes = {}
+        self.zygote = self.zygote_command()
+        self.reporter = Reporter(self)
 
     def tests(self):
-        archive = zipfile.ZipFile(self.attempt.problem.tests.path, "r")
+        """
+        tests() -> List of extracted tests of the problem, dicts with "input" and "output" paths
+        """
+        return tests_store.get(self.attempt.problem)
 
-        tests = []
+    def parse_command(self, type: str = "compile"):
+        return self.language.parse_command(type, **{ "cwd": self.workspace.cwd, "file": self.language.file })
 
-        for test in archive.filelist:
-            if not test.is_dir():
-                tests.append(test.filename)
+    def limits(self):
+        """
+        limits() -> Time, memory and output limits of the problem given to the sandbox
+        """
+        config = settings.JUDGE_SANDBOX
+        return {
+            "time": self.time_limit * 1000,
+            "wall": self.time_limit * config.get("wall_factor") * 1000,
+            "memory": max(
+                config.get("address_space_min"),
+                self.attempt.problem.memory_limit * config.get("address_space_factor"),
+            ),
+            "processes": config.get("processes"),
+            "file_size": config.get("file_size"),
+            "output": self.output_limit,
+            "lines": self.line_limit,
+            # memory.max of the cgroup, 0 when cgroups are not used
+            "cgroup_memory": self.attempt.problem.memory_limit if config.get("cgroup") else 0,
+        }
 
-        return [tests[i:i + 2] for i in range(0, len(tests), 2)]
+    def run_command(self, interactive: bool = False):
+        """
+        run_command(interactive) -> Run command with time, memory and output limits of the problem given to the sandbox
 
-    def parse_command(self, type: str = "compile"):
-        return self.language.parse_command(type, **{ "cwd": self.workspace.cwd, "file": self.language.file })
+        interactive - stdout of the program is not written to output.txt, it goes to the interactor
+        """
+        command = self.parse_command("run").split()
+        # old sandbox binary runs the program with its built-in limits
+        if not sandbox_flags(self.language):
+            return command
+        limits = self.limits()
+        flags = [
+            "-t", str(limits.get("time")),
+            "-w", str(limits.get("wall")),
+            "-m", str(limits.get("memory")),
+            "-p", str(limits.get("processes")),
+            "-f", str(limits.get("file_size")),
+            "-o", str(limits.get("output")),
+            "-l", str(limits.get("lines")),
+        ]
+        if settings.JUDGE_SANDBOX.get("cgroup"):
+            flags += ["-c", settings.JUDGE_SANDBOX.get("cgroup"), "-M", str(limits.get("cgroup_memory"))]
+        if interactive:
+            flags += ["-i"]
+        return command[:1] + flags + command[1:]
+
+    def runner_command(self):
+        """
+        runner_command() -> Command which starts `sandbox -s` of the language, None for the default command
+        """
+        if not settings.JUDGE_SANDBOX.get("cgroup"):
+            return None
+        return [os.path.abspath(self.language.sandbox), "-s", "-c", settings.JUDGE_SANDBOX.get("cgroup")]
+
+    def zygote_command(self):
+        """
+        zygote_command() -> Command which starts the fork server of the language, None when the language has no fork server
+        """
+        if not zygote_pool or self.language.type != "interpreted":
+            return None
+        if self.language.short not in settings.JUDGE_ZYGOTE.get("languages"):
+            return None
+        # cwd/sandbox-py python3 [options] cwd/file
+        command = self.parse_command("run").split()
+        try:
+            options, _ = split_command(command[2:])
+        except ValueError as e:
+            print("[ERROR]:run command can not be used by the fork server.", self.language.short, e)
+            return None
+        # options like -S and -O apply to the whole fork server
+        return [command[1], "-I", *options, os.path.join(settings.BASE_DIR, "utils", "zygote.py")]
+
+    def timeout(self):
+        """
+        timeout() -> Seconds to wait for the sandbox, it stops the program itself, this only guards against a stuck sandbox
+        """
+        config = settings.JUDGE_SANDBOX
+        return self.time_limit * config.get("wall_factor") + config.get("wall_margin")
 
     def clean(self, text: str):
         if text:
@@ -268,532 +503,702 @@ class Judge:
             return text.strip()
         return text
     
-    def parse_meta(self):
+    def parse_meta(self, workspace: Workspace = None):
         meta = {}
-        with open(f"workspaces/{self.workspace.name}/meta.json", "r") as meta_file:
-            meta = json.load(meta_file)
+        workspace = workspace or self.workspace
+        try:
+            with metrics.timer("parse_meta"), open(f"{workspace.cwd}/meta.json", "r") as meta_file:
+                meta = json.load(meta_file)
+        except (OSError, json.JSONDecodeError):
+            pass
         return {
             "time": meta.get("time", 0),
+            # sandboxes built before cpu_time was added report only the wall time
+            "cpu_time": meta.get("cpu_time", meta.get("time", 0)),
             "memory": meta.get("memory", 0),
             "exit_code": meta.get("exit_code", 0),
             "signal": meta.get("signal", 0),
+            "ole": meta.get("ole", 0),
+            "tle": meta.get("tle", 0),
+            "oom": meta.get("oom", 0),
         }
 
     def compile(self):
         # start compiling...
         # send compiling to client
-        start_time = time.time()
-        status = "wc"
-        stdout = ""
-        stderr = ""
-
-        try:
-            print(self.parse_command("compile"))
-            result = subprocess.run(
-                self.parse_command("compile").split(),
-                cwd=self.workspace.cwd,
-                timeout=5,
-                text=True,
-                capture_output=True
-            )
-            stderr = result.stderr
-            stdout = result.stdout
-            status = "cc" if not stderr else "ce"
-            elapsed_time = round((time.time() - start_time) * 1000, 2)
-        except subprocess.TimeoutExpired:
-            status = "cle"
-            stderr = ""
-            stdout = ""
-            elapsed_time = round((time.time() - start_time) * 1000, 2)
-        response = {
-            "status": status,
-            "stderr": stderr,
-            "stdout": stdout,
-            "stdin": "",
-            "expected": "",
-            "time": elapsed_time,
-            "memory": 0,
-            "test": 0,
-        }
-        return response
+        return compile_code(self.workspace, self.language, self.attempt.code, self.parse_command("compile"))
         # end compiling.
     
     def run(self):
+        start = time.perf_counter()
+        metrics.add("judge_active_runs", 1)
+        try:
+            key, result = verdict_cache.get(self.attempt)
+
+            # the same code is already checked with the same tests and limits
+            if result:
+                return self.replay(result)
+
+            # workspace is needed only when the attempt is checked, it is emptied even when the judge fails
+            self.workspace.init()
+            try:
+                self.workspace.add_file(self.language.file, self.attempt.code)
+                self.workspace.link(self.language.sandbox)
+                response = self.judge()
+            finally:
+                self.workspace.clean()
+
+            verdict_cache.set(key, self.attempt)
+            return response
+        finally:
+            metrics.add("judge_active_runs", -1)
+            metrics.observe("judge_attempt_seconds", time.perf_counter() - start, language=self.language.short)
+            metrics.inc("judge_verdicts_total", status=self.attempt.status, language=self.language.short)
+
+    def replay(self, result: dict):
+        """
+        replay(result) -> Save cached result to the attempt and send its events to the client
+        """
+        cases = result.get("cases")
+        self.attempt.score = result.get("score", 0)
+        self.attempt.groups = result.get("groups", [])
+
+        if isinstance(cases, dict):
+            self.send_compile(cases)
+        else:
+            for response in cases:
+                self.send_case(response)
+
+            # status of attempts with test groups is sent even when a test failed
+            if result.get("status") == "ac" or result.get("groups"):
+                self.send_status(result.get("status"), result.get("time"), result.get("memory"), result.get("error"))
+
+        self.attempt.status = result.get("status")
+        self.attempt.time = result.get("time")
+        self.attempt.memory = result.get("memory")
+        self.attempt.error = result.get("error")
+        self.attempt.test = result.get("test")
+        self.attempt.cases = cases
+        with metrics.timer("save"):
+            self.attempt.save(update_fields=RESULT_FIELDS)
+        print("[JUDGE]:verdict cache hit", self.attempt.uuid)
+        return result
+
+    def group_send(self, event: dict):
+        """
+        group_send(event) -> Send event to the author of the attempt
+        """
+        with metrics.timer("group_send"):
+            async_to_sync(self.channel_layer.group_send)(f"user_{self.attempt.author.pk}", event)
+
+    def send_compile(self, compile: dict):
+        self.group_send(
+            {
+                "type": "attempt_case",
+                "data": {
+                    "status": compile.get("status"),
+                    "time": compile.get("time"),
+                    "memory": compile.get("memory"),
+                    "stderr": compile.get("stderr"),
+                    "test": 0,
+                }
+            }
+        )
+
+    def send_case(self, response: dict):
+        self.group_send(
+            {
+                "type": "attempt_case",
+                "data": {
+                    "problem": str(self.attempt.problem.uuid),
+                    "attempt": str(self.attempt.uuid),
+                    "status": response.get("status"),
+                    "time": response.get("time"),
+                    "memory": response.get("memory"),
+                    "stderr": response.get("stderr") if response.get("status") != "ac" else None,
+                    "test": response.get("test"),
+                }
+            }
+        )
+
+    def send_status(self, status: str, e_time: float, memory: int, stderr: str):
+        self.group_send(
+            {
+                "type": "attempt_status",
+                "data": {
+                    "problem": str(self.attempt.problem.uuid),
+                    "attempt": str(self.attempt.uuid),
+                    "status": status,
+                    "time": e_time,
+                    "memory": memory,
+                    "stderr": stderr,
+                    "score": self.attempt.score,
+                    "groups": self.attempt.groups,
+                }
+            }
+        )
+
+    def programs(self):
+        """
+        programs() -> Build comparator and interactor of the problem, False when the checker or interactor can not be built
+        """
+        problem = self.attempt.problem
+        try:
+            self.comparator = get_comparator(problem, program_store)
+            self.interactor = get_interactor(problem, program_store)
+        except ProgramError as e:
+            print("[ERROR]:can not build program of the problem.", problem.pk, e)
+            return False
+
+        if not self.comparator:
+            print("[ERROR]:checker of the problem is not uploaded.", problem.pk)
+            return False
+        if problem.judge_type == "interactive" and not self.interactor:
+            print("[ERROR]:interactor of the problem is not uploaded.", problem.pk)
+            return False
+        # interactive tests need `sandbox -i`
+        if self.interactor and not sandbox_flags(self.language):
+            print("[ERROR]:sandbox binary of the language can not run interactive tests.", self.language.sandbox)
+            return False
+        return True
+
+    def judge(self):
+        # errors of the checker or interactor are not shown to the author of the attempt
+        if not self.programs():
+            self.attempt.status = "je"
+            self.attempt.time = 0
+            self.attempt.memory = 0
+            self.attempt.error = ""
+            self.attempt.test = 0
+            self.reporter.finish(status=True)
+            return
+
         if self.language.type == "compiled":
-            compile = self.compile()
+            with metrics.timer("compile"):
+                compile = self.compile()
             if compile.get("status") == "ce" or compile.get("status") == "cle":
-                async_to_sync(self.channel_layer.group_send)(
-                    f"user_{self.attempt.author.pk}",
-                    {
-                        "type": "attempt_case",
-                        "data": {
-                            "status": compile.get("status"),
-                            "time": compile.get("time"),
-                            "memory": compile.get("memory"),
-                            "stderr": compile.get("stderr"),
-                            "test": 0,
-                        }
-                    }
-                )
+                self.send_compile(compile)
                 self.attempt.status = compile.get("status")
                 self.attempt.time = compile.get("time")
                 self.attempt.memory = compile.get("memory")
                 self.attempt.error = compile.get("stderr")
                 self.attempt.test = 0
                 self.attempt.cases = compile
-                self.attempt.save()
+                with metrics.timer("save"):
+                    self.attempt.save(update_fields=RESULT_FIELDS)
                 return compile
         
-        start_time = time.time()
-        status = "wc"
+        try:
+            tests = self.tests()
+            groups = tests_store.groups(self.attempt.problem)
+        except Exception as e:
+            print("[ERROR]:can not get tests of the problem.", self.attempt.problem.pk, e)
+            tests, groups = [], None
+        if groups:
+            return self.judge_groups(tests, groups)
+
+        # problem without tests can not be checked
+        status = "je" if not tests else "wc"
         stdout = ""
         stderr = ""
         memory = 0
         e_time = 0
-        
-        archive = zipfile.ZipFile(self.attempt.problem.tests.path, "r")
 
-        for index, test in enumerate(self.tests()):
-            try:
-                if len(test) == 2:
-                    input, output = test
-                    input = archive.read(input).decode()
-                    output = archive.read(output).decode()
-
-                    try:
-                        result = subprocess.run(
-                            self.parse_command("run").split(),
-                            cwd=self.workspace.cwd,
-                            timeout=3,
-                            text=True,
-                            capture_output=True,
-                            input=input,
-                        )
-                        elapsed_time = round((time.time() - start_time) * 1000, 2)
-                        stderr = self.workspace.read("error.txt")
-                        stdout = self.workspace.read("output.txt")
-                        meta = self.parse_meta()
-                        memory = meta.get("memory")
-                        e_time = meta.get("time")
-                        exit_code = meta.get("exit_code")
-                        signal = meta.get("signal")
-
-                        # Kill with dangerous code error
-                        if meta.get("signal") != 0:
-                            if signal == 9 and e_time > (self.time_limit) * 1000:
-                                status = "tle"
-                                response = {
-                                    "status": status,
-                                    "stderr": stderr,
-                                    "stdout": stdout,
-                                    "stdin": input,
-                                    "expected": output,
-                                    "diff": "",
-                                    "time": e_time,
-                                    "memory": memory,
-                                    "test": index + 1,
-                                }
-                                async_to_sync(self.channel_layer.group_send)(
-                                    f"user_{self.attempt.author.pk}",
-                                    {
-                                        "type": "attempt_case",
-                                        "data": {
-                                            "problem": str(self.attempt.problem.uuid),
-                                            "attempt": str(self.attempt.uuid),
-                                            "status": response.get("status"),
-                                            "time": response.get("time"),
-                                            "memory": response.get("memory"),
-                                            "stderr": response.get("stderr"),
-                                            "test": index + 1,
-                                        }
-                                    }
-                                )
-                                self.cases.append(response)
-
-                                self.attempt.status = status
-                                self.attempt.time = e_time
-                                self.attempt.memory = memory
-                                self.attempt.error = stderr
-                                self.attempt.test = index + 1
-                                self.attempt.cases = self.cases
-                                self.attempt.save()
-                                print(response)
-                                return
-                            status = "dce"
-                            response = {
-                                "status": status,
-                                "stderr": stderr,
-                                "stdout": stdout,
-                                "stdin": input,
-                                "diff": "",
-                                "expected": output,
-                                "time": e_time,
-                                "memory": memory,
-                                "test": index + 1,
-                            }
-                            async_to_sync(self.channel_layer.group_send)(
-                                f"user_{self.attempt.author.pk}",
-                                {
-                                    "type": "attempt_case",
-                                    "data": {
-                                        "problem": str(self.attempt.problem.uuid),
-                                        "attempt": str(self.attempt.uuid),
-                                        "status": response.get("status"),
-                                        "time": response.get("time"),
-                                        "memory": response.get("memory"),
-                                        "stderr": response.get("stderr"),
-                                        "test": index + 1,
-                                    }
-                                }
-                            )
-                            self.cases.append(response)
-
-                            self.attempt.status = status
-                            self.attempt.time = e_time
-                            self.attempt.memory = memory
-                            self.attempt.error = stderr
-                            self.attempt.test = index + 1
-                            self.attempt.cases = self.cases
-                            self.attempt.save()
-                            print(response)
-                            return
-                        # Kill with memory limit exceeded
-                        elif memory > self.memory_limit:
-                            status = "mle"
-                            response = {
-                                "status": status,
-                                "stderr": stderr,
-                                "stdout": stdout,
-                                "stdin": input,
-                                "diff": "",
-                                "expected": output,
-                                "time": e_time,
-                                "memory": memory,
-                                "test": index + 1,
-                            }
-                            async_to_sync(self.channel_layer.group_send)(
-                                f"user_{self.attempt.author.pk}",
-                                {
-                                    "type": "attempt_case",
-                                    "data": {
-                                        "problem": str(self.attempt.problem.uuid),
-                                        "attempt": str(self.attempt.uuid),
-                                        "status": response.get("status"),
-                                        "time": response.get("time"),
-                                        "memory": response.get("memory"),
-                                        "stderr": response.get("stderr"),
-                                        "test": index + 1,
-                                    }
-                                }
-                            )
-                            self.cases.append(response)
-
-                            self.attempt.status = status
-                            self.attempt.time = e_time
-                            self.attempt.memory = memory
-                            self.attempt.error = stderr
-                            self.attempt.test = index + 1
-                            self.attempt.cases = self.cases
-                            self.attempt.save()
-                            print(response)
-                            return
-                        # Kill with time limit exceeded
-                        elif e_time > (self.time_limit) * 1000:
-                            status = "tle"
-                            response = {
-                                "status": status,
-                                "stderr": stderr,
-                                "stdout": stdout,
-                                "stdin": input,
-                                "expected": output,
-                                "diff": "",
-                                "time": e_time,
-                                "memory": memory,
-                                "test": index + 1,
-                            }
-                            async_to_sync(self.channel_layer.group_send)(
-                                f"user_{self.attempt.author.pk}",
-                                {
-                                    "type": "attempt_case",
-                                    "data": {
-                                        "problem": str(self.attempt.problem.uuid),
-                                        "attempt": str(self.attempt.uuid),
-                                        "status": response.get("status"),
-                                        "time": response.get("time"),
-                                        "memory": response.get("memory"),
-                                        "stderr": response.get("stderr"),
-                                        "test": index + 1,
-                                    }
-                                }
-                            )
-                            self.cases.append(response)
-
-                            self.attempt.status = status
-                            self.attempt.time = e_time
-                            self.attempt.memory = memory
-                            self.attempt.error = stderr
-                            self.attempt.test = index + 1
-                            self.attempt.cases = self.cases
-                            self.attempt.save()
-                            print(response)
-                            return
-                        # Kill with runtime error
-                        elif stderr:
-                            status = "re"
-                            response = {
-                                "status": status,
-                                "stderr": stderr,
-                                "stdout": stdout,
-                                "stdin": input,
-                                "expected": output,
-                                "diff": "",
-                                "time": e_time,
-                                "memory": memory,
-                                "test": index + 1,
-                            }
-                            async_to_sync(self.channel_layer.group_send)(
-                                f"user_{self.attempt.author.pk}",
-                                {
-                                    "type": "attempt_case",
-                                    "data": {
-                                        "problem": str(self.attempt.problem.uuid),
-                                        "attempt": str(self.attempt.uuid),
-                                        "status": response.get("status"),
-                                        "time": response.get("time"),
-                                        "memory": response.get("memory"),
-                                        "stderr": response.get("stderr"),
-                                        "test": index + 1,
-                                    }
-                                }
-                            )
-                            self.cases.append(response)
-
-                            self.attempt.status = status
-                            self.attempt.time = e_time
-                            self.attempt.memory = memory
-                            self.attempt.error = stderr
-                            self.attempt.test = index + 1
-                            self.attempt.cases = self.cases
-                            self.attempt.save()
-                            print(response)
-                            return
-                        # Kill with presentation error
-                        elif stdout.strip() == output.strip() and stdout != output:
-                            diff = difflib.ndiff(stdout.splitlines(), output.splitlines())
-                            status = "pe"
-                            response = {
-                                "status": status,
-                                "stderr": stderr,
-                                "stdout": stdout,
-                                "stdin": input,
-                                "expected": output,
-                                "diff": "\n".join(diff),
-                                "time": e_time,
-                                "memory": memory,
-                                "test": index + 1,
-                            }
-                            async_to_sync(self.channel_layer.group_send)(
-                                f"user_{self.attempt.author.pk}",
-                                {
-                                    "type": "attempt_case",
-                                    "data": {
-                                        "problem": str(self.attempt.problem.uuid),
-                                        "attempt": str(self.attempt.uuid),
-                                        "status": response.get("status"),
-                                        "time": response.get("time"),
-                                        "memory": response.get("memory"),
-                                        "stderr": response.get("stderr"),
-                                        "test": index + 1,
-                                    }
-                                }
-                            )
-                            self.cases.append(response)
-
-                            self.attempt.status = status
-                            self.attempt.time = e_time
-                            self.attempt.memory = memory
-                            self.attempt.error = stderr
-                            self.attempt.test = index + 1
-                            self.attempt.cases = self.cases
-                            self.attempt.save()
-                            print(response)
-                            return
-                        # Kill with wrong answer
-                        elif stdout != output:
-                            diff = difflib.ndiff(stdout.splitlines(), output.splitlines())
-                            status = "wa"
-                            response = {
-                                "status": status,
-                                "stderr": stderr,
-                                "stdout": stdout,
-                                "stdin": input,
-                                "expected": output,
-                                "diff": "\n".join(diff),
-                                "time": e_time,
-                                "memory": memory,
-                                "test": index + 1,
-                            }
-                            async_to_sync(self.channel_layer.group_send)(
-                                f"user_{self.attempt.author.pk}",
-                                {
-                                    "type": "attempt_case",
-                                    "data": {
-                                        "problem": str(self.attempt.problem.uuid),
-                                        "attempt": str(self.attempt.uuid),
-                                        "status": response.get("status"),
-                                        "time": response.get("time"),
-                                        "memory": response.get("memory"),
-                                        "stderr": response.get("stderr"),
-                                        "test": index + 1,
-                                    }
-                                }
-                            )
-                            self.cases.append(response)
-                            
-                            self.attempt.status = status
-                            self.attempt.time = e_time
-                            self.attempt.memory = memory
-                            self.attempt.error = stderr
-                            self.attempt.test = index + 1
-                            self.attempt.cases = self.cases
-                            self.attempt.save()
-                            print(response)
-                            return
-                        elif stdout == output:
-                            diff = difflib.ndiff(stdout.splitlines(), output.splitlines())
-                            status = "ac"
-                            response = {
-                                "status": status,
-                                "stderr": stderr,
-                                "stdout": stdout,
-                                "stdin": input,
-                                "expected": output,
-                                "diff": "\n".join(diff),
-                                "time": e_time,
-                                "memory": memory,
-                                "test": index + 1,
-                            }
-                            async_to_sync(self.channel_layer.group_send)(
-                                f"user_{self.attempt.author.pk}",
-                                {
-                                    "type": "attempt_case",
-                                    "data": {
-                                        "problem": str(self.attempt.problem.uuid),
-                                        "attempt": str(self.attempt.uuid),
-                                        "status": response.get("status"),
-                                        "time": response.get("time"),
-                                        "memory": response.get("memory"),
-                                        "stderr": None,
-                                        "test": index + 1,
-                                    }
-                                }
-                            )
-                            self.cases.append(response)
-                            self.attempt.cases = self.cases
-                            self.attempt.save()
-                            print(response)
-                        else:
-                            status = "je"
-                            response = {
-                                "status": status,
-                                "stderr": stderr,
-                                "stdout": stdout,
-                                "stdin": input,
-                                "expected": output,
-                                "time": e_time,
-                                "memory": memory,
-                                "test": index + 1,
-                            }
-                            async_to_sync(self.channel_layer.group_send)(
-                                f"user_{self.attempt.author.pk}",
-                                {
-                                    "type": "attempt_case",
-                                    "data": {
-                                        "problem": str(self.attempt.problem.uuid),
-                                        "attempt": str(self.attempt.uuid),
-                                        "status": response.get("status"),
-                                        "time": response.get("time"),
-                                        "memory": response.get("memory"),
-                                        "stderr": response.get("stderr"),
-                                        "test": index + 1,
-                                    }
-                                }
-                            )
-                            self.cases.append(response)
-
-                            self.attempt.status = status
-                            self.attempt.time = e_time
-                            self.attempt.memory = memory
-                            self.attempt.error = stderr
-                            self.attempt.test = index + 1
-                            self.attempt.cases = self.cases
-                            self.attempt.save()
-                            print(response)
-                            return
-                    except subprocess.TimeoutExpired:
-                        status = "tle"
-                        meta = self.parse_meta()
-                        memory = meta.get("memory")
-                        e_time = meta.get("time")
-                        response = {
-                            "status": status,
-                            "stderr": stderr,
-                            "stdout": stdout,
-                            "stdin": input,
-                            "expected": output,
-                            "time": e_time,
-                            "memory": memory,
-                            "test": index + 1,
-                        }
-                        async_to_sync(self.channel_layer.group_send)(
-                            f"user_{self.attempt.author.pk}",
-                            {
-                                "type": "attempt_case",
-                                "data": {
-                                    "problem": str(self.attempt.problem.uuid),
-                                    "attempt": str(self.attempt.uuid),
-                                    "attempt": str(self.attempt.uuid),
-                                    "status": response.get("status"),
-                                    "time": response.get("time"),
-                                    "memory": response.get("memory"),
-                                    "stderr": response.get("stderr"),
-                                    "test": index + 1,
-                                }
-                            }
-                        )
-                        self.cases.append(response)
-
-                        self.attempt.status = status
-                        self.attempt.time = e_time
-                        self.attempt.memory = memory
-                        self.attempt.error = stderr
-                        self.attempt.test = index + 1
-                        self.attempt.cases = self.cases
-                        self.attempt.save()
-                        print(response)
-                        return
-                    except Exception as e:
-                        print(e)
-                else:
-                    continue
-            except Exception as e:
-                print(e)
-        async_to_sync(self.channel_layer.group_send)(
-            f"user_{self.attempt.author.pk}",
-            {
-                "type": "attempt_status",
-                "data": {
-                    "problem": str(self.attempt.problem.uuid),
-                    "attempt": str(self.attempt.uuid),
-                    "status": status,
-                    "time": e_time,
-                    "memory": memory,
-                    "stderr": stderr,
-                }
-            }
-        )
+        for index, response in self.cases_iterator(tests):
+            if not response:
+                continue
+
+            status = response.get("status")
+            stdout = response.get("stdout")
+            stderr = response.get("stderr")
+            memory = response.get("memory")
+            e_time = response.get("time")
+
+            metrics.inc("judge_cases_total", status=status, language=self.language.short)
+            self.cases.append(self.compact(response))
+            self.attempt.cases = self.cases
+            self.reporter.case(response)
+
+            if status != "ac":
+                self.attempt.status = status
+                self.attempt.time = e_time
+                self.attempt.memory = memory
+                self.attempt.error = stderr
+                self.attempt.test = index + 1
+                self.reporter.finish()
+                print(response)
+                return
+
+            print(response)
+
         self.attempt.status = status
         self.attempt.time = e_time
         self.attempt.memory = memory
         self.attempt.error = stderr
-        self.attempt.save()
+        self.reporter.finish(status=True)
+
+    def judge_groups(self, tests: list, groups: list):
+        """
+        judge_groups(tests, groups) -> Check tests group by group, score is the sum of points of passed groups
+
+        When a test of a group fails, the rest of the group is skipped and the next groups are still checked.
+        Status of the attempt is "ac" when all groups are passed, otherwise the status of the first failed test.
+        Time and memory are the maximum of checked tests.
+        """
+        failed = None
+        results = []
+        memory = 0
+        e_time = 0
+
+        for group in groups:
+            indexes = group.get("tests")
+            status = "ac"
+            passed = 0
+
+            for index, response in self.cases_iterator([tests[index] for index in indexes], indexes):
+                if not response:
+                    continue
+
+                metrics.inc("judge_cases_total", status=response.get("status"), language=self.language.short)
+                self.cases.append(self.compact(response))
+                self.attempt.cases = self.cases
+                self.reporter.case(response)
+                memory = max(memory, response.get("memory") or 0)
+                e_time = max(e_time, response.get("time") or 0)
+
+                if response.get("status") != "ac":
+                    status = response.get("status")
+                    failed = failed or (index, response)
+                    continue
+                passed += 1
+
+            results.append({
+                "name": group.get("name"),
+                "points": group.get("points"),
+                "score": group.get("points") if status == "ac" and indexes else 0,
+                "status": status,
+                "tests": len(indexes),
+                "passed": passed,
+                # tests after the failed test of the group are not checked
+                "skipped": len(indexes) - passed - (status != "ac"),
+            })
+            self.attempt.groups = results
+            self.attempt.score = sum(result.get("score") for result in results)
+
+        self.attempt.status = "ac"
+        self.attempt.time = e_time
+        self.attempt.memory = memory
+        self.attempt.error = ""
+        self.attempt.test = 0
+
+        if failed:
+            index, response = failed
+            self.attempt.status = response.get("status")
+            self.attempt.error = response.get("stderr")
+            self.attempt.test = index + 1
+
+        self.reporter.finish(status=True)
+
+    def compact(self, response: dict):
+        """
+        compact(response) -> Record of the case saved to attempt.cases
+
+        Input and expected output are referenced by the test number and kept only as previews.
+        Output, errors and diff of failed tests are saved to the blob store, the record has their previews and hashes.
+        """
+        case = {
+            "status": response.get("status"),
+            "time": response.get("time"),
+            "memory": response.get("memory"),
+            "test": response.get("test"),
+        }
+
+        if response.get("startup"):
+            case["startup"] = response.get("startup")
+
+        if response.get("status") == "ac":
+            return case
+
+        case["stdin"] = response.get("stdin")
+        case["expected"] = response.get("expected")
+        case["blobs"] = {}
+
+        for name in ("stdout", "stderr", "diff"):
+            case[name] = preview(response.get(name))
+            if response.get(name):
+                case["blobs"][name] = blob_store.put(response.get(name))
+
+        return case
+
+    def cases_iterator(self, tests: list, indexes: list = None):
+        """
+        cases_iterator(tests, indexes) -> Yield (index, response) of checked tests in test order
+
+        indexes - increasing indexes of the tests in the problem, positions in tests by default
+        Runs up to self.parallel tests at once. When a test fails, tests after it are cancelled,
+        so the first failed test is the same as in sequential run.
+        """
+        indexes = range(len(tests)) if indexes is None else indexes
+
+        if self.parallel <= 1:
+            for index, test in zip(indexes, tests):
+                response = self.check(index, test, self.workspace)
+                yield index, response
+                if response and response.get("status") != "ac":
+                    return
+            return
+
+        self.failed = float("inf")
+        self.processes = {}
+
+        with ThreadPoolExecutor(max_workers=self.parallel) as executor:
+            futures = {
+                index: executor.submit(self.check_isolated, index, test)
+                for index, test in zip(indexes, tests)
+            }
+
+            for index, future in futures.items():
+                response = future.result()
+                if response and response.get("status") != "ac":
+                    self.cancel(index, futures)
+                    yield index, response
+                    return
+                yield index, response
+
+    def cancel(self, index: int, futures: dict):
+        """
+        cancel(index, futures) -> Cancel queued tests and kill running tests after index
+
+        futures - futures of the tests by their indexes
+        """
+        with self.lock:
+            self.failed = min(self.failed, index)
+            for test, future in futures.items():
+                if test > index:
+                    future.cancel()
+            for test, process in self.processes.items():
+                if test > index:
+                    self.kill(process)
+
+    def kill(self, process: subprocess.Popen):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def check_isolated(self, index: int, test: dict):
+        """
+        check_isolated(index, test) -> Check test in its own folder inside the workspace
+        """
+        if index > self.failed:
+            return None
+
+        workspace = Workspace(name=f"{self.workspace.name}/test-{index + 1}")
+        workspace.init()
+        try:
+            return self.check(index, test, workspace)
+        finally:
+            workspace.clean()
+
+    def check(self, index: int, test: dict, workspace: Workspace):
+        """
+        check(index, test, workspace) -> Run one test in the workspace and return response
+
+        Input file is given to the program as stdin, output is compared with the expected file.
+        Returns None when the test is skipped, "je" response when the judge fails to check the test.
+        """
+        try:
+            command = self.parse_command("run").split()
+
+            # runners capture the output, interactive tests need the sandbox binary
+            if self.interactor:
+                return self.check_interactive(index, test, workspace)
+
+            # old sandbox binaries have no `sandbox -s`
+            runner = runner_pool if runner_pool and sandbox_flags(self.language) else None
+            if self.zygote or runner:
+                try:
+                    if self.zygote:
+                        return self.check_runner(index, test, workspace, zygote_pool, self.zygote, command[2:])
+                    return self.check_runner(index, test, workspace, runner_pool, self.runner_command(), command[1:])
+                except RunnerError as e:
+                    if index > self.failed:
+                        return None
+                    print("[ERROR]:runner failed, running sandbox binary.", e)
+
+            return self.check_sandbox(index, test, workspace)
+        except Exception as e:
+            print(f"[ERROR]:can not check test {index + 1}.", e)
+            return self.judge_error(index)
+
+    def judge_error(self, index: int):
+        """
+        judge_error(index) -> Response of the test which can not be checked, errors of the judge are not shown to the author
+        """
+        return {
+            "status": "je",
+            "stderr": "",
+            "stdout": "",
+            "stdin": "",
+            "expected": "",
+            "diff": "",
+            "time": 0,
+            "memory": 0,
+            "test": index + 1,
+        }
+
+    def check_sandbox(self, index: int, test: dict, workspace: Workspace):
+        """
+        check_sandbox(index, test, workspace) -> Run one test with the sandbox binary and return response
+        """
+        start = time.perf_counter()
+        with self.lock:
+            if index > self.failed:
+                return None
+            with open(test.get("input"), "rb") as stdin:
+                process = subprocess.Popen(
+                    self.run_command(),
+                    cwd=workspace.cwd,
+                    stdin=stdin,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    start_new_session=True,
+                )
+            self.processes[index] = process
+
+        try:
+            process.wait(timeout=self.timeout())
+        except subprocess.TimeoutExpired:
+            self.kill(process)
+            process.wait()
+            meta = self.parse_meta(workspace)
+            return {
+                "status": "tle",
+                "stderr": "",
+                "stdout": "",
+                "stdin": read_preview(test.get("input")),
+                "expected": read_preview(test.get("output")),
+                "diff": "",
+                "time": meta.get("cpu_time"),
+                "memory": meta.get("memory"),
+                "test": index + 1,
+            }
+        finally:
+            metrics.observe("judge_stage_seconds", time.perf_counter() - start, stage="spawn")
+            with self.lock:
+                self.processes.pop(index, None)
+
+        stderr = workspace.read("error.txt")
+        meta = self.parse_meta(workspace)
+        status, diff = self.verdict(meta, stderr, f"{workspace.cwd}/output.txt", test.get("output"), test.get("input"))
+        # output of accepted tests is the same as expected output, it is not saved
+        stdout = workspace.read("output.txt") if status != "ac" else ""
+
+        return {
+            "status": status,
+            "stderr": stderr,
+            "stdout": stdout,
+            "stdin": read_preview(test.get("input")),
+            "expected": read_preview(test.get("output")),
+            "diff": diff,
+            "time": meta.get("cpu_time"),
+            "memory": meta.get("memory"),
+            "test": index + 1,
+        }
+
+    def check_interactive(self, index: int, test: dict, workspace: Workspace):
+        """
+        check_interactive(index, test, workspace) -> Run one test of the interactive problem and return response
+
+        Stdout of the program is stdin of the interactor and stdout of the interactor is stdin of the program,
+        the program runs with the same limits as in other tests. Returns None when the test is skipped.
+        """
+        program_stdin, interactor_stdout = os.pipe()
+        interactor_stdin, program_stdout = os.pipe()
+        start = time.perf_counter()
+
+        try:
+            with self.lock:
+                if index > self.failed:
+                    return None
+                process = subprocess.Popen(
+                    self.run_command(interactive=True),
+                    cwd=workspace.cwd,
+                    stdin=program_stdin,
+                    stdout=program_stdout,
+                    stderr=subprocess.DEVNULL,
+                    start_new_session=True,
+                )
+                self.processes[index] = process
+            try:
+                interactor = self.interactor.start(test.get("input"), test.get("output"), interactor_stdin, interactor_stdout, workspace.cwd)
+            except OSError as e:
+                print("[ERROR]:can not start interactor.", e)
+                self.kill(process)
+                process.wait()
+                with self.lock:
+                    self.processes.pop(index, None)
+                return self.judge_error(index)
+        finally:
+            # interactor gets end of file when the program exits
+            for fd in (program_stdin, interactor_stdout, interactor_stdin, program_stdout):
+                os.close(fd)
+
+        try:
+            try:
+                process.wait(timeout=self.timeout())
+            except subprocess.TimeoutExpired:
+                self.kill(process)
+                interactor.kill()
+                process.wait()
+                interactor.wait()
+                meta = self.parse_meta(workspace)
+                return {
+                    "status": "tle",
+                    "stderr": "",
+                    "stdout": "",
+                    "stdin": read_preview(test.get("input")),
+                    "expected": read_preview(test.get("output")),
+                    "diff": "",
+                    "time": meta.get("cpu_time"),
+                    "memory": meta.get("memory"),
+                    "test": index + 1,
+                }
+            result = self.interactor.result(interactor)
+        finally:
+            metrics.observe("judge_stage_seconds", time.perf_counter() - start, stage="spawn")
+            with self.lock:
+                self.processes.pop(index, None)
+
+        stderr = workspace.read("error.txt")
+        meta = self.parse_meta(workspace)
+        status, diff = self.verdict(meta, stderr, None, test.get("output"), test.get("input"), result)
+
+        # program fails when the interactor exits early, verdict of the interactor is shown
+        if status in ("re", "dce") and result[0] != "ac":
+            status, diff = result
+
+        return {
+            "status": status,
+            "stderr": stderr,
+            "stdout": "",
+            "stdin": read_preview(test.get("input")),
+            "expected": read_preview(test.get("output")),
+            "diff": diff,
+            "time": meta.get("cpu_time"),
+            "memory": meta.get("memory"),
+            "test": index + 1,
+        }
+
+    def check_runner(self, index: int, test: dict, workspace: Workspace, pool: RunnerPool, runner_command: list, program: list):
+        """
+        check_runner(index, test, workspace, pool, runner_command, program) -> Run one test with a runner of the pool and return response
+
+        Output of the program is compared in memory, no files are written to the workspace.
+        runner_command - command which starts the runner, None for `sandbox -s`
+        program - command of the program without the sandbox
+        """
+        runner = pool.acquire(self.language.sandbox, runner_command)
+
+        try:
+            with self.lock:
+                if index > self.failed:
+                    return None
+                self.processes[index] = runner.process
+
+            try:
+                with metrics.timer("spawn"):
+                    meta = runner.run(
+                        program,
+                        workspace.cwd,
+                        test.get("input"),
+                        self.limits(),
+                        self.timeout(),
+                    )
+            except subprocess.TimeoutExpired:
+                return {
+                    "status": "tle",
+                    "stderr": "",
+                    "stdout": "",
+                    "stdin": read_preview(test.get("input")),
+                    "expected": read_preview(test.get("output")),
+                    "diff": "",
+                    "time": self.timeout() * 1000,
+                    "memory": 0,
+                    "test": index + 1,
+                }
+            finally:
+                with self.lock:
+                    self.processes.pop(index, None)
+        finally:
+            pool.release(runner)
+
+        stderr = self.clean(meta.get("stderr").decode(errors="replace"))
+        status, diff = self.verdict(meta, stderr, meta.get("stdout"), test.get("output"), test.get("input"))
+
+        response = {
+            "status": status,
+            "stderr": stderr,
+            "stdout": self.clean(meta.get("stdout").decode(errors="replace")) if status != "ac" else "",
+            "stdin": read_preview(test.get("input")),
+            "expected": read_preview(test.get("output")),
+            "diff": diff,
+            "time": meta.get("cpu_time", meta.get("time")),
+            "memory": meta.get("memory"),
+            "test": index + 1,
+        }
+
+        # interpreter startup time of the fork server and of a new process, milliseconds
+        if meta.get("startup"):
+            startup = meta.get("startup")
+            response["startup"] = {
+                "cold": startup.get("cold"),
+                "warm": startup.get("warm"),
+                "saved": round(startup.get("cold") - startup.get("warm"), 3),
+            }
+        return response
+
+    def verdict(self, meta: dict, stderr: str, stdout: str, output: str, input: str, result: tuple = None):
+        """
+        verdict(meta, stderr, stdout, output, input) -> (verdict, diff) of the finished test
+
+        stdout - path or bytes of the program output
+        output - path of the expected output
+        input - path of the test input
+        result - (verdict, message) of the interactor, it is used instead of the comparator
+        """
+        signal_code = meta.get("signal")
+        memory = meta.get("memory")
+        # time limit is cpu time, wall time is only the kill switch of the sandbox (-w),
+        # so tests running in parallel are not slowed down to tle
+        cpu_time = meta.get("cpu_time", meta.get("time"))
+
+        # Kill with output limit exceeded
+        if meta.get("ole"):
+            return "ole", ""
+        # Kill with memory limit exceeded by the cgroup
+        elif meta.get("oom"):
+            return "mle", ""
+        # Kill with time limit exceeded by the sandbox (cpu time or the wall time kill switch)
+        elif meta.get("tle"):
+            return "tle", ""
+        # Kill with dangerous code error
+        elif signal_code != 0:
+            if signal_code in (signal.SIGKILL, signal.SIGXCPU) and cpu_time >= (self.time_limit) * 1000:
+                return "tle", ""
+            return "dce", ""
+        # Kill with memory limit exceeded
+        elif memory > self.memory_limit:
+            return "mle", ""
+        # Kill with time limit exceeded
+        elif cpu_time > (self.time_limit) * 1000:
+            return "tle", ""
+        # Kill with runtime error
+        elif stderr:
+            return "re", ""
+        # Kill with wrong answer or presentation error
+        # interactor already checked the output
+        if result:
+            return result
+        with metrics.timer("compare"):
+            return self.comparator.compare(stdout, output, input)
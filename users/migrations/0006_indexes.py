@@ -0,0 +1,25 @@
+# Generated by Django 6.1.2 on 2026-10-18 16:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_activity_author_alter_user_country'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['author', 'created'], name='activity_author_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['to', 'is_readed', 'created'], name='notification_to_readed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['author', '-created'], name='session_author_created_idx'),
+        ),
+    ]
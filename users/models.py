@@ -75,6 +75,11 @@ class Session(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["author", "-created"], name="session_author_created_idx"),
+        ]
+
     def __str__(self):
         return self.device
     
@@ -91,6 +96,11 @@ class Activity(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["author", "created"], name="activity_author_created_idx"),
+        ]
+
     def __str__(self):
         return self.uuid.__str__()
     
@@ -106,6 +116,11 @@ class Notification(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["to", "is_readed", "created"], name="notification_to_readed_idx"),
+        ]
+
     def __str__(self):
         return self.type
 
@@ -16,6 +16,7 @@ from rest_framework.authtoken.models import Token
 
 from utils.mail import send
 from utils.worker import Worker
+from utils.progress import ProgressIndex
 from utils.secrets import encode, decode, jsonify
 from utils.functions import check_email, check_username
 
@@ -31,6 +32,9 @@ from .serializers import (
 )
 
 
+progress_index = ProgressIndex()
+
+
 @decorators.api_view(["GET"])
 def get_translations(request: HttpRequest):
     try:
@@ -593,7 +597,13 @@ def get_user(request: HttpRequest, username: str):
             "status": "success",
             "code": "get_user_003",  # user found
             "data": encode(
-                json.dumps(ProfileSerializer(user, context={"request": request}).data)
+                json.dumps(
+                    {
+                        **ProfileSerializer(user, context={"request": request}).data,
+                        # numbers of attempted and solved problems
+                        "problems": progress_index.counts(user.pk),
+                    }
+                )
             ),
         }
     )
@@ -0,0 +1,110 @@
+import os
+import time
+import uuid
+import hashlib
+from django.conf import settings
+
+
+def preview(text: str, size: int = None):
+    """
+    preview(text, size) -> First size characters of the text, "..." is added when the text is longer
+    """
+    size = size or settings.JUDGE_BLOB_STORE.get("preview")
+    if not text or len(text) <= size:
+        return text
+    return text[:size] + "..."
+
+
+def read_preview(path: str, size: int = None):
+    """
+    read_preview(path, size) -> Preview of the file, only the beginning of the file is read
+    """
+    size = size or settings.JUDGE_BLOB_STORE.get("preview")
+    with open(path, "rb") as file:
+        data = file.read(size * 4 + 1)
+    return preview(data.decode(errors="replace"), size)
+
+
+class BlobStore:
+    """
+    Content-addressed store of case artifacts (program output, errors, diffs), saved once by sha256
+    to <path>/<first two letters of hash>/<hash>.
+    Blobs are shared by attempts, clean() deletes only blobs which no attempt references.
+    """
+    def __init__(self, path: str = None, age: float = None):
+        config = settings.JUDGE_BLOB_STORE
+        self.path = str(path or config.get("path"))
+        self.age = config.get("age", 3600) if age is None else age
+
+        os.makedirs(self.path, exist_ok=True)
+
+    def file(self, key: str):
+        return os.path.join(self.path, key[:2], key)
+
+    def put(self, data):
+        """
+        put(data) -> sha256 of data, data is saved only when it is not in the store yet
+
+        data - string or bytes
+        """
+        if isinstance(data, str):
+            data = data.encode()
+
+        key = hashlib.sha256(data).hexdigest()
+        path = self.file(key)
+
+        if os.path.isfile(path):
+            # blob is used again, clean() does not delete it before the attempt saves its cases
+            try:
+                os.utime(path)
+                return key
+            except FileNotFoundError:
+                pass
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = f"{path}.{uuid.uuid4().hex}"
+        with open(temp, "wb") as file:
+            file.write(data)
+        os.replace(temp, path)
+        return key
+
+    def get(self, key: str):
+        """
+        get(key) -> Saved data as string, None when the key is not in the store
+        """
+        if len(key) != 64 or not all(c in "0123456789abcdef" for c in key):
+            return None
+        try:
+            with open(self.file(key), "rb") as file:
+                return file.read().decode(errors="replace")
+        except OSError:
+            return None
+
+    def clean(self, referenced: set):
+        """
+        clean(referenced) -> Delete blobs which are not in referenced and older than age, returns deleted keys
+
+        referenced - keys of blobs in the cases of attempts
+        Blobs of attempts being judged are saved before their cases, so new blobs are kept.
+        """
+        deleted = []
+        before = time.time() - self.age
+
+        for folder in os.listdir(self.path):
+            folder = os.path.join(self.path, folder)
+            if not os.path.isdir(folder):
+                continue
+            for key in os.listdir(folder):
+                path = os.path.join(folder, key)
+                # temporary files of put() are not complete blobs
+                if key in referenced or len(key) != 64:
+                    continue
+                try:
+                    if os.stat(path).st_mtime >= before:
+                        continue
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                deleted.append(key)
+
+        return deleted
@@ -0,0 +1,265 @@
+import os
+import json
+import uuid
+import redis
+import shutil
+import hashlib
+from django.conf import settings
+
+from utils.queue import connect
+from utils.store import tests_hash, file_hash, forget_hashes
+
+
+class CompileCache:
+    """
+    Content-addressed cache of compiled files, keyed by language uuid, compile command and code hash.
+    Least recently used entries are deleted when the cache is bigger than max_size.
+    """
+    def __init__(self, path: str = None, max_size: int = None, link: bool = None):
+        config = settings.JUDGE_COMPILE_CACHE
+        self.path = str(path or config.get("path"))
+        self.max_size = max_size or config.get("size")
+        self.link = config.get("link") if link is None else link
+        self.enabled = config.get("enabled", True)
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.path, exist_ok=True)
+
+    def key(self, language, code):
+        """
+        key(language, code) -> sha256 of language uuid, compile command and code
+
+        language - Language
+        code - string or bytes
+        """
+        if isinstance(code, str):
+            code = code.encode()
+        digest = hashlib.sha256()
+        digest.update(str(language.uuid).encode())
+        digest.update(b"\0")
+        digest.update(str(language.compile).encode())
+        digest.update(b"\0")
+        digest.update(hashlib.sha256(code).digest())
+        return digest.hexdigest()
+
+    def counters(self, status: str):
+        return {
+            "status": status,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def snapshot(self, cwd: str):
+        """
+        snapshot(cwd) -> Files of the workspace with their modification time
+        """
+        files = {}
+        for root, dirs, names in os.walk(cwd):
+            for name in names:
+                path = os.path.join(root, name)
+                files[os.path.relpath(path, cwd)] = os.stat(path).st_mtime_ns
+        return files
+
+    def restore(self, key: str, cwd: str):
+        """
+        restore(key, cwd) -> Put cached files to the workspace, False when key is not cached
+        """
+        if not self.enabled:
+            return False
+
+        entry = os.path.join(self.path, key)
+
+        if not os.path.isdir(entry):
+            self.misses += 1
+            return False
+
+        try:
+            for root, dirs, names in os.walk(entry):
+                for name in names:
+                    source = os.path.join(root, name)
+                    target = os.path.join(cwd, os.path.relpath(source, entry))
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    if self.link:
+                        try:
+                            os.link(source, target)
+                            continue
+                        except OSError:
+                            pass
+                    shutil.copy2(source, target)
+            # mark entry as recently used
+            os.utime(entry)
+        except OSError as e:
+            print("[ERROR]:can not restore compile cache.", e)
+            self.misses += 1
+            return False
+
+        self.hits += 1
+        return True
+
+    def store(self, key: str, cwd: str, before: dict):
+        """
+        store(key, cwd, before) -> Save files created or changed by compilation to the cache
+
+        before - snapshot of the workspace taken before compilation
+        """
+        if not self.enabled:
+            return
+
+        entry = os.path.join(self.path, key)
+
+        if os.path.isdir(entry):
+            return
+
+        temp = os.path.join(self.path, f".{key}.{uuid.uuid4().hex}")
+
+        try:
+            for name, mtime in self.snapshot(cwd).items():
+                if before.get(name) == mtime:
+                    continue
+                target = os.path.join(temp, name)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copy2(os.path.join(cwd, name), target)
+                # cached files are shared between attempts, so they must not be changed
+                os.chmod(target, os.stat(target).st_mode & 0o555)
+            os.makedirs(temp, exist_ok=True)
+            os.rename(temp, entry)
+        except OSError:
+            # another worker cached the same key
+            shutil.rmtree(temp, ignore_errors=True)
+            return
+
+        self.evict()
+
+    def evict(self):
+        """
+        evict() -> Delete least recently used entries until cache fits to max_size
+        """
+        entries = []
+        total = 0
+
+        for name in os.listdir(self.path):
+            entry = os.path.join(self.path, name)
+            if name.startswith(".") or not os.path.isdir(entry):
+                continue
+            size = 0
+            for root, dirs, names in os.walk(entry):
+                for file in names:
+                    size += os.path.getsize(os.path.join(root, file))
+            entries.append((os.stat(entry).st_mtime, size, entry))
+            total += size
+
+        for mtime, size, entry in sorted(entries):
+            if total <= self.max_size:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+
+class VerdictCache:
+    """
+    Results of checked attempts, keyed by code hash, language, tests hash and problem limits.
+    Saved in redis as one hash per problem, so all results of a problem are deleted together.
+    """
+    # verdicts which can be different when the same code is checked again
+    UNSTABLE = ("tle", "je", "wc", "running")
+
+    def __init__(self, client: redis.Redis = None):
+        config = settings.JUDGE_VERDICT_CACHE
+        self.enabled = config.get("enabled", False)
+        self.timeout = config.get("timeout")
+        self.client = client or connect()
+
+    def name(self, problem):
+        return f"verdicts_{problem.pk}"
+
+    def tests_hash(self, problem):
+        """
+        tests_hash(problem) -> sha256 of tests archive, see utils.store.tests_hash
+        """
+        return tests_hash(problem, self.client)
+
+    def programs_version(self, problem):
+        """
+        programs_version(problem) -> Judge type and sha256 of the checker and interactor files of the problem
+        """
+        parts = [problem.judge_type]
+        for name in ("checker", "interactor"):
+            if getattr(problem, name):
+                parts.append(file_hash(problem, name, self.client))
+        return ":".join(parts)
+
+    def key(self, attempt):
+        """
+        key(attempt) -> sha256 of code, language, tests archive, limits, judge type and compare mode of the attempt
+        """
+        digest = hashlib.sha256()
+        digest.update(hashlib.sha256((attempt.code or "").encode()).digest())
+        for part in (
+            attempt.language.uuid,
+            attempt.language.compile,
+            attempt.language.run,
+            self.tests_hash(attempt.problem),
+            attempt.problem.time_limit,
+            attempt.problem.memory_limit,
+            attempt.problem.output_limit,
+            attempt.problem.line_limit,
+            attempt.problem.compare_mode,
+            attempt.problem.compare_epsilon,
+            self.programs_version(attempt.problem),
+        ):
+            digest.update(b"\0")
+            digest.update(str(part).encode())
+        return digest.hexdigest()
+
+    def get(self, attempt):
+        """
+        get(attempt) -> (key, result) of the attempt, result is None when it is not cached
+        """
+        if not self.enabled:
+            return None, None
+
+        try:
+            key = self.key(attempt)
+            result = self.client.hget(self.name(attempt.problem), key)
+        except (OSError, redis.RedisError) as e:
+            print("[ERROR]:can not read verdict cache.", e)
+            return None, None
+
+        if not result:
+            return key, None
+        return key, json.loads(result)
+
+    def set(self, key: str, attempt):
+        """
+        set(key, attempt) -> Save result of the checked attempt
+        """
+        if not self.enabled or not key or attempt.status in self.UNSTABLE:
+            return
+
+        try:
+            name = self.name(attempt.problem)
+            self.client.hset(name, key, json.dumps({
+                "status": attempt.status,
+                "time": attempt.time,
+                "memory": attempt.memory,
+                "error": attempt.error,
+                "test": attempt.test,
+                "cases": attempt.cases,
+                "score": attempt.score,
+                "groups": attempt.groups,
+            }))
+            if self.timeout:
+                self.client.expire(name, self.timeout)
+        except redis.RedisError as e:
+            print("[ERROR]:can not save verdict cache.", e)
+
+    def invalidate(self, problem):
+        """
+        invalidate(problem) -> Delete all cached results and file hashes of the problem
+        """
+        forget_hashes(problem, self.client)
+        try:
+            self.client.delete(self.name(problem))
+        except redis.RedisError as e:
+            print("[ERROR]:can not invalidate verdict cache.", e)
@@ -0,0 +1,329 @@
+import os
+import io
+import re
+import math
+import difflib
+import tempfile
+import subprocess
+
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = b" \t\n\r\x0b\x0c"
+
+def open_output(source):
+    """
+    open_output(source) -> Binary file of the output, source is a path or output bytes of the runner
+    """
+    if isinstance(source, bytes):
+        return io.BytesIO(source)
+    return open(source, "rb")
+
+
+def chunks(file):
+    for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+        yield chunk
+
+
+def tokens(file):
+    """
+    tokens(file) -> Yield (offset, token) of whitespace separated tokens of the file, reads file in chunks
+    """
+    offset = 0
+    carry = b""
+
+    for chunk in chunks(file):
+        data = carry + chunk
+        base = offset - len(carry)
+        parts = list(re.finditer(rb"\S+", data))
+        carry = b""
+
+        # the last token can continue in the next chunk
+        if parts and parts[-1].end() == len(data):
+            carry = parts.pop().group()
+
+        for part in parts:
+            yield base + part.start(), part.group()
+        offset += len(chunk)
+
+    if carry:
+        yield offset - len(carry), carry
+
+
+def diff(actual, expected, actual_offset: int, expected_offset: int, window: int = 512):
+    """
+    diff(actual, expected, actual_offset, expected_offset) -> Diff of lines around the first mismatch
+
+    Only window bytes before and after the mismatch are read from both files.
+    """
+    lines = []
+
+    for path, offset in ((actual, actual_offset), (expected, expected_offset)):
+        with open_output(path) as file:
+            start = max(0, offset - window)
+            file.seek(start)
+            data = file.read(offset - start + window)
+        # line number of the first line in the window
+        number = 1
+        with open_output(path) as file:
+            remaining = start
+            while remaining > 0:
+                chunk = file.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                number += chunk.count(b"\n")
+                remaining -= len(chunk)
+        lines.append((number, data.decode(errors="replace").splitlines()))
+
+    (actual_line, actual_lines), (expected_line, expected_lines) = lines
+    header = f"@@ output line {actual_line}, expected line {expected_line} @@"
+    return "\n".join([header, *difflib.ndiff(actual_lines, expected_lines)])
+
+
+class Comparator:
+    """
+    Comparator compares program output with the expected output.
+
+    compare() returns (status, diff), diff is computed only when outputs are different.
+    Program output is a file path or bytes, expected output is a file path.
+    """
+    def compare(self, actual, expected: str, input: str = None):
+        raise NotImplementedError
+
+
+class ExactComparator(Comparator):
+    """
+    Outputs must be equal byte by byte, leading and trailing whitespace of the program output is ignored.
+    Expected output with leading or trailing whitespace gives presentation error.
+    """
+    def skip(self, file):
+        """
+        skip(file) -> Skip leading whitespace, returns (offset, rest of the chunk)
+        """
+        offset = 0
+        for chunk in chunks(file):
+            stripped = chunk.lstrip(WHITESPACE)
+            offset += len(chunk) - len(stripped)
+            if stripped:
+                return offset, stripped
+        return offset, b""
+
+    def rest(self, chunk: bytes, file):
+        """
+        rest(chunk, file) -> (blank, empty) of the chunk and the rest of the file
+        """
+        empty = not chunk
+        for chunk in [chunk, *chunks(file)]:
+            if chunk:
+                empty = False
+            if chunk.strip(WHITESPACE):
+                return False, empty
+        return True, empty
+
+    def compare(self, actual, expected: str, input: str = None):
+        with open_output(actual) as a, open(expected, "rb") as e:
+            a_offset, a_chunk = self.skip(a)
+            e_offset, e_chunk = self.skip(e)
+            padded = e_offset > 0
+            last = b""
+
+            while a_chunk and e_chunk:
+                size = min(len(a_chunk), len(e_chunk))
+
+                if a_chunk[:size] != e_chunk[:size]:
+                    index = len(os.path.commonprefix([a_chunk[:size], e_chunk[:size]]))
+                    a_chunk, e_chunk = a_chunk[index:], e_chunk[index:]
+                    a_offset += index
+                    e_offset += index
+                    last = b""
+                    break
+
+                last = e_chunk[size - 1:size]
+                a_chunk, e_chunk = a_chunk[size:], e_chunk[size:]
+                a_offset += size
+                e_offset += size
+                a_chunk = a_chunk or a.read(CHUNK_SIZE)
+                e_chunk = e_chunk or e.read(CHUNK_SIZE)
+
+            a_blank, a_empty = self.rest(a_chunk, a)
+            e_blank, e_empty = self.rest(e_chunk, e)
+
+            if not a_blank or not e_blank:
+                return "wa", diff(actual, expected, a_offset, e_offset)
+
+            # expected output has whitespace which program output does not have
+            if padded or not e_empty or (last and last in WHITESPACE):
+                return "pe", ""
+            return "ac", ""
+
+
+class TokensComparator(Comparator):
+    """
+    Outputs must have the same whitespace separated tokens.
+    """
+    def same(self, a: bytes, e: bytes):
+        return a == e
+
+    def compare(self, actual, expected: str, input: str = None):
+        with open_output(actual) as a, open(expected, "rb") as e:
+            a_tokens = tokens(a)
+            e_tokens = tokens(e)
+            a_offset = e_offset = 0
+
+            while True:
+                a_token = next(a_tokens, None)
+                e_token = next(e_tokens, None)
+
+                if a_token is None and e_token is None:
+                    return "ac", ""
+
+                if a_token is not None:
+                    a_offset = a_token[0]
+                if e_token is not None:
+                    e_offset = e_token[0]
+
+                if a_token is None or e_token is None or not self.same(a_token[1], e_token[1]):
+                    return "wa", diff(actual, expected, a_offset, e_offset)
+
+
+class FloatComparator(TokensComparator):
+    """
+    Outputs must have the same tokens, numbers may differ by absolute or relative epsilon.
+    """
+    def __init__(self, epsilon: float = 1e-6):
+        self.epsilon = epsilon
+
+    def same(self, a: bytes, e: bytes):
+        if a == e:
+            return True
+        try:
+            a_number = float(a)
+            e_number = float(e)
+        except ValueError:
+            return False
+        if math.isnan(a_number) or math.isnan(e_number):
+            return False
+        return abs(a_number - e_number) <= self.epsilon * max(1, abs(e_number))
+
+
+# exit codes of checkers and interactors
+VERDICTS = {
+    0: "ac",
+    1: "wa",
+    2: "pe",
+}
+
+
+def program_verdict(returncode: int, message: bytes):
+    """
+    program_verdict(returncode, message) -> (status, message) of the checker or interactor
+
+    Exit code 0 is accepted, 1 is wrong answer, 2 is presentation error, other codes are judge error.
+    """
+    status = VERDICTS.get(returncode, "je")
+    if status == "ac":
+        return status, ""
+    return status, message[:4096].decode(errors="replace")
+
+
+class CustomChecker(Comparator):
+    """
+    Checker program is called as `checker <input> <output> <expected>` (testlib order).
+    Checker's messages are returned as diff.
+
+    command - command of the checker, see utils.store.ProgramStore
+    """
+    def __init__(self, command: list, timeout: int = 10):
+        self.command = command
+        self.timeout = timeout
+
+    def compare(self, actual, expected: str, input: str = None):
+        # checker reads the output from a file
+        if isinstance(actual, bytes):
+            with tempfile.NamedTemporaryFile(prefix="output-") as file:
+                file.write(actual)
+                file.flush()
+                return self.compare(file.name, expected, input)
+
+        try:
+            result = subprocess.run(
+                [*self.command, input or "/dev/null", actual, expected],
+                timeout=self.timeout,
+                capture_output=True,
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            print("[ERROR]:checker failed.", e)
+            return "je", ""
+
+        return program_verdict(result.returncode, result.stdout + result.stderr)
+
+
+class Interactor:
+    """
+    Interactor program is called as `interactor <input> <expected>`, it talks to the program of the attempt:
+    its stdin is stdout of the program and its stdout is stdin of the program.
+    Exit codes are the same as the checker's, messages are read from stderr.
+
+    command - command of the interactor, see utils.store.ProgramStore
+    """
+    def __init__(self, command: list, timeout: int = 10):
+        self.command = command
+        self.timeout = timeout
+
+    def start(self, input: str, expected: str, stdin: int, stdout: int, cwd: str = None):
+        """
+        start(input, expected, stdin, stdout) -> Started interactor process
+
+        stdin, stdout - file descriptors of the pipes connected to the program
+        """
+        return subprocess.Popen(
+            [*self.command, input, expected],
+            cwd=cwd,
+            stdin=stdin,
+            stdout=stdout,
+            stderr=subprocess.PIPE,
+        )
+
+    def result(self, process: subprocess.Popen):
+        """
+        result(process) -> (status, message) of the interactor, waits until the interactor exits
+        """
+        try:
+            _, message = process.communicate(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            print("[ERROR]:interactor timed out.")
+            return "je", ""
+
+        return program_verdict(process.returncode, message)
+
+
+def get_comparator(problem, programs=None):
+    """
+    get_comparator(problem, programs) -> Comparator of the problem's judge type and compare mode
+
+    programs - ProgramStore, checker of the problem is compiled by it
+    Returns None when the problem is checked by a checker which is not uploaded.
+    """
+    if problem.judge_type == "checker" or problem.compare_mode == "checker":
+        command = programs.get(problem, "checker") if programs else None
+        if not command:
+            return None
+        return CustomChecker(command, programs.timeout)
+    if problem.compare_mode == "tokens":
+        return TokensComparator()
+    elif problem.compare_mode == "float":
+        return FloatComparator(problem.compare_epsilon)
+    return ExactComparator()
+
+
+def get_interactor(problem, programs):
+    """
+    get_interactor(problem, programs) -> Interactor of the interactive problem, None for other problems
+    """
+    if problem.judge_type != "interactive":
+        return None
+    command = programs.get(problem, "interactor")
+    if not command:
+        return None
+    return Interactor(command, programs.timeout)
@@ -1,4 +1,5 @@
 import re
+from uuid import UUID
 
 
 def check_email(email: str) -> bool:
@@ -16,3 +17,11 @@ def check_username(username: str) -> bool:
         return False
     
     return True
+
+def check_uuid(value) -> bool:
+    try:
+        UUID(str(value))
+    except ValueError:
+        return False
+
+    return True
@@ -0,0 +1,212 @@
+import os
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+
+
+# seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+HELP = {
+    "judge_stage_seconds": ("histogram", "Duration of judge stages"),
+    "judge_attempt_seconds": ("histogram", "Duration of judging one attempt"),
+    "judge_queue_wait_seconds": ("histogram", "Time attempts waited in the judge queue"),
+    "judge_verdicts_total": ("counter", "Verdicts of checked attempts"),
+    "judge_cases_total": ("counter", "Checked test cases"),
+    "judge_active_runs": ("gauge", "Attempts being judged now"),
+    "judge_queue_depth": ("gauge", "Attempts waiting in the judge queue"),
+    "judge_workers_alive": ("gauge", "Judge workers of all nodes sending heartbeats"),
+    "judge_requeued_total": ("counter", "Attempts of dead workers queued again"),
+    "judge_compile_cache_total": ("counter", "Compilations taken from the compile cache (hit) or compiled (miss)"),
+}
+
+
+def labels_key(labels: dict):
+    return json.dumps(sorted(labels.items()))
+
+
+class Metrics:
+    """
+    Counters, gauges and histograms of one process.
+
+    Every process saves its snapshot to <path>/<pid>.json at most once per interval,
+    render() merges snapshots of all processes to the Prometheus text format.
+    """
+    def __init__(self, path: str = None, interval: float = None):
+        config = settings.JUDGE_METRICS
+        self.enabled = config.get("enabled", True)
+        self.path = str(path or config.get("path"))
+        self.interval = config.get("interval") if interval is None else interval
+        self.stale = config.get("stale", 60)
+        self.textfile = config.get("textfile")
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.flushed = time.monotonic()
+
+        if self.enabled:
+            os.makedirs(self.path, exist_ok=True)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        with self.lock:
+            key = (name, labels_key(labels))
+            self.counters[key] = self.counters.get(key, 0) + value
+        self.maybe_flush()
+
+    def set(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.gauges[(name, labels_key(labels))] = value
+        self.maybe_flush()
+
+    def add(self, name: str, value: float, **labels):
+        """
+        add(name, value, **labels) -> Add value to the gauge, value can be negative
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            key = (name, labels_key(labels))
+            self.gauges[key] = self.gauges.get(key, 0) + value
+        self.maybe_flush()
+
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        with self.lock:
+            key = (name, labels_key(labels))
+            histogram = self.histograms.setdefault(key, {"buckets": [0] * len(BUCKETS), "sum": 0, "count": 0})
+            for index, bucket in enumerate(BUCKETS):
+                if value <= bucket:
+                    histogram["buckets"][index] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+        self.maybe_flush()
+
+    @contextmanager
+    def timer(self, stage: str, name: str = "judge_stage_seconds"):
+        """
+        timer(stage) -> Context manager which observes duration of the stage
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, stage=stage)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "time": time.time(),
+                "counters": [[name, labels, value] for (name, labels), value in self.counters.items()],
+                "gauges": [[name, labels, value] for (name, labels), value in self.gauges.items()],
+                "histograms": [[name, labels, value] for (name, labels), value in self.histograms.items()],
+            }
+
+    def maybe_flush(self):
+        if time.monotonic() - self.flushed >= self.interval:
+            self.flush()
+
+    def flush(self):
+        """
+        flush() -> Save snapshot of the process, and the text file of all processes when it is configured
+        """
+        if not self.enabled:
+            return
+        self.flushed = time.monotonic()
+
+        try:
+            path = os.path.join(self.path, f"{os.getpid()}.json")
+            temp = f"{path}.{uuid.uuid4().hex}"
+            with open(temp, "w") as file:
+                json.dump(self.snapshot(), file)
+            os.replace(temp, path)
+
+            if self.textfile:
+                temp = f"{self.textfile}.{uuid.uuid4().hex}"
+                with open(temp, "w") as file:
+                    file.write(self.render())
+                os.replace(temp, self.textfile)
+        except OSError as e:
+            print("[ERROR]:can not save metrics.", e)
+
+    def render(self, extra: dict = None):
+        """
+        render(extra) -> Metrics of all processes in the Prometheus text format
+
+        Counters and histograms are summed, gauges of snapshots older than stale seconds are skipped.
+        extra - gauges computed when metrics are rendered, {name: value}
+        """
+        counters = {}
+        gauges = {}
+        histograms = {}
+
+        for name in os.listdir(self.path) if os.path.isdir(self.path) else []:
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.path, name), "r") as file:
+                    snapshot = json.load(file)
+            except (OSError, ValueError):
+                continue
+
+            for metric, labels, value in snapshot.get("counters"):
+                counters[(metric, labels)] = counters.get((metric, labels), 0) + value
+
+            if time.time() - snapshot.get("time", 0) <= self.stale:
+                for metric, labels, value in snapshot.get("gauges"):
+                    gauges[(metric, labels)] = gauges.get((metric, labels), 0) + value
+
+            for metric, labels, value in snapshot.get("histograms"):
+                histogram = histograms.setdefault((metric, labels), {"buckets": [0] * len(BUCKETS), "sum": 0, "count": 0})
+                histogram["buckets"] = [a + b for a, b in zip(histogram["buckets"], value.get("buckets"))]
+                histogram["sum"] += value.get("sum")
+                histogram["count"] += value.get("count")
+
+        for metric, value in (extra or {}).items():
+            gauges[(metric, labels_key({}))] = value
+
+        lines = []
+        written = set()
+
+        def header(metric):
+            if metric in written:
+                return
+            written.add(metric)
+            type, help = HELP.get(metric, ("untyped", metric))
+            lines.append(f"# HELP {metric} {help}")
+            lines.append(f"# TYPE {metric} {type}")
+
+        def format_labels(labels, **more):
+            items = json.loads(labels) + list(more.items())
+            if not items:
+                return ""
+            return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+        for (metric, labels), value in sorted(counters.items()):
+            header(metric)
+            lines.append(f"{metric}{format_labels(labels)} {value}")
+
+        for (metric, labels), value in sorted(gauges.items()):
+            header(metric)
+            lines.append(f"{metric}{format_labels(labels)} {value}")
+
+        for (metric, labels), value in sorted(histograms.items()):
+            header(metric)
+            for bucket, count in zip(BUCKETS, value.get("buckets")):
+                lines.append(f"{metric}_bucket{format_labels(labels, le=bucket)} {count}")
+            lines.append(f"{metric}_bucket{format_labels(labels, le='+Inf')} {value.get('count')}")
+            lines.append(f"{metric}_sum{format_labels(labels)} {round(value.get('sum'), 6)}")
+            lines.append(f"{metric}_count{format_labels(labels)} {value.get('count')}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
@@ -0,0 +1,145 @@
+import redis
+from django.conf import settings
+
+from utils.queue import connect
+
+
+def bits(data: bytes):
+    """
+    bits(data) -> Set of offsets of set bits, the first bit is the highest bit of the first byte (as SETBIT)
+    """
+    return {
+        index * 8 + bit
+        for index, byte in enumerate(data or b"")
+        if byte
+        for bit in range(8)
+        if byte & (0x80 >> bit)
+    }
+
+
+def problem_status(progress: tuple, problem_id: int):
+    """
+    problem_status(progress, problem_id) -> "solved", "attempted" or "not_attempted"
+
+    progress - (attempted, solved) sets of ProgressIndex.get()
+    """
+    attempted, solved = progress
+    if problem_id in solved:
+        return "solved"
+    if problem_id in attempted:
+        return "attempted"
+    return "not_attempted"
+
+
+class ProgressIndex:
+    """
+    Attempted and solved problems of users, saved in redis as bitsets with a bit per Problem.id:
+    <name>:<user>:attempted and <name>:<user>:solved.
+
+    Bitsets of a user are built from attempts on the first lookup and changed by the judge on every verdict,
+    they are deleted by redis after timeout seconds without changes. Lookups return None when the index
+    is disabled or redis is not available, callers use the database then.
+    """
+    def __init__(self, client: redis.Redis = None):
+        config = settings.PROBLEM_PROGRESS
+        self.name = config.get("name")
+        self.timeout = config.get("timeout")
+        self.client = client or connect(decode_responses=False)
+
+    @property
+    def enabled(self):
+        return settings.PROBLEM_PROGRESS.get("enabled", True)
+
+    def key(self, user_id: int, kind: str):
+        return f"{self.name}:{user_id}:{kind}"
+
+    def expire(self, pipeline, user_id: int):
+        for kind in ("attempted", "solved", "built"):
+            pipeline.expire(self.key(user_id, kind), self.timeout)
+
+    def record(self, user_id: int, problem_id: int, status: str):
+        """
+        record(user_id, problem_id, status) -> Mark the problem as attempted, and solved when status is "ac"
+
+        Bits are set even when the index of the user is not built yet, build() adds the rest.
+        """
+        if not self.enabled:
+            return
+        try:
+            pipeline = self.client.pipeline()
+            pipeline.setbit(self.key(user_id, "attempted"), problem_id, 1)
+            if status == "ac":
+                pipeline.setbit(self.key(user_id, "solved"), problem_id, 1)
+            self.expire(pipeline, user_id)
+            pipeline.execute()
+        except redis.RedisError as e:
+            print("[ERROR]:can not save problem progress.", e)
+            # bits of the user miss this verdict, the next lookup builds them from attempts
+            self.forget(user_id)
+
+    def forget(self, user_id: int):
+        """
+        forget(user_id) -> Mark the index of the user as not built
+        """
+        try:
+            self.client.delete(self.key(user_id, "built"))
+        except redis.RedisError as e:
+            print("[ERROR]:can not reset problem progress.", e)
+
+    def build(self, user_id: int):
+        """
+        build(user_id) -> Set bits of all attempted and solved problems of the user from the database
+        """
+        from problems.models import Attempt
+
+        attempts = Attempt.objects.filter(author_id=user_id).order_by()
+        pipeline = self.client.pipeline()
+        for problem_id in attempts.values_list("problem_id", flat=True).distinct():
+            pipeline.setbit(self.key(user_id, "attempted"), problem_id, 1)
+        for problem_id in attempts.filter(status="ac").values_list("problem_id", flat=True).distinct():
+            pipeline.setbit(self.key(user_id, "solved"), problem_id, 1)
+        pipeline.set(self.key(user_id, "built"), 1)
+        self.expire(pipeline, user_id)
+        pipeline.execute()
+
+    def get(self, user_id: int):
+        """
+        get(user_id) -> (attempted, solved) sets of problem ids, None when the index can not be used
+        """
+        if not self.enabled:
+            return None
+        try:
+            pipeline = self.client.pipeline()
+            pipeline.exists(self.key(user_id, "built"))
+            pipeline.get(self.key(user_id, "attempted"))
+            pipeline.get(self.key(user_id, "solved"))
+            built, attempted, solved = pipeline.execute()
+
+            if not built:
+                self.build(user_id)
+                attempted, solved = self.client.mget([self.key(user_id, "attempted"), self.key(user_id, "solved")])
+        except redis.RedisError as e:
+            print("[ERROR]:can not read problem progress.", e)
+            return None
+
+        return bits(attempted), bits(solved)
+
+    def counts(self, user_id: int):
+        """
+        counts(user_id) -> {"attempted", "solved"} numbers of problems, counted in the database when the index can not be used
+        """
+        progress = self.get(user_id)
+
+        if progress is None:
+            from problems.models import Attempt
+
+            attempts = Attempt.objects.filter(author_id=user_id).order_by()
+            return {
+                "attempted": attempts.values("problem_id").distinct().count(),
+                "solved": attempts.filter(status="ac").values("problem_id").distinct().count(),
+            }
+
+        return {
+            "attempted": len(progress[0]),
+            "solved": len(progress[1]),
+        }
@@ -0,0 +1,565 @@
+import os
+import json
+import math
+import time
+import uuid
+import redis
+from django.conf import settings
+
+
+def connect(decode_responses: bool = True):
+    """
+    connect(decode_responses) -> Redis client of the judge queue, shared by all judge nodes
+    """
+    config = settings.JUDGE_QUEUE
+    if config.get("url"):
+        return redis.Redis.from_url(config.get("url"), decode_responses=decode_responses)
+    return redis.Redis(
+        host=config.get("host"),
+        port=config.get("port"),
+        db=config.get("db"),
+        decode_responses=decode_responses,
+    )
+
+
+# payloads are kept in <name>:payloads by id, lists keep only ids.
+# every user has own list of ids per priority class and language, users ready to be served are in the sorted set
+# <name>:ready:<class>:<language> with their virtual time, users with in_flight running attempts wait in
+# <name>:blocked:<user> as "<class>|<language>" members, blocked users are in the <name>:blocked set.
+# popped attempts are leased to the worker until <name>:leases score (deadline), see REQUEUE_SCRIPT,
+# attempts waiting to be popped are in <name>:waiting by the time they were queued, see EXPIRE_SCRIPT
+PUSH_SCRIPT = """
+local name, priority, language, user = ARGV[1], ARGV[2], ARGV[3], ARGV[4]
+local weight, id, payload, max_queued, now = ARGV[5], ARGV[6], ARGV[7], tonumber(ARGV[8]), tonumber(ARGV[9])
+local list = name .. ":user:" .. priority .. ":" .. language .. ":" .. user
+local ready = name .. ":ready:" .. priority .. ":" .. language
+
+if max_queued > 0 and tonumber(redis.call("HGET", name .. ":queued", user) or "0") >= max_queued then
+    return -1
+end
+
+redis.call("RPUSH", list, id)
+redis.call("HSET", name .. ":payloads", id, payload)
+redis.call("HSET", name .. ":meta", id, priority .. "|" .. language .. "|" .. user)
+redis.call("HSET", name .. ":weights", user, weight)
+redis.call("HINCRBY", name .. ":queued", user, 1)
+redis.call("SADD", name .. ":languages", language)
+redis.call("INCR", name .. ":size")
+redis.call("ZADD", name .. ":waiting", now, id)
+
+if not redis.call("ZSCORE", ready, user) and not redis.call("ZSCORE", name .. ":blocked:" .. user, priority .. "|" .. language) then
+    -- idle users start from the virtual time of the class, bursts do not give them more than their share
+    local now = tonumber(redis.call("GET", name .. ":vtime:" .. priority) or "0")
+    local finish = tonumber(redis.call("HGET", name .. ":finish:" .. priority, user) or "0")
+    redis.call("ZADD", ready, math.max(now, finish), user)
+end
+
+redis.call("RPUSH", name .. ":signal", 1)
+redis.call("LTRIM", name .. ":signal", -1024, -1)
+return redis.call("LLEN", list)
+"""
+
+POP_SCRIPT = """
+local name, in_flight, running_timeout = ARGV[1], tonumber(ARGV[2]), tonumber(ARGV[3])
+local worker, deadline, count = ARGV[4], tonumber(ARGV[5]), tonumber(ARGV[6])
+local classes, languages = {}, {}
+
+for i = 7, 6 + count do
+    table.insert(classes, ARGV[i])
+end
+for i = 7 + count, #ARGV do
+    table.insert(languages, ARGV[i])
+end
+-- workers without languages take attempts of all languages
+if #languages == 0 then
+    languages = redis.call("SMEMBERS", name .. ":languages")
+end
+
+for _, priority in ipairs(classes) do
+    while true do
+        -- the user with the smallest virtual time in ready sets of the worker's languages
+        local user, vtime, language
+        for _, current in ipairs(languages) do
+            local first = redis.call("ZRANGE", name .. ":ready:" .. priority .. ":" .. current, 0, 0, "WITHSCORES")
+            if #first > 0 and (not vtime or tonumber(first[2]) < vtime) then
+                user, vtime, language = first[1], tonumber(first[2]), current
+            end
+        end
+        if not user then
+            break
+        end
+
+        local ready = name .. ":ready:" .. priority .. ":" .. language
+        local running = name .. ":running:" .. user
+
+        if in_flight > 0 and tonumber(redis.call("GET", running) or "0") >= in_flight then
+            -- user waits until one of the running attempts is finished
+            redis.call("ZREM", ready, user)
+            redis.call("ZADD", name .. ":blocked:" .. user, vtime, priority .. "|" .. language)
+            redis.call("SADD", name .. ":blocked", user)
+        else
+            local list = name .. ":user:" .. priority .. ":" .. language .. ":" .. user
+            local id = redis.call("LPOP", list)
+            local payload = id and redis.call("HGET", name .. ":payloads", id)
+
+            if payload then
+                local weight = tonumber(redis.call("HGET", name .. ":weights", user) or "1")
+                local finish = vtime + 1 / weight
+
+                redis.call("SET", name .. ":vtime:" .. priority, vtime)
+                redis.call("DECR", name .. ":size")
+                redis.call("ZREM", name .. ":waiting", id)
+                redis.call("HINCRBY", name .. ":queued", user, -1)
+                redis.call("INCR", running)
+                -- running attempts are forgotten after running_timeout, even when their leases are lost
+                redis.call("EXPIRE", running, running_timeout)
+                redis.call("ZADD", name .. ":leases", deadline, id)
+                redis.call("HSET", name .. ":owners", id, worker)
+
+                if redis.call("LLEN", list) > 0 then
+                    redis.call("ZADD", ready, finish, user)
+                else
+                    redis.call("ZREM", ready, user)
+                    redis.call("HSET", name .. ":finish:" .. priority, user, finish)
+                end
+                return payload
+            end
+
+            if not id then
+                redis.call("ZREM", ready, user)
+            end
+        end
+    end
+end
+
+return false
+"""
+
+# one running attempt of the user is finished (done, lease lost or dropped), blocked lists of the user are ready again
+UNBLOCK_FUNCTION = """
+local function unblock(name, user)
+    local running = name .. ":running:" .. user
+    if tonumber(redis.call("GET", running) or "0") > 0 then
+        redis.call("DECR", running)
+    end
+
+    local blocked = name .. ":blocked:" .. user
+    local members = redis.call("ZRANGE", blocked, 0, -1, "WITHSCORES")
+    for i = 1, #members, 2 do
+        local priority, language = string.match(members[i], "^([^|]*)|(.*)$")
+        redis.call("ZADD", name .. ":ready:" .. priority .. ":" .. language, members[i + 1], user)
+        redis.call("RPUSH", name .. ":signal", 1)
+    end
+    redis.call("DEL", blocked)
+    redis.call("SREM", name .. ":blocked", user)
+end
+"""
+
+# unblocks the user, keys of the attempt are deleted only by the worker which holds the lease
+DONE_SCRIPT = UNBLOCK_FUNCTION + """
+local name, id, worker = ARGV[1], ARGV[2], ARGV[3]
+
+if redis.call("HGET", name .. ":owners", id) ~= worker then
+    return 0
+end
+
+local meta = redis.call("HGET", name .. ":meta", id)
+redis.call("ZREM", name .. ":leases", id)
+redis.call("HDEL", name .. ":owners", id)
+redis.call("HDEL", name .. ":payloads", id)
+redis.call("HDEL", name .. ":meta", id)
+redis.call("HDEL", name .. ":requeues", id)
+
+if not meta then
+    return 1
+end
+
+unblock(name, string.match(meta, "^[^|]*|[^|]*|(.*)$"))
+return 1
+"""
+
+EXTEND_SCRIPT = """
+local name, worker, deadline = ARGV[1], ARGV[2], tonumber(ARGV[3])
+local extended = 0
+
+for i = 4, #ARGV do
+    if redis.call("HGET", name .. ":owners", ARGV[i]) == worker then
+        redis.call("ZADD", name .. ":leases", deadline, ARGV[i])
+        extended = extended + 1
+    end
+end
+return extended
+"""
+
+# attempts of workers which stopped sending heartbeats go back to the front of their users' lists,
+# their users are unblocked as in DONE_SCRIPT, also when the attempt is dropped,
+# attempts requeued more than max_requeues times (for example, they kill workers) are dropped
+REQUEUE_SCRIPT = UNBLOCK_FUNCTION + """
+local name, now, max_requeues = ARGV[1], tonumber(ARGV[2]), tonumber(ARGV[3])
+local ids = redis.call("ZRANGEBYSCORE", name .. ":leases", "-inf", now)
+local result = {}
+
+for _, id in ipairs(ids) do
+    redis.call("ZREM", name .. ":leases", id)
+    redis.call("HDEL", name .. ":owners", id)
+
+    local meta = redis.call("HGET", name .. ":meta", id)
+    if meta then
+        local priority, language, user = string.match(meta, "^([^|]*)|([^|]*)|(.*)$")
+        unblock(name, user)
+
+        if redis.call("HINCRBY", name .. ":requeues", id, 1) > max_requeues then
+            redis.call("HDEL", name .. ":payloads", id)
+            redis.call("HDEL", name .. ":meta", id)
+            redis.call("HDEL", name .. ":requeues", id)
+            table.insert(result, "dropped:" .. id)
+        else
+            local ready = name .. ":ready:" .. priority .. ":" .. language
+            local vtime = tonumber(redis.call("GET", name .. ":vtime:" .. priority) or "0")
+            local score = tonumber(redis.call("ZSCORE", ready, user) or vtime)
+
+            redis.call("LPUSH", name .. ":user:" .. priority .. ":" .. language .. ":" .. user, id)
+            redis.call("HINCRBY", name .. ":queued", user, 1)
+            redis.call("INCR", name .. ":size")
+            redis.call("ZADD", name .. ":waiting", now, id)
+            redis.call("ZADD", ready, math.min(score, vtime), user)
+            redis.call("RPUSH", name .. ":signal", 1)
+            table.insert(result, "requeued:" .. id)
+        end
+    end
+end
+return result
+"""
+
+# attempts waiting longer than queued_timeout are dropped, for example attempts of languages which no worker judges,
+# so they do not count to max_queued of their users forever
+EXPIRE_SCRIPT = """
+local name, before = ARGV[1], tonumber(ARGV[2])
+local ids = redis.call("ZRANGEBYSCORE", name .. ":waiting", "-inf", before)
+local result = {}
+
+for _, id in ipairs(ids) do
+    redis.call("ZREM", name .. ":waiting", id)
+
+    local meta = redis.call("HGET", name .. ":meta", id)
+    if meta then
+        local priority, language, user = string.match(meta, "^([^|]*)|([^|]*)|(.*)$")
+        local list = name .. ":user:" .. priority .. ":" .. language .. ":" .. user
+
+        -- leased attempts are not in lists, their keys are deleted by done or requeue
+        if redis.call("LREM", list, 0, id) > 0 then
+            redis.call("HINCRBY", name .. ":queued", user, -1)
+            redis.call("DECR", name .. ":size")
+            redis.call("HDEL", name .. ":payloads", id)
+            redis.call("HDEL", name .. ":meta", id)
+            redis.call("HDEL", name .. ":requeues", id)
+            table.insert(result, id)
+        end
+
+        if redis.call("LLEN", list) == 0 then
+            local blocked = name .. ":blocked:" .. user
+            redis.call("ZREM", name .. ":ready:" .. priority .. ":" .. language, user)
+            redis.call("ZREM", blocked, priority .. "|" .. language)
+            if redis.call("EXISTS", blocked) == 0 then
+                redis.call("SREM", name .. ":blocked", user)
+            end
+        end
+    end
+end
+return result
+"""
+
+
+class JudgeQueue:
+    """
+    Attempts waiting for judge workers, scheduled fairly between users.
+
+    Priority classes are served in the order of JUDGE_SCHEDULER["classes"], for example contest attempts before practice.
+    Users of one class are served by weighted fair queueing: the user with the smallest virtual time is served first,
+    and every served attempt adds 1 / weight to the virtual time of the user, so premium users (weight 2)
+    get twice as many turns as free users, and a user with many attempts can not starve others.
+    A user has at most in_flight attempts being judged at once, done() must be called when an attempt is judged.
+
+    Workers of many nodes share the queue. A worker takes only attempts of its languages (all languages by default),
+    and holds a lease on every popped attempt, which it extends with heartbeat(). Attempts of workers which
+    stopped sending heartbeats are queued again by requeue().
+    """
+    def __init__(self, name: str = None, client: redis.Redis = None, worker: str = None, languages: list = None):
+        config = settings.JUDGE_SCHEDULER
+        node = settings.JUDGE_NODE
+        self.name = name or settings.JUDGE_QUEUE.get("name")
+        self.classes = config.get("classes")
+        self.weights = config.get("weights")
+        self.in_flight = config.get("in_flight")
+        self.max_queued = config.get("max_queued")
+        self.running_timeout = config.get("running_timeout")
+        self.queued_timeout = config.get("queued_timeout")
+        self.lease = node.get("lease")
+        self.heartbeat_ttl = node.get("heartbeat") * 3
+        self.max_requeues = node.get("max_requeues")
+        self.worker = worker or f"{node.get('name')}-{os.getpid()}"
+        self.languages = [str(language) for language in languages or []]
+        self.client = client or connect()
+        self.push_script = self.client.register_script(PUSH_SCRIPT)
+        self.pop_script = self.client.register_script(POP_SCRIPT)
+        self.done_script = self.client.register_script(DONE_SCRIPT)
+        self.extend_script = self.client.register_script(EXTEND_SCRIPT)
+        self.requeue_script = self.client.register_script(REQUEUE_SCRIPT)
+        self.expire_script = self.client.register_script(EXPIRE_SCRIPT)
+
+    def priority(self, user):
+        """
+        priority(user) -> Priority class of attempts of the user outside of contests
+        """
+        return self.classes[-1]
+
+    def weight(self, user):
+        """
+        weight(user) -> Share of the user in the priority class
+        """
+        if getattr(user, "is_premium", False):
+            return self.weights.get("premium")
+        return self.weights.get("default")
+
+    def push(self, payload: dict, priority: str = None, weight: float = 1):
+        """
+        push(payload, priority, weight) -> Id of the queued attempt, None when the user has too many queued attempts
+
+        payload - dict with "user" and "language"
+        priority - priority class, the last class by default
+        The id is used as uuid of the attempt, so an attempt queued again is judged to the same attempt.
+        """
+        priority = priority if priority in self.classes else self.classes[-1]
+        payload = {**payload, "id": str(uuid.uuid4()), "priority": priority}
+        result = self.push_script(args=[
+            self.name,
+            priority,
+            payload.get("language") or "",
+            payload.get("user"),
+            weight,
+            payload.get("id"),
+            json.dumps(payload),
+            self.max_queued,
+            time.time(),
+        ])
+        if result == -1:
+            return None
+        return payload.get("id")
+
+    def pop_once(self):
+        item = self.pop_script(args=[
+            self.name,
+            self.in_flight,
+            self.running_timeout,
+            self.worker,
+            time.time() + self.lease,
+            len(self.classes),
+            *self.classes,
+            *self.languages,
+        ])
+        if not item:
+            return None
+        return json.loads(item)
+
+    def pop(self, timeout: int = 5):
+        """
+        pop(timeout) -> Wait for the next attempt payload, None when timeout expires
+
+        timeout - int (seconds)
+        """
+        payload = self.pop_once()
+        if payload:
+            return payload
+
+        # new attempts and finished attempts of blocked users wake up workers
+        if not self.client.blpop(f"{self.name}:signal", timeout=timeout):
+            return None
+        return self.pop_once()
+
+    def done(self, payload: dict):
+        """
+        done(payload) -> Attempt of the payload is judged, next attempts of the user can be served
+
+        Nothing is changed when the lease of the attempt was lost and the attempt was queued again.
+        """
+        return bool(self.done_script(args=[self.name, payload.get("id"), self.worker]))
+
+    def heartbeat(self, info: dict = None, ids: list = None):
+        """
+        heartbeat(info, ids) -> Register the worker for 3 heartbeat intervals and extend leases of attempts with ids
+
+        info - capacity of the worker, for example {"cores", "languages"}, see workers()
+        """
+        pipeline = self.client.pipeline()
+        pipeline.set(
+            f"{self.name}:worker:{self.worker}",
+            json.dumps({**(info or {}), "worker": self.worker, "running": ids or [], "time": time.time()}),
+            px=int(self.heartbeat_ttl * 1000),
+        )
+        pipeline.sadd(f"{self.name}:workers", self.worker)
+        pipeline.execute()
+
+        if ids:
+            self.extend_script(args=[self.name, self.worker, time.time() + self.lease, *ids])
+
+    def unregister(self):
+        pipeline = self.client.pipeline()
+        pipeline.delete(f"{self.name}:worker:{self.worker}")
+        pipeline.srem(f"{self.name}:workers", self.worker)
+        pipeline.execute()
+
+    def workers(self):
+        """
+        workers() -> Alive workers with their last heartbeat info, workers without heartbeats are forgotten
+        """
+        names = sorted(self.client.smembers(f"{self.name}:workers"))
+        if not names:
+            return []
+
+        result = []
+        for name, info in zip(names, self.client.mget([f"{self.name}:worker:{name}" for name in names])):
+            if info:
+                result.append(json.loads(info))
+            else:
+                self.client.srem(f"{self.name}:workers", name)
+        return result
+
+    def requeue(self):
+        """
+        requeue() -> (requeued, dropped) ids of attempts whose leases expired
+
+        Any worker can call it, the script is atomic.
+        """
+        requeued = []
+        dropped = []
+        for item in self.requeue_script(args=[self.name, time.time(), self.max_requeues]):
+            action, _, id = item.partition(":")
+            (dropped if action == "dropped" else requeued).append(id)
+        return requeued, dropped
+
+    def expire(self):
+        """
+        expire() -> Ids of attempts dropped after waiting queued_timeout seconds without a worker
+        """
+        return self.expire_script(args=[self.name, time.time() - self.queued_timeout])
+
+    def size(self):
+        return max(0, int(self.client.get(f"{self.name}:size") or 0))
+
+    def streams(self, priority: str, languages: list):
+        """
+        streams(priority, languages) -> [(user, vtime, language, length, weight)] of lists of the priority class
+
+        Every user has one list per language, ready and blocked users are included.
+        """
+        pipeline = self.client.pipeline()
+        for language in languages:
+            pipeline.zrange(f"{self.name}:ready:{priority}:{language}", 0, -1, withscores=True)
+        blocked = sorted(self.client.smembers(f"{self.name}:blocked"))
+        for user in blocked:
+            pipeline.zrange(f"{self.name}:blocked:{user}", 0, -1, withscores=True)
+        replies = pipeline.execute()
+
+        users = []
+        for language, members in zip(languages, replies):
+            users += [(user, vtime, language) for user, vtime in members]
+        for user, members in zip(blocked, replies[len(languages):]):
+            for member, vtime in members:
+                member_priority, _, language = member.partition("|")
+                if member_priority == priority:
+                    users.append((user, vtime, language))
+
+        pipeline = self.client.pipeline()
+        for user, _, language in users:
+            pipeline.llen(f"{self.name}:user:{priority}:{language}:{user}")
+            pipeline.hget(f"{self.name}:weights", user)
+        replies = pipeline.execute()
+
+        return [
+            (user, vtime, language, length, float(weight or 1))
+            for (user, vtime, language), length, weight in zip(users, replies[::2], replies[1::2])
+        ]
+
+    def positions(self):
+        """
+        positions() -> {user: [{"id", "position"}]} of queued attempts, positions start from 1
+
+        Position is the order in which the attempt will be served if nothing else is queued.
+        It reads every queued id, user_positions() is used for one user.
+        """
+        result = {}
+        offset = 0
+        languages = sorted(self.client.smembers(f"{self.name}:languages"))
+
+        for priority in self.classes:
+            streams = self.streams(priority, languages)
+            if not streams:
+                continue
+
+            pipeline = self.client.pipeline()
+            for user, _, language, _, _ in streams:
+                pipeline.lrange(f"{self.name}:user:{priority}:{language}:{user}", 0, -1)
+
+            attempts = []
+            for (user, vtime, language, _, weight), ids in zip(streams, pipeline.execute()):
+                for index, id in enumerate(ids):
+                    attempts.append((vtime + index / weight, user, language, id))
+
+            for position, (_, user, _, id) in enumerate(sorted(attempts), start=offset + 1):
+                result.setdefault(user, []).append({"id": id, "position": position})
+            offset += len(attempts)
+
+        return result
+
+    def user_positions(self, user):
+        """
+        user_positions(user) -> [{"id", "position"}] of queued attempts of the user, the same as positions()[user]
+
+        Only ids of the user are read, attempts of other users are counted from lengths and virtual times of their lists.
+        """
+        user = str(user)
+        result = []
+        offset = 0
+        languages = sorted(self.client.smembers(f"{self.name}:languages"))
+
+        for priority in self.classes:
+            streams = self.streams(priority, languages)
+            own = [stream for stream in streams if stream[0] == user]
+
+            pipeline = self.client.pipeline()
+            for _, _, language, _, _ in own:
+                pipeline.lrange(f"{self.name}:user:{priority}:{language}:{user}", 0, -1)
+
+            attempts = []
+            for (_, vtime, language, _, weight), ids in zip(own, pipeline.execute() if own else []):
+                for index, id in enumerate(ids):
+                    key = (vtime + index / weight, user, language)
+                    # attempts of all lists which are served before this attempt
+                    ahead = sum(ahead_count(stream, key) for stream in streams)
+                    attempts.append((key, id, offset + ahead + 1))
+
+            result += [{"id": id, "position": position} for _, id, position in sorted(attempts)]
+            offset += sum(stream[3] for stream in streams)
+
+        return result
+
+
+def ahead_count(stream: tuple, key: tuple):
+    """
+    ahead_count(stream, key) -> Number of attempts of the list which are sorted before key
+
+    stream - (user, vtime, language, length, weight), index-th attempt of the list is sorted by
+    (vtime + index / weight, user, language)
+    """
+    user, vtime, language, length, weight = stream
+
+    def before(index):
+        return (vtime + index / weight, user, language) < key
+
+    # attempts of the list are in increasing order, the estimate is corrected for rounding
+    count = min(length, max(0, math.ceil((key[0] - vtime) * weight)))
+    while count > 0 and not before(count - 1):
+        count -= 1
+    while count < length and before(count):
+        count += 1
+    return count
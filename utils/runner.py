@@ -0,0 +1,150 @@
+import os
+import json
+import select
+import signal
+import threading
+import subprocess
+
+
+class RunnerError(Exception):
+    pass
+
+
+class Runner:
+    """
+    Long-lived sandbox process started with `sandbox -s`, runs programs without writing output.txt, error.txt and meta.json.
+
+    Request is one tab separated line: limits, cwd, input file and command.
+    Response is a json line with meta of the run, then "output" bytes of stdout and "error" bytes of stderr.
+
+    command - command which starts the runner, `sandbox -s` by default (utils/zygote.py speaks the same protocol)
+    """
+    def __init__(self, sandbox: str, command: list = None):
+        self.sandbox = os.path.abspath(sandbox)
+        self.command = command or [self.sandbox, "-s"]
+        self.key = (self.sandbox, tuple(command or ()))
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            start_new_session=True,
+        )
+        self.buffer = b""
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def fill(self, timeout: float):
+        """
+        fill(timeout) -> Read the next chunk of the response to the buffer
+        """
+        ready, _, _ = select.select([self.process.stdout], [], [], timeout)
+        if not ready:
+            raise subprocess.TimeoutExpired(self.sandbox, timeout)
+        chunk = os.read(self.process.stdout.fileno(), 64 * 1024)
+        if not chunk:
+            raise RunnerError("runner stopped")
+        self.buffer += chunk
+
+    def read(self, size: int, timeout: float):
+        """
+        read(size, timeout) -> Read exactly size bytes of the response
+        """
+        while len(self.buffer) < size:
+            self.fill(timeout)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def readline(self, timeout: float):
+        while b"\n" not in self.buffer:
+            self.fill(timeout)
+        return self.read(self.buffer.index(b"\n") + 1, timeout)
+
+    def run(self, command: list, cwd: str, input: str, limits: dict, timeout: float):
+        """
+        run(command, cwd, input, limits, timeout) -> Meta of the run with "stdout" and "stderr" bytes
+
+        command - program and its arguments, without the sandbox
+        limits - dict with time, wall, memory, processes, file_size, output, lines and cgroup_memory
+        timeout - seconds to wait for the response, the runner is killed when it expires
+        """
+        fields = [
+            limits.get("time"),
+            limits.get("wall"),
+            limits.get("memory"),
+            limits.get("processes"),
+            limits.get("file_size"),
+            limits.get("output"),
+            limits.get("lines"),
+            limits.get("cgroup_memory", 0),
+            cwd,
+            input,
+            *command,
+        ]
+        request = "\t".join(str(field) for field in fields) + "\n"
+
+        try:
+            self.process.stdin.write(request.encode())
+            self.process.stdin.flush()
+            meta = json.loads(self.readline(timeout))
+            if "error" in meta and isinstance(meta.get("error"), str):
+                raise RunnerError(meta.get("error"))
+            meta["stdout"] = self.read(meta.get("output"), timeout)
+            meta["stderr"] = self.read(meta.get("error"), timeout)
+        except subprocess.TimeoutExpired:
+            self.kill()
+            raise
+        except (OSError, ValueError) as e:
+            self.kill()
+            raise RunnerError(str(e))
+        return meta
+
+    def kill(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self.process.wait()
+
+
+class RunnerPool:
+    """
+    Idle runners of every sandbox binary, one runner checks one test at a time.
+    Runners are started on demand and reused by the next tests of the worker.
+    """
+    def __init__(self, size: int = 4):
+        self.size = size
+        self.idle = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, sandbox: str, command: list = None):
+        """
+        acquire(sandbox, command) -> Idle runner of the sandbox binary, starts a new one when there is no idle runner
+        """
+        sandbox = os.path.abspath(sandbox)
+        with self.lock:
+            runners = self.idle.setdefault((sandbox, tuple(command or ())), [])
+            while runners:
+                runner = runners.pop()
+                if runner.alive():
+                    return runner
+        return Runner(sandbox, command)
+
+    def release(self, runner: Runner):
+        """
+        release(runner) -> Return runner to the pool, stopped runners and runners over size are dropped
+        """
+        with self.lock:
+            runners = self.idle.setdefault(runner.key, [])
+            if runner.alive() and len(runners) < self.size:
+                runners.append(runner)
+                return
+        if runner.alive():
+            runner.kill()
+
+    def close(self):
+        with self.lock:
+            runners = [runner for items in self.idle.values() for runner in items]
+            self.idle = {}
+        for runner in runners:
+            runner.kill()
@@ -0,0 +1,459 @@
+import os
+import re
+import json
+import uuid
+import shutil
+import redis
+import hashlib
+import zipfile
+import subprocess
+from django.conf import settings
+
+from utils.queue import connect
+
+
+INPUT_EXTENSIONS = (".in", ".inp", ".input")
+OUTPUT_EXTENSIONS = (".out", ".ans", ".a", ".output", ".sol")
+# test groups of the archive: [{"name": "1", "points": 30, "tests": [1, 2, 3]}, {"name": "2", "points": 70, "tests": "4-10"}]
+GROUPS_FILE = "groups.json"
+# reason why groups.json of the archive is not used, tests of such archives are judged without groups
+GROUPS_ERROR_FILE = "groups.error"
+
+
+# files of problems which are hashed, checkers and interactors are hashed like tests
+HASHED_FILES = ("tests", "checker", "interactor")
+
+
+# redis key -> (version, hash) of files hashed by this process
+hashes = {}
+
+
+def file_version(file):
+    """
+    file_version(file) -> Name, size and modification time of the stored file
+
+    A file replaced by another one with the same name and size still gets a new version.
+    """
+    try:
+        modified = file.storage.get_modified_time(file.name).timestamp()
+    except (NotImplementedError, OSError):
+        modified = ""
+    return f"{file.name}:{file.size}:{modified}"
+
+
+def file_hash(problem, name: str, client):
+    """
+    file_hash(problem, name, client) -> sha256 of the tests, checker or interactor file of the problem, computed again only when the file changes
+
+    The file is read through the storage of the field, so nodes without the media folder can compute it.
+    Hashes are saved in redis by the version of the file, every node uses the hash computed by the first one.
+    """
+    file = getattr(problem, name)
+    if not file:
+        return ""
+
+    key = f"{name}_hash_{problem.pk}"
+    version = file_version(file)
+    if hashes.get(key, (None,))[0] == version:
+        return hashes.get(key)[1]
+
+    try:
+        cached = client.hget(key, version)
+    except redis.RedisError as e:
+        print("[ERROR]:can not read file hash.", e)
+        cached = None
+
+    if not cached:
+        digest = hashlib.sha256()
+        with file.open("rb") as content:
+            for chunk in iter(lambda: content.read(1024 * 1024), b""):
+                digest.update(chunk)
+        cached = digest.hexdigest()
+
+        try:
+            # old versions of the file are not needed
+            client.delete(key)
+            client.hset(key, version, cached)
+        except redis.RedisError as e:
+            print("[ERROR]:can not save file hash.", e)
+
+    hashes[key] = (version, cached)
+    return cached
+
+
+def tests_hash(problem, client):
+    """
+    tests_hash(problem, client) -> sha256 of tests archive, see file_hash
+    """
+    return file_hash(problem, "tests", client)
+
+
+def forget_hashes(problem, client):
+    """
+    forget_hashes(problem, client) -> Delete hashes of the files of the problem saved by this process and in redis
+    """
+    keys = [f"{name}_hash_{problem.pk}" for name in HASHED_FILES]
+    for key in keys:
+        hashes.pop(key, None)
+    try:
+        client.delete(*keys)
+    except redis.RedisError as e:
+        print("[ERROR]:can not delete file hashes.", e)
+
+
+class TestsError(Exception):
+    pass
+
+
+# errors of zipfile when the archive is not a zip file, is damaged or uses unsupported compression or encryption
+ARCHIVE_ERRORS = (zipfile.BadZipFile, zipfile.LargeZipFile, NotImplementedError, RuntimeError, EOFError)
+
+
+class TestStore:
+    """
+    Content-addressed store of tests, every archive is extracted once to <path>/<sha256 of archive>/.
+    Problems with the same archive share the folder, and judge nodes fetch archives through the storage
+    of the problem's field, so the media folder does not have to be shared between nodes.
+
+    Every folder has index.json with the list of (input, expected) file pairs,
+    and groups.json when the archive has a valid groups.json in its root (groups.error when it is not valid).
+    Least recently used folders are deleted when the store is bigger than max_size.
+    """
+    def __init__(self, path: str = None, max_size: int = None, client: redis.Redis = None):
+        config = settings.JUDGE_TESTS_STORE
+        self.path = str(path or config.get("path"))
+        self.max_size = max_size or config.get("size")
+        self.client = client or connect()
+
+        os.makedirs(self.path, exist_ok=True)
+
+    def folder(self, problem):
+        return os.path.join(self.path, tests_hash(problem, self.client))
+
+    def get(self, problem):
+        """
+        get(problem) -> List of tests, extracts the archive when it is not extracted yet
+
+        Every test is a dict with absolute "input" and "output" paths.
+        """
+        if not problem.tests:
+            return []
+
+        folder = self.folder(problem)
+
+        if not os.path.isfile(os.path.join(folder, "index.json")):
+            self.extract(problem, folder)
+        else:
+            # mark folder as recently used
+            os.utime(folder)
+
+        with open(os.path.join(folder, "index.json"), "r") as index:
+            tests = json.load(index)
+
+        return [
+            {
+                "input": os.path.join(folder, "tests", test.get("input")),
+                "output": os.path.join(folder, "tests", test.get("output")),
+            }
+            for test in tests
+        ]
+
+    def groups(self, problem):
+        """
+        groups(problem) -> List of test groups, None when the tests have no groups
+
+        Every group is a dict with "name", "points" and "tests" (increasing indexes of tests, from 0).
+        Tests must be extracted with get() before.
+        """
+        if not problem.tests:
+            return None
+
+        try:
+            with open(os.path.join(self.folder(problem), GROUPS_FILE), "r") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def groups_error(self, problem):
+        """
+        groups_error(problem) -> Reason why groups.json of the tests is not used, None when it is used or there is no groups.json
+
+        Tests must be extracted with get() before.
+        """
+        if not problem.tests:
+            return None
+
+        try:
+            with open(os.path.join(self.folder(problem), GROUPS_ERROR_FILE), "r") as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def validate(self, file):
+        """
+        validate(file) -> Check the uploaded tests archive, raises TestsError when it is not a zip archive with tests
+
+        file - binary file object, it is read from the start and rewound
+        """
+        try:
+            file.seek(0)
+            with zipfile.ZipFile(file, "r") as archive:
+                broken = archive.testzip()
+                names = [test.filename for test in archive.filelist if not test.is_dir() and test.filename != GROUPS_FILE]
+        except ARCHIVE_ERRORS as e:
+            raise TestsError(f"tests archive can not be read: {e}")
+        finally:
+            file.seek(0)
+
+        if broken:
+            raise TestsError(f"{broken} of the tests archive is damaged")
+        if not self.pairs(names):
+            raise TestsError("tests archive has no input and output files")
+
+    def extract(self, problem, folder: str):
+        """
+        extract(problem, folder) -> Extract tests archive of the problem to folder
+
+        Raises TestsError when the archive can not be read.
+        """
+        temp = os.path.join(self.path, f".{uuid.uuid4().hex}")
+
+        try:
+            with problem.tests.open("rb") as source, zipfile.ZipFile(source, "r") as archive:
+                names = [test.filename for test in archive.filelist if not test.is_dir() and test.filename != GROUPS_FILE]
+                groups = archive.read(GROUPS_FILE) if GROUPS_FILE in archive.namelist() else None
+                for name in names:
+                    target = os.path.realpath(os.path.join(temp, "tests", name))
+                    # do not extract files outside of the folder
+                    if not target.startswith(os.path.realpath(temp) + os.sep):
+                        continue
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    with archive.open(name) as source, open(target, "wb") as file:
+                        shutil.copyfileobj(source, file, 1024 * 1024)
+
+            # archive without tests
+            os.makedirs(temp, exist_ok=True)
+
+            pairs = self.pairs(names)
+            with open(os.path.join(temp, "index.json"), "w") as index:
+                json.dump([
+                    {"input": input, "output": output}
+                    for input, output in pairs
+                ], index)
+
+            if groups:
+                try:
+                    groups = self.parse_groups(groups, len(pairs))
+                    with open(os.path.join(temp, GROUPS_FILE), "w") as file:
+                        json.dump(groups, file)
+                except ValueError as e:
+                    # all tests are judged, so a wrong groups.json does not accept attempts which fail skipped tests
+                    print("[ERROR]:groups.json of the problem is not used.", problem.pk, e)
+                    with open(os.path.join(temp, GROUPS_ERROR_FILE), "w") as file:
+                        file.write(str(e))
+
+            os.rename(temp, folder)
+        except ARCHIVE_ERRORS as e:
+            shutil.rmtree(temp, ignore_errors=True)
+            raise TestsError(f"tests archive of the problem {problem.pk} can not be read: {e}")
+        except OSError:
+            # another worker extracted the same archive
+            shutil.rmtree(temp, ignore_errors=True)
+            if not os.path.isfile(os.path.join(folder, "index.json")):
+                raise
+            return
+
+        self.evict(folder)
+
+    def evict(self, keep: str):
+        """
+        evict(keep) -> Delete least recently used folders except keep until the store fits to max_size
+        """
+        entries = []
+        total = 0
+
+        for name in os.listdir(self.path):
+            entry = os.path.join(self.path, name)
+            if name.startswith(".") or not os.path.isdir(entry):
+                continue
+            size = 0
+            for root, dirs, names in os.walk(entry):
+                for file in names:
+                    size += os.path.getsize(os.path.join(root, file))
+            entries.append((os.stat(entry).st_mtime, size, entry))
+            total += size
+
+        for mtime, size, entry in sorted(entries):
+            if total <= self.max_size:
+                break
+            if entry == keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def parse_groups(self, data: bytes, count: int):
+        """
+        parse_groups(data, count) -> Groups of groups.json with indexes of tests from 0
+
+        Tests of a group are numbers from 1 or "first-last" ranges, a test can be in many groups.
+        Raises ValueError when groups.json is malformed, has tests out of count tests
+        or some of the tests are not in any group.
+        """
+        try:
+            groups = json.loads(data)
+        except ValueError as e:
+            raise ValueError(f"groups.json is not valid json: {e}")
+
+        if not isinstance(groups, list) or not groups:
+            raise ValueError("groups.json must be a list of groups")
+
+        result = []
+        covered = set()
+        for number, group in enumerate(groups, start=1):
+            if not isinstance(group, dict):
+                raise ValueError(f"group {number} is not an object")
+
+            tests = group.get("tests") or []
+            if not isinstance(tests, list):
+                tests = [tests]
+
+            indexes = set()
+            for test in tests:
+                first, _, last = str(test).partition("-")
+                try:
+                    first, last = int(first), int(last or first)
+                except ValueError:
+                    raise ValueError(f"group {number} has invalid test {test!r}")
+                if not 1 <= first <= last <= count:
+                    raise ValueError(f"group {number} has tests {test} out of 1-{count}")
+                indexes.update(range(first - 1, last))
+
+            if not indexes:
+                raise ValueError(f"group {number} has no tests")
+
+            try:
+                points = float(group.get("points", 0))
+            except (TypeError, ValueError):
+                raise ValueError(f"group {number} has invalid points {group.get('points')!r}")
+
+            covered.update(indexes)
+            result.append({
+                "name": str(group.get("name", number)),
+                "points": points,
+                "tests": sorted(indexes),
+            })
+
+        missing = [index + 1 for index in range(count) if index not in covered]
+        if missing:
+            raise ValueError(f"tests {', '.join(map(str, missing[:10]))}{', ...' if len(missing) > 10 else ''} are not in any group")
+        return result
+
+    def pairs(self, names: list):
+        """
+        pairs(names) -> List of (input, output) names of the tests archive
+
+        Inputs and outputs are matched by name (1.in and 1.out, input1.txt and output1.txt),
+        tests keep the archive order of inputs. When names do not match, files are paired in archive order.
+        """
+        inputs = {}
+        outputs = {}
+
+        for name in names:
+            root, extension = os.path.splitext(name)
+            if extension.lower() in INPUT_EXTENSIONS:
+                inputs[root] = name
+            elif extension.lower() in OUTPUT_EXTENSIONS:
+                outputs[root] = name
+            elif re.search(r"input", name, re.IGNORECASE):
+                inputs[re.sub(r"input", "", name, flags=re.IGNORECASE)] = name
+            elif re.search(r"output", name, re.IGNORECASE):
+                outputs[re.sub(r"output", "", name, flags=re.IGNORECASE)] = name
+
+        if inputs and len(inputs) == len(names) / 2 and inputs.keys() == outputs.keys():
+            return [(inputs[key], outputs[key]) for key in inputs]
+
+        return [
+            tuple(names[i:i + 2])
+            for i in range(0, len(names) - 1, 2)
+        ]
+
+
+class ProgramError(Exception):
+    pass
+
+
+class ProgramStore:
+    """
+    Checker and interactor programs of problems, built once to <path>/<problem.pk>/<name>-<sha256 of the file>.
+
+    Sources are compiled by their extension (JUDGE_PROGRAMS["compilers"]), scripts are run with
+    the interpreter of their extension, other files are used as executables.
+    """
+    def __init__(self, path: str = None, client: redis.Redis = None):
+        config = settings.JUDGE_PROGRAMS
+        self.path = str(path or config.get("path"))
+        self.compilers = config.get("compilers")
+        self.interpreters = config.get("interpreters")
+        self.timeout = config.get("timeout")
+        self.client = client or connect()
+
+        os.makedirs(self.path, exist_ok=True)
+
+    def get(self, problem, name: str):
+        """
+        get(problem, name) -> Command of the problem's program, None when the problem has no such program
+
+        name - "checker" or "interactor"
+        Raises ProgramError when the program can not be compiled.
+        """
+        file = getattr(problem, name)
+        if not file:
+            return None
+
+        extension = os.path.splitext(file.name)[1].lower()
+        folder = os.path.join(self.path, str(problem.pk))
+        program = os.path.join(folder, f"{name}-{file_hash(problem, name, self.client)[:16]}{extension}")
+
+        if not os.path.isfile(program):
+            self.build(file, extension, program)
+            # old versions of the program are not needed
+            for old in os.listdir(folder):
+                if old.startswith(f"{name}-") and os.path.join(folder, old) != program:
+                    os.remove(os.path.join(folder, old))
+
+        if extension in self.interpreters:
+            return [*self.interpreters.get(extension).split(), program]
+        return [program]
+
+    def build(self, file, extension: str, program: str):
+        """
+        build(file, extension, program) -> Compile or copy the uploaded file to program
+
+        file - FieldFile, it is read through its storage
+        """
+        os.makedirs(os.path.dirname(program), exist_ok=True)
+        temp = os.path.join(os.path.dirname(program), f".{uuid.uuid4().hex}")
+        source = f"{temp}{extension}"
+
+        try:
+            with file.open("rb") as uploaded, open(source, "wb") as copy:
+                shutil.copyfileobj(uploaded, copy, 1024 * 1024)
+
+            if extension in self.compilers:
+                command = self.compilers.get(extension).format(output=temp, source=source)
+                result = subprocess.run(command.split(), timeout=self.timeout, capture_output=True)
+                if result.returncode != 0:
+                    raise ProgramError(result.stderr.decode(errors="replace")[:4096])
+            else:
+                shutil.copy(source, temp)
+                # uploaded files are not executable
+                os.chmod(temp, 0o755)
+            os.replace(temp, program)
+        except subprocess.TimeoutExpired:
+            raise ProgramError(f"compiling {os.path.basename(file.name)} timed out")
+        except OSError as e:
+            raise ProgramError(str(e))
+        finally:
+            for path in (temp, source):
+                if os.path.exists(path):
+                    os.remove(path)
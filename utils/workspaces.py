@@ -0,0 +1,161 @@
+import os
+import re
+import stat
+import time
+import uuid
+import shutil
+import tempfile
+import subprocess
+from django.conf import settings
+
+
+class WorkspaceError(Exception):
+    pass
+
+
+def private_folder(path: str):
+    """
+    private_folder(path) -> Create the folder with mode 0700 or check the existing one
+
+    Raises WorkspaceError when the folder is a symlink, belongs to another user or can be written by others,
+    other users of a shared tmpfs could change sandbox binaries and workspaces in it.
+    """
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.geteuid() or info.st_mode & 0o022:
+        raise WorkspaceError(f"{path} must be a folder of the judge user (uid {os.geteuid()}) with mode 0700")
+    if stat.S_IMODE(info.st_mode) != 0o700:
+        os.chmod(path, 0o700)
+
+
+class WorkspacePool:
+    """
+    Folders of attempts inside root (tmpfs by default), root must be private to the judge user.
+
+    Empty folders are created ahead in <root>/.pool, a workspace takes one of them with rename
+    and gives it back emptied, so judging does not create and delete folders.
+    Sandbox binaries are copied once to <root>/.bin as read only files and linked from workspaces.
+    """
+    def __init__(self, root: str = None, size: int = None):
+        config = settings.JUDGE_WORKSPACES
+        self.root = str(root or config.get("root"))
+        self.size = config.get("size") if size is None else size
+        self.pool = os.path.join(self.root, ".pool")
+        self.bin = os.path.join(self.root, ".bin")
+        # versions of sandbox binaries by path of the copy
+        self.versions = {}
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.root)), exist_ok=True)
+        for path in (self.root, self.pool, self.bin):
+            private_folder(path)
+        self.provision()
+
+    def path(self, name: str):
+        return os.path.join(self.root, name)
+
+    def provision(self):
+        """
+        provision() -> Create empty folders until the pool has size folders
+        """
+        for _ in range(self.size - len(os.listdir(self.pool))):
+            os.mkdir(os.path.join(self.pool, uuid.uuid4().hex))
+
+    def acquire(self, name: str):
+        """
+        acquire(name) -> Path of the empty workspace folder, a pooled folder is used when there is one
+
+        name - string, relative to root, for example attempt uuid or <uuid>/test-1
+        Folder left by a worker which died while judging the same attempt is emptied and used again.
+        """
+        path = self.path(name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+
+        for folder in os.listdir(self.pool):
+            try:
+                os.rename(os.path.join(self.pool, folder), path)
+                return path
+            except FileNotFoundError:
+                # taken by another worker
+                continue
+
+        os.mkdir(path)
+        return path
+
+    def release(self, path: str):
+        """
+        release(path) -> Empty the folder and return it to the pool, folders over size are deleted
+        """
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path)
+                else:
+                    os.unlink(entry.path)
+
+        if len(os.listdir(self.pool)) < self.size:
+            os.rename(path, os.path.join(self.pool, uuid.uuid4().hex))
+        else:
+            os.rmdir(path)
+
+    def binary(self, from_path: str):
+        """
+        binary(from_path) -> Path of the read only copy of from_path in the shared folder
+
+        The copy is named by size and modification time of from_path, a rebuilt binary gets a new copy
+        and running sandboxes keep the old one.
+        """
+        source = os.path.abspath(from_path)
+        stat = os.stat(source)
+        path = os.path.join(self.bin, f"{os.path.basename(source)}-{stat.st_size:x}-{stat.st_mtime_ns:x}")
+
+        if not os.path.isfile(path):
+            temp = f"{path}.{uuid.uuid4().hex}"
+            shutil.copy(source, temp)
+            os.chmod(temp, 0o555)
+            os.replace(temp, path)
+        return path
+
+    def version(self, from_path: str):
+        """
+        version(from_path) -> Version printed by `sandbox -V`, 0 for binaries built before the version flag
+
+        Binaries of version 0 take no flags, they run the program with limits built into them.
+        A binary is run once for every copy, so a rebuilt binary is checked again.
+        """
+        path = self.binary(from_path)
+        if path in self.versions:
+            return self.versions[path]
+
+        # old binaries run "-V" as the program and write output.txt, error.txt and meta.json to cwd
+        with tempfile.TemporaryDirectory() as cwd:
+            try:
+                result = subprocess.run([path, "-V"], cwd=cwd, stdin=subprocess.DEVNULL, capture_output=True, timeout=10)
+                match = re.match(rb"algoland-sandbox (\d+)", result.stdout)
+            except (OSError, subprocess.TimeoutExpired) as e:
+                print("[ERROR]:can not get version of the sandbox.", path, e)
+                return 0
+
+        version = int(match.group(1)) if match else 0
+        if not version:
+            print("[ERROR]:sandbox binary is old, programs run with its built-in limits.", from_path)
+        self.versions[path] = version
+        return version
+
+    def sweep(self, age: float = 0):
+        """
+        sweep(age) -> Delete workspaces left by stopped workers, which are older than age seconds
+        """
+        now = time.time()
+        for entry in os.scandir(self.root):
+            if entry.path in (self.pool, self.bin) or not entry.is_dir(follow_symlinks=False):
+                continue
+            try:
+                if now - entry.stat(follow_symlinks=False).st_mtime >= age:
+                    shutil.rmtree(entry.path)
+            except OSError as e:
+                print("[ERROR]:can not delete workspace.", e)
@@ -0,0 +1,379 @@
+"""
+Fork server of the python interpreter, speaks the same protocol as `sandbox -s` (see utils/runner.py).
+
+The interpreter and common modules are loaded once, every test is a fork of this process
+with the same seccomp rules and limits as sandbox.c, so a test does not pay the interpreter startup.
+Memory of a test is counted without the pages of the fork server, which every fork shares.
+Started by the judge as `python3 -I utils/zygote.py`, it must not import django.
+"""
+import os
+import sys
+import time
+import json
+import ctypes
+import select
+import signal
+import runpy
+import resource
+import subprocess
+
+# modules imported by most solutions, imported once for all tests
+import re
+import io
+import math
+import copy
+import heapq
+import bisect
+import random
+import string
+import typing
+import decimal
+import fractions
+import operator
+import functools
+import itertools
+import traceback
+import statistics
+import collections
+import dataclasses
+
+
+SCMP_ACT_ALLOW = 0x7FFF0000
+SCMP_ACT_KILL = 0x00000000
+SCMP_CMP_MASKED_EQ = 7
+
+
+def SCMP_ACT_ERRNO(errno):
+    return 0x00050000 | (errno & 0x0000FFFF)
+
+
+# sandbox.c dagi qoidalar bilan bir xil
+KILL_SYSCALLS = (
+    "fork", "vfork", "clone",
+    "kill", "tgkill", "tkill",
+    "setuid", "setgid", "setreuid", "setregid",
+    "mount", "umount2", "kexec_load", "ptrace", "mknod", "chmod", "fchmod", "chown", "fchown", "lchown", "syslog",
+    "socket", "connect", "bind", "accept", "listen",
+    "reboot",
+)
+EPERM_SYSCALLS = (
+    "unlink", "unlinkat", "rmdir", "getdents", "readlink",
+)
+# options of the interpreter which take an argument
+ARGUMENT_OPTIONS = "WX"
+
+
+class ScmpArgCmp(ctypes.Structure):
+    _fields_ = [
+        ("arg", ctypes.c_uint),
+        ("op", ctypes.c_int),
+        ("datum_a", ctypes.c_uint64),
+        ("datum_b", ctypes.c_uint64),
+    ]
+
+
+def load_seccomp():
+    """
+    load_seccomp() -> libseccomp, None when it can not be loaded
+    """
+    try:
+        library = ctypes.CDLL("libseccomp.so.2")
+    except OSError:
+        return None
+    library.seccomp_init.restype = ctypes.c_void_p
+    library.seccomp_init.argtypes = [ctypes.c_uint32]
+    library.seccomp_syscall_resolve_name.argtypes = [ctypes.c_char_p]
+    library.seccomp_rule_add_array.argtypes = [ctypes.c_void_p, ctypes.c_uint32, ctypes.c_int, ctypes.c_uint, ctypes.POINTER(ScmpArgCmp)]
+    library.seccomp_load.argtypes = [ctypes.c_void_p]
+    return library
+
+
+def setup_seccomp(library):
+    ctx = library.seccomp_init(SCMP_ACT_ALLOW)
+    if not ctx:
+        return False
+
+    for name in KILL_SYSCALLS + EPERM_SYSCALLS:
+        number = library.seccomp_syscall_resolve_name(name.encode())
+        if number < 0:
+            continue
+        action = SCMP_ACT_KILL if name in KILL_SYSCALLS else SCMP_ACT_ERRNO(1)
+        library.seccomp_rule_add_array(ctx, action, number, 0, None)
+
+    # yangi fayl yaratishni bloklash
+    rule = ScmpArgCmp(2, SCMP_CMP_MASKED_EQ, os.O_CREAT, os.O_CREAT)
+    library.seccomp_rule_add_array(ctx, SCMP_ACT_ERRNO(1), library.seccomp_syscall_resolve_name(b"openat"), 1, ctypes.byref(rule))
+
+    return library.seccomp_load(ctx) == 0
+
+
+def split_command(command):
+    """
+    split_command(command) -> (options, argv) of the python command without the interpreter, argv[0] is the script
+
+    For example ["-S", "-W", "ignore", "main.py", "1"] gives (["-S", "-W", "ignore"], ["main.py", "1"]).
+    Raises ValueError when there is no script, -c and -m are not run by the fork server.
+    """
+    index = 0
+    while index < len(command) and command[index].startswith("-") and command[index] != "-":
+        option = command[index]
+        index += 1
+        if option == "--":
+            break
+        if option.startswith("--"):
+            if option == "--check-hash-based-pycs":
+                index += 1
+            continue
+        for position, name in enumerate(option[1:], 1):
+            if name in "cm":
+                raise ValueError(f"option -{name} is not supported")
+            if name in ARGUMENT_OPTIONS:
+                # argument is the rest of the option or the next item
+                if position == len(option) - 1:
+                    index += 1
+                break
+
+    if index >= len(command) or command[index] == "-":
+        raise ValueError("script is not given")
+    return command[:index], command[index:]
+
+
+def set_limits(memory_limit, time_limit, process_limit, file_limit):
+    resource.setrlimit(resource.RLIMIT_AS, (memory_limit * 1024 * 1024, memory_limit * 1024 * 1024))
+    # limitda SIGXCPU, bir soniyadan keyin SIGKILL
+    seconds = (time_limit + 999) // 1000
+    resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds + 1))
+    resource.setrlimit(resource.RLIMIT_NPROC, (process_limit, process_limit))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (file_limit, file_limit))
+    resource.setrlimit(resource.RLIMIT_NOFILE, (64, 64))
+    resource.setrlimit(resource.RLIMIT_STACK, (8 * 1024 * 1024, 8 * 1024 * 1024))
+
+
+def child(library, limits, cwd, input, argv, out_fd, err_fd, ready_fd):
+    """
+    child(...) -> Run the program in the forked process, never returns
+
+    argv - script and its arguments, a byte is written to ready_fd when the script is about to run
+    """
+    try:
+        os.chdir(cwd)
+        in_fd = os.open(input, os.O_RDONLY)
+        os.dup2(in_fd, 0)
+        os.dup2(out_fd, 1)
+        os.dup2(err_fd, 2)
+        # pipes of the judge must not be visible to the program
+        os.closerange(3, ready_fd)
+        os.closerange(ready_fd + 1, 1 << 16)
+
+        sys.stdin = sys.__stdin__ = open(0, "r", encoding="utf-8", closefd=False)
+        sys.stdout = sys.__stdout__ = open(1, "w", encoding="utf-8", closefd=False)
+        sys.stderr = sys.__stderr__ = open(2, "w", encoding="utf-8", errors="backslashreplace", closefd=False, buffering=1)
+        sys.argv = list(argv)
+        sys.path.insert(0, os.path.dirname(os.path.abspath(argv[0])))
+
+        signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+        # forks share the state of the fork server, tests must not get the same random numbers
+        random.seed()
+        if not setup_seccomp(library):
+            os._exit(1)
+        set_limits(*limits)
+        os.write(ready_fd, b"\n")
+        os.close(ready_fd)
+    except BaseException:
+        os._exit(1)
+
+    code = 0
+    try:
+        runpy.run_path(argv[0], run_name="__main__")
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException as e:
+        # frames of the fork server are not shown, traceback starts in the program like in a new interpreter
+        tb = e.__traceback__
+        while tb and tb.tb_frame.f_code.co_filename != argv[0]:
+            tb = tb.tb_next
+        tb = tb or e.__traceback__
+        sys.excepthook(type(e), e.with_traceback(tb), tb)
+        code = 1
+
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except BaseException:
+        code = code or 120
+    os._exit(code)
+
+
+def read_output(out_fd, err_fd, pid, deadline, output_limit, line_limit, error_limit):
+    """
+    read_output(...) -> (stdout, stderr, ole, timed_out) of the program
+    """
+    output = bytearray()
+    error = bytearray()
+    lines = 0
+    ole = False
+    timed_out = False
+    fds = [out_fd, err_fd]
+
+    while fds:
+        remaining = deadline - time.monotonic() if deadline else None
+        if remaining is not None and remaining <= 0:
+            timed_out = True
+            os.kill(pid, signal.SIGKILL)
+            deadline = None
+            continue
+
+        ready, _, _ = select.select(fds, [], [], remaining)
+        for fd in ready:
+            chunk = os.read(fd, 64 * 1024)
+            if not chunk:
+                fds.remove(fd)
+                continue
+            if fd == err_fd:
+                error += chunk[:max(0, error_limit - len(error))]
+                continue
+            # dastur o'ldirilgan, qolgan chiqishni tashlab yuborish
+            if ole:
+                continue
+            if output_limit > 0 and len(output) + len(chunk) > output_limit:
+                chunk = chunk[:output_limit - len(output)]
+                ole = True
+            if line_limit > 0:
+                count = chunk.count(b"\n")
+                if lines + count > line_limit:
+                    index = -1
+                    for _ in range(line_limit - lines + 1):
+                        index = chunk.index(b"\n", index + 1)
+                    chunk = chunk[:index]
+                    ole = True
+                lines += count
+            output += chunk
+            if ole:
+                os.kill(pid, signal.SIGKILL)
+
+    return bytes(output), bytes(error), ole, timed_out
+
+
+def run(library, fields, cold, preloaded):
+    # cgroups are not used by the fork server, memory is limited with RLIMIT_AS
+    time_limit, wall_limit, memory_limit, process_limit, file_limit, output_limit, line_limit, cgroup_memory = map(int, fields[:8])
+    cwd, input, command = fields[8], fields[9], fields[10:]
+    limits = (memory_limit, time_limit, process_limit, file_limit)
+    try:
+        _, argv = split_command(command)
+    except ValueError as e:
+        return {"error": str(e)}, b"", b""
+
+    out_read, out_write = os.pipe()
+    err_read, err_write = os.pipe()
+    ready_read, ready_write = os.pipe()
+
+    start = time.monotonic()
+    pid = os.fork()
+    if pid == 0:
+        child(library, limits, cwd, input, argv, out_write, err_write, ready_write)
+
+    os.close(out_write)
+    os.close(err_write)
+    os.close(ready_write)
+    deadline = start + wall_limit / 1000 if wall_limit > 0 else None
+
+    # warm startup lasts until the child is ready to run the script, end of file when it failed to start
+    remaining = max(0, deadline - time.monotonic()) if deadline else None
+    select.select([ready_read], [], [], remaining)
+    startup = time.monotonic() - start
+
+    output, error, ole, timed_out = read_output(out_read, err_read, pid, deadline, output_limit, line_limit, file_limit)
+    os.close(out_read)
+    os.close(err_read)
+    os.close(ready_read)
+
+    # wall time limit after the program closed its output
+    pidfd = os.pidfd_open(pid)
+    remaining = max(0, deadline - time.monotonic()) if deadline else None
+    ready, _, _ = select.select([pidfd], [], [], remaining)
+    if not ready:
+        timed_out = True
+        os.kill(pid, signal.SIGKILL)
+    os.close(pidfd)
+
+    _, status, usage = os.wait4(pid, 0)
+    exec_time = time.monotonic() - start
+
+    exit_code = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -1
+    signal_code = os.WTERMSIG(status) if os.WIFSIGNALED(status) else 0
+    cpu_time = (usage.ru_utime + usage.ru_stime) * 1000
+    tle = not ole and (
+        timed_out or
+        signal_code == signal.SIGXCPU or
+        (signal_code == signal.SIGKILL and cpu_time >= time_limit) or
+        cpu_time > time_limit
+    )
+
+    return {
+        "exit_code": exit_code,
+        "signal": signal_code,
+        "time": round(exec_time * 1000, 3),
+        "cpu_time": round(cpu_time, 3),
+        # pages of the fork server are counted in the fork, only memory of the program is left
+        "memory": max(0, usage.ru_maxrss - preloaded),
+        "ole": int(ole),
+        "tle": int(tle),
+        "startup": {
+            "cold": cold,
+            "warm": round(startup * 1000, 3),
+        },
+        "output": len(output),
+        "error": len(error),
+    }, output, error
+
+
+def cold_startup():
+    """
+    cold_startup() -> Milliseconds to start the interpreter without the fork server
+    """
+    start = time.monotonic()
+    subprocess.run([sys.executable, "-c", "pass"], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return round((time.monotonic() - start) * 1000, 3)
+
+
+def fork_memory():
+    """
+    fork_memory() -> ru_maxrss of a fork which does nothing, kilobytes of the fork server counted in every fork
+    """
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0)
+    _, _, usage = os.wait4(pid, 0)
+    return usage.ru_maxrss
+
+
+def serve():
+    library = load_seccomp()
+    cold = cold_startup()
+    preloaded = fork_memory()
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+
+    for line in stdin:
+        fields = line.rstrip(b"\n").decode().split("\t")
+
+        if library is None or len(fields) < 11:
+            response, output, error = {"error": "bad request" if library else "seccomp is not available"}, b"", b""
+        else:
+            response, output, error = run(library, fields, cold, preloaded)
+
+        stdout.write(json.dumps(response).encode() + b"\n")
+        stdout.write(output)
+        stdout.write(error)
+        stdout.flush()
+
+
+if __name__ == "__main__":
+    serve()
@@ -4,13 +4,14 @@ import redis
 from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 
+from utils.queue import JudgeQueue
 from utils.secrets import encode, decode, jsonify
 from users.models import User
 
 from .functions import (
+    attempt_target,
     save_user_last_seen,
     read_notifications,
-    run_sandbox,
     like_post,
     follow,
     unfollow,
@@ -18,6 +19,7 @@ from .functions import (
 
 
 redis_client = redis.Redis(db=1, decode_responses=True)
+judge_queue = JudgeQueue()
 
 
 class AlgoLandConsumer(AsyncWebsocketConsumer):
@@ -87,10 +89,50 @@ class AlgoLandConsumer(AsyncWebsocketConsumer):
             if self.user.is_authenticated:
                 await sync_to_async(read_notifications)(self.user)
 
-        # receive attempt action from client
+        # receive attempt action from client, judge workers will check it
         elif type == "attempt":
             if self.user.is_authenticated:
-                await sync_to_async(run_sandbox)(self.user, data.get("data", {}).get("problem"), data.get("data", {}).get("language"), data.get("data", {}).get("code"))
+                attempt = data.get("data", {})
+                # only attempts of existing problems and languages are queued, workers take attempts by language uuid
+                target = await sync_to_async(attempt_target)(attempt.get("problem"), attempt.get("language"))
+                if not target:
+                    await self.channel_layer.group_send(
+                        self.user_group,
+                        {
+                            "type": "attempt_queue",
+                            "data": {
+                                "id": None,
+                                "error": "invalid_attempt",
+                            },
+                        }
+                    )
+                    return
+
+                problem, language = target
+                id = await sync_to_async(judge_queue.push)(
+                    {
+                        "user": self.user.pk,
+                        "problem": problem,
+                        "language": language,
+                        "code": attempt.get("code"),
+                        "queued": time.time(),
+                    },
+                    priority=judge_queue.priority(self.user),
+                    weight=judge_queue.weight(self.user),
+                )
+                # id of the queued attempt and positions of all queued attempts of the user
+                positions = await sync_to_async(judge_queue.user_positions)(self.user.pk)
+                await self.channel_layer.group_send(
+                    self.user_group,
+                    {
+                        "type": "attempt_queue",
+                        "data": {
+                            "id": id,
+                            "error": None if id else "too_many_attempts",
+                            "positions": positions,
+                        },
+                    }
+                )
 
         elif type == "like_to_post":
             if self.user.is_authenticated:
@@ -134,6 +176,13 @@ class AlgoLandConsumer(AsyncWebsocketConsumer):
             **event,
         })))
 
+    # send positions of queued attempts
+    async def attempt_queue(self, event: dict):
+        await self.send(text_data=encode(json.dumps({
+            "type": "attempt_queue",
+            **event,
+        })))
+
     async def update_post(self, event: dict):
         await self.send(text_data=encode(json.dumps({
             "type": "update_post",
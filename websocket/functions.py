@@ -2,6 +2,8 @@ from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 
 from sandbox import Judge
+from utils.functions import check_uuid
+from utils.progress import ProgressIndex
 from users.models import (
     User,
     Notification,    
@@ -17,12 +19,16 @@ from problems.models import (
     Attempt,
     Language,
     Top,
+    ProblemStats,
 )
 from posts.serializers import (
     PostModelSerializer,
 )
 
 
+progress_index = ProgressIndex()
+
+
 # change user last_seen
 def save_user_last_seen(user: User, last_seen: str):
     user.last_seen = last_seen
@@ -34,8 +40,24 @@ def read_notifications(user: User):
     notifications = Notification.objects.filter(to=user, is_readed=False).exclude(type="all").update(is_readed=True)
 
 
+# uuids of the problem and language of the attempt as they are stored, None when one of them does not exist
+def attempt_target(problem_uuid: str, language_uuid: str):
+    if not check_uuid(problem_uuid) or not check_uuid(language_uuid):
+        return None
+
+    problem = Problem.objects.filter(uuid=problem_uuid).values_list("uuid", flat=True).first()
+    language = Language.objects.filter(uuid=language_uuid).values_list("uuid", flat=True).first()
+    if not problem or not language:
+        return None
+    return str(problem), str(language)
+
+
 # create and check attempt with given problem_uuid, language_uuid and code
-def run_sandbox(user: User, problem_uuid: str, language_uuid: str, code: str):
+def run_sandbox(user: User, problem_uuid: str, language_uuid: str, code: str, attempt_uuid: str = None):
+    # uuids are sent by the client, invalid ones can not be looked up in uuid columns
+    if not check_uuid(problem_uuid) or not check_uuid(language_uuid):
+        return
+
     today = datetime.today()
     activity = Activity.objects.filter(author=user, created=today.date())
 
@@ -53,12 +75,26 @@ def run_sandbox(user: User, problem_uuid: str, language_uuid: str, code: str):
         language = language.first()
         top = Top.objects.filter(author=user, problem=problem)
 
-        attempt = Attempt.objects.create(author=user, problem=problem, language=language, code=code)
+        # attempt of a dead judge worker is judged again
+        attempt = Attempt.objects.filter(uuid=attempt_uuid, author=user).first() if attempt_uuid else None
+        # the worker died after the attempt was judged, statistics and activity are already recorded
+        if attempt and attempt.status not in (None, "running"):
+            print("[JUDGE]:attempt is already judged", attempt.uuid)
+            return
+        if not attempt:
+            attempt = Attempt(author=user, problem=problem, language=language, code=code)
+            if attempt_uuid:
+                attempt.uuid = attempt_uuid
+            attempt.save()
 
         # run code with sandbox
         sandbox = Judge(attempt=attempt)
         sandbox.run()
 
+        # statistics of the problem and progress of the user
+        ProblemStats.record(attempt)
+        progress_index.record(user.pk, problem.pk, attempt.status)
+
         # change top attempt (with time)
         if not top.exists():
             top = Top.objects.create(author=user, problem=problem, attempt=attempt)
@@ -76,6 +112,9 @@ def run_sandbox(user: User, problem_uuid: str, language_uuid: str, code: str):
 
 # when user likes to the post
 def like_post(user: User, post_uuid: str):
+    if not check_uuid(post_uuid):
+        return
+
     post = Post.objects.filter(uuid=post_uuid)
     channel_layer = get_channel_layer()
 